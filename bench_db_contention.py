@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк конкурентной записи в БД.
+
+Несколько процессов (как воркеры gunicorn/uvicorn) параллельно выполняют
+запись, как в create/sign под REQUIRE_REQUEST_SIGNATURE:
+INSERT nonce (DatabaseReplayCache), затем выдача HD индекса + INSERT Wallet
+или INSERT Transaction (+ журнал кошельков), и чтение последней страницы транзакций.
+После каждого "запроса" вызывается close_old_connections(), как в конце HTTP запроса,
+поэтому CONN_MAX_AGE учитывается.
+
+Профили:
+    legacy     - прежние настройки: SQLite без OPTIONS, соединение на каждый запрос
+    configured - текущие settings.DATABASES (DB_ENGINE, SQLITE_*, DB_POOL_*)
+
+SQLite профили используют временный файл. Для DB_ENGINE=postgres профиль configured
+пишет в отдельную базу --pg-database (должна существовать; таблицы мигрируются и очищаются).
+
+Запуск:
+    python bench_db_contention.py
+    python bench_db_contention.py --workers 16 --requests 300
+    DB_ENGINE=postgres DB_POOL_MAX_SIZE=4 python bench_db_contention.py --profiles configured
+"""
+import argparse
+import copy
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import uuid
+from decimal import Decimal
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crypto_wallet_service.settings')
+
+PROFILES = ('legacy', 'configured')
+
+
+def database_settings(profile, tmp, pg_database):
+    from django.conf import settings
+
+    if profile == 'legacy':
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(tmp, 'legacy.sqlite3'),
+        }
+
+    database = copy.deepcopy(settings.DATABASES['default'])
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database['NAME'] = os.path.join(tmp, 'configured.sqlite3')
+    else:
+        database['NAME'] = pg_database
+    return database
+
+
+def setup_django(database):
+    from django.conf import settings
+
+    settings.DATABASES['default'] = database
+
+    import django
+    django.setup()
+
+
+def prepare(database):
+    """
+    Миграции и очистка таблиц бенчмарка (в отдельном процессе)
+    """
+    setup_django(database)
+
+    from django.core.management import call_command
+    from wallet_api.models import Transaction, UsedNonce, Wallet
+
+    call_command('migrate', verbosity=0)
+    Transaction.objects.all().delete()
+    UsedNonce.objects.all().delete()
+    Wallet.objects.all().delete()
+
+
+def one_request(worker_id, i, replay_cache):
+    from wallet_api.hd_index import ACCOUNT_PATH
+    from wallet_api.models import HDIndexSequence, Transaction, Wallet
+
+    replay_cache.check_and_store(uuid.uuid4().hex, int(time.time()))
+
+    if i % 2:
+        index = HDIndexSequence.reserve(ACCOUNT_PATH)
+        Wallet.objects.create(address=f"0x{worker_id:08x}{index:032x}", hd_path=f"{ACCOUNT_PATH}/{index}")
+    else:
+        Transaction.objects.create(
+            tx_hash=f"0x{uuid.uuid4().hex}{uuid.uuid4().hex}",
+            from_address=f"0x{worker_id:040x}",
+            to_address=f"0x{i % 50:040x}",
+            amount_eth=Decimal('0.01'),
+            status=Transaction.STATUS_OK,
+        )
+
+    list(Transaction.objects.order_by('-created_at', '-id').values('id', 'tx_hash')[:20])
+
+
+def worker(database, worker_id, requests, start_at, results):
+    setup_django(database)
+
+    from django.db import OperationalError, close_old_connections
+    from wallet_api.replay_cache import DatabaseReplayCache
+
+    replay_cache = DatabaseReplayCache(expiry_seconds=300)
+    latencies = []
+    errors = 0
+
+    # Общий старт, чтобы процессы писали одновременно
+    time.sleep(max(0.0, start_at - time.time()))
+    started = time.perf_counter()
+    for i in range(requests):
+        request_started = time.perf_counter()
+        try:
+            one_request(worker_id, i, replay_cache)
+            latencies.append(time.perf_counter() - request_started)
+        except OperationalError:
+            # "database is locked" и т.п. - запрос завершился бы 500
+            errors += 1
+        finally:
+            close_old_connections()
+
+    results.put((latencies, errors, time.perf_counter() - started))
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run_profile(database, workers, requests):
+    ctx = multiprocessing.get_context('spawn')
+
+    setup = ctx.Process(target=prepare, args=(database,))
+    setup.start()
+    setup.join()
+    if setup.exitcode:
+        raise Exception(f"Database setup failed (exit code {setup.exitcode})")
+
+    results = ctx.Queue()
+    start_at = time.time() + 2 + workers * 0.2
+    processes = [
+        ctx.Process(target=worker, args=(database, worker_id, requests, start_at, results))
+        for worker_id in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    latencies = []
+    errors = 0
+    elapsed = 0.0
+    for _ in processes:
+        worker_latencies, worker_errors, worker_elapsed = results.get()
+        latencies.extend(worker_latencies)
+        errors += worker_errors
+        elapsed = max(elapsed, worker_elapsed)
+    for process in processes:
+        process.join()
+
+    latencies.sort()
+    return {
+        'ok': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+        'max': (latencies[-1] if latencies else float('nan')) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Database write contention benchmark')
+    parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+    parser.add_argument('--workers', type=int, default=8, help='Параллельных процессов')
+    parser.add_argument('--requests', type=int, default=200, help='Запросов на процесс')
+    parser.add_argument('--pg-database', default='crypto_wallets_bench',
+                        help='База для профиля configured при DB_ENGINE=postgres')
+    args = parser.parse_args()
+
+    from django.conf import settings
+    print(f"DB_ENGINE={settings.DB_ENGINE}, {args.workers} workers x {args.requests} requests")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'profile':>10} | {'ok':>6} | {'errors':>6} | {'req/s':>7} | {'p50, ms':>8} | {'p99, ms':>8} | {'max, ms':>8}")
+        print('-' * 71)
+        for profile in args.profiles:
+            stats = run_profile(database_settings(profile, tmp, args.pg_database), args.workers, args.requests)
+            print(
+                f"{profile:>10} | {stats['ok']:>6} | {stats['errors']:>6} | {stats['rps']:>7.1f} | "
+                f"{stats['p50']:>8.1f} | {stats['p99']:>8.1f} | {stats['max']:>8.1f}"
+            )
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
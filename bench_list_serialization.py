@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк read-path сериализации списка транзакций.
+
+Сравнивает прежний путь /api/transactions (объекты моделей -> словари ->
+TransactionSerializer(data=..., many=True).is_valid() -> JSONRenderer)
+с быстрым путем (values() -> ORJSONRenderer) на 10k и 100k строк.
+
+Использует временную SQLite базу, рабочую БД не трогает.
+
+Запуск:
+    python bench_list_serialization.py
+    python bench_list_serialization.py --rows 10000 100000 500000 --repeat 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crypto_wallet_service.settings')
+
+import django
+from django.conf import settings
+
+
+def setup_database(path):
+    settings.DATABASES['default']['NAME'] = path
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def fill_transactions(count):
+    from wallet_api.models import Transaction
+
+    Transaction.objects.all().delete()
+    batch = []
+    for i in range(count):
+        batch.append(Transaction(
+            tx_hash=f"0x{i:064x}",
+            from_address=f"0x{i % 1000:040x}",
+            to_address=f"0x{(i * 7) % 1000:040x}",
+            amount_eth=Decimal('0.001') * (i % 100 + 1),
+            status=Transaction.STATUS_OK if i % 10 else Transaction.STATUS_ERROR,
+            error_message=None if i % 10 else 'insufficient funds',
+            broadcasted=bool(i % 2),
+        ))
+        if len(batch) == 5000:
+            Transaction.objects.bulk_create(batch)
+            batch = []
+    Transaction.objects.bulk_create(batch)
+
+
+def current_path():
+    """
+    Прежняя реализация TransactionListView.get
+    """
+    from rest_framework.renderers import JSONRenderer
+    from wallet_api.models import Transaction
+    from wallet_api.serializers import TransactionSerializer
+
+    data = [{
+        'tx_hash': tx.tx_hash,
+        'from_address': tx.from_address,
+        'to_address': tx.to_address,
+        'amount_eth': tx.amount_eth,
+        'status': tx.status,
+        'error_message': tx.error_message,
+        'broadcasted': tx.broadcasted,
+        'created_at': tx.created_at
+    } for tx in Transaction.objects.all()]
+
+    serializer = TransactionSerializer(data=data, many=True)
+    serializer.is_valid(raise_exception=True)
+    return JSONRenderer().render(serializer.data)
+
+
+def fast_path():
+    """
+    Быстрый путь ValuesListMixin: values() + orjson
+    """
+    from wallet_api.models import Transaction
+    from wallet_api.renderers import ORJSONRenderer
+    from wallet_api.serializers import TransactionSerializer
+
+    fields = list(TransactionSerializer().fields)
+    rows = list(Transaction.objects.order_by('-created_at', '-id').values('id', *fields))
+    for row in rows:
+        del row['id']
+    return ORJSONRenderer().render(rows)
+
+
+def best_of(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='List serialization benchmark')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_database(os.path.join(tmp, 'bench.sqlite3'))
+
+        print(f"{'rows':>8} | {'current, s':>10} | {'fast, s':>8} | {'speedup':>7} | {'bytes':>11}")
+        print('-' * 56)
+        for count in args.rows:
+            fill_transactions(count)
+            current_time, current_body = best_of(current_path, args.repeat)
+            fast_time, fast_body = best_of(fast_path, args.repeat)
+            print(
+                f"{count:>8} | {current_time:>10.3f} | {fast_time:>8.3f} | "
+                f"{current_time / fast_time:>6.1f}x | {len(fast_body):>11}"
+            )
+            if len(current_body) != len(fast_body):
+                print(f"   WARNING: output size differs ({len(current_body)} vs {len(fast_body)} bytes)")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест MPC ноды: запросы/с на /get_shard (или /health) для режимов запуска.
+
+Режимы:
+    flask    - dev сервер Flask (python app.py), один процесс
+    gunicorn - production режим (gunicorn -c gunicorn.conf.py app:app)
+
+Нода запускается локально на --port с тестовым шардом; клиенты держат keep-alive
+соединения (aiohttp), как MPCClient. Можно нагрузить уже запущенную ноду через --url.
+
+Запуск:
+    python bench_mpc_node.py
+    python bench_mpc_node.py --modes gunicorn --concurrency 64 --duration 20
+    python bench_mpc_node.py --url http://localhost:8001
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+NODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mpc-node')
+MODES = ('flask', 'gunicorn')
+
+COMMANDS = {
+    'flask': [sys.executable, 'app.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+}
+
+
+def start_node(mode, port, workers, threads):
+    env = dict(
+        os.environ,
+        NODE_ID='1',
+        NODE_PORT=str(port),
+        NODE_SHARD='abandon ability able about above absent absorb abstract',
+        SHARD_ENCRYPTION_KEY='bench-key',
+        NODE_WORKERS=str(workers),
+        NODE_THREADS=str(threads),
+    )
+    return subprocess.Popen(
+        COMMANDS[mode], cwd=NODE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+async def wait_ready(url, timeout=20):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f'{url}/health') as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise Exception(f"Node at {url} did not start in {timeout}s")
+
+
+async def load(url, path, concurrency, duration):
+    latencies = []
+    errors = 0
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        deadline = time.monotonic() + duration
+
+        async def client():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    async with session.get(f'{url}{path}') as response:
+                        await response.read()
+                        if response.status != 200:
+                            errors += 1
+                            continue
+                except aiohttp.ClientError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        started = time.monotonic()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        'ok': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'p50': latencies[len(latencies) // 2] * 1000 if latencies else float('nan'),
+        'p99': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else float('nan'),
+    }
+
+
+def print_row(name, stats):
+    print(
+        f"{name:>10} | {stats['ok']:>8} | {stats['errors']:>6} | {stats['rps']:>8.0f} | "
+        f"{stats['p50']:>8.2f} | {stats['p99']:>8.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MPC node load test')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--url', help='Нагрузить уже запущенную ноду вместо локального запуска')
+    parser.add_argument('--path', default='/get_shard', choices=['/get_shard', '/health'])
+    parser.add_argument('--port', type=int, default=18801)
+    parser.add_argument('--concurrency', type=int, default=32, help='Одновременных клиентов')
+    parser.add_argument('--duration', type=float, default=10, help='Секунд на режим')
+    parser.add_argument('--workers', type=int, default=2, help='NODE_WORKERS для gunicorn')
+    parser.add_argument('--threads', type=int, default=8, help='NODE_THREADS для gunicorn')
+    args = parser.parse_args()
+
+    print(f"{args.path}, {args.concurrency} keep-alive clients, {args.duration:.0f}s per mode")
+    print(f"{'mode':>10} | {'ok':>8} | {'errors':>6} | {'req/s':>8} | {'p50, ms':>8} | {'p99, ms':>8}")
+    print('-' * 63)
+
+    if args.url:
+        print_row('url', asyncio.run(load(args.url.rstrip('/'), args.path, args.concurrency, args.duration)))
+        return 0
+
+    url = f'http://127.0.0.1:{args.port}'
+    for mode in args.modes:
+        node = start_node(mode, args.port, args.workers, args.threads)
+        try:
+            asyncio.run(wait_ready(url))
+            print_row(mode, asyncio.run(load(url, args.path, args.concurrency, args.duration)))
+        finally:
+            node.terminate()
+            node.wait()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 load_dotenv()
 
@@ -56,12 +57,64 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'crypto_wallet_service.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# База данных: sqlite (по умолчанию) или postgres
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite').lower()
+
+# Сколько секунд держать соединение открытым между запросами (0 - новое соединение на каждый запрос)
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+
+if DB_ENGINE in ('postgres', 'postgresql'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'crypto_wallets'),
+            'USER': os.getenv('DB_USER', 'postgres'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
-}
+
+    # Пул соединений psycopg (нужен psycopg[pool]); 0 - без пула, постоянные соединения по DB_CONN_MAX_AGE.
+    # Пул общий на процесс: с ним соединение отдается обратно после каждого запроса
+    DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '0'))
+    if DB_POOL_MAX_SIZE > 0:
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT_SECONDS', '10')),
+        }
+elif DB_ENGINE == 'sqlite':
+    # WAL: чтение не блокируется записью, synchronous=NORMAL - fsync только на checkpoint.
+    # busy_timeout - сколько ждать блокировку записи вместо мгновенного "database is locked";
+    # IMMEDIATE берет блокировку записи в начале транзакции, а не при первой записи внутри нее
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': {
+                'init_command': (
+                    f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE};'
+                    f'PRAGMA synchronous={SQLITE_SYNCHRONOUS};'
+                    f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS};'
+                    f'PRAGMA mmap_size={SQLITE_MMAP_SIZE};'
+                ),
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"Unknown DB_ENGINE: {DB_ENGINE} (expected sqlite or postgres)")
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -117,15 +170,121 @@ CORS_ALLOW_ALL_ORIGINS = True
 API_SECRET_KEY = os.getenv('API_SECRET_KEY', '')
 INFURA_API_KEY = os.getenv('INFURA_API_KEY', '')
 INFURA_NETWORK = os.getenv('INFURA_NETWORK', 'sepolia')
+# Пул соединений к Ethereum RPC, таймаут запроса и интервал фоновой проверки сети
+ETH_RPC_POOL_SIZE = int(os.getenv('ETH_RPC_POOL_SIZE', '20'))
+ETH_RPC_TIMEOUT_SECONDS = float(os.getenv('ETH_RPC_TIMEOUT_SECONDS', '10'))
+ETH_HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv('ETH_HEALTH_PROBE_INTERVAL_SECONDS', '15'))
+# Сколько eth_sendRawTransaction отправлять в одном JSON-RPC батче
+ETH_RPC_BATCH_SIZE = int(os.getenv('ETH_RPC_BATCH_SIZE', '50'))
+
+# Тип транзакций: legacy (gasPrice) или eip1559 (maxFeePerGas/maxPriorityFeePerGas)
+ETH_TX_TYPE = os.getenv('ETH_TX_TYPE', 'legacy').lower()
+# Кэш цены газа: период фонового обновления и максимальный возраст значений (сек)
+ETH_FEE_REFRESH_INTERVAL_SECONDS = float(os.getenv('ETH_FEE_REFRESH_INTERVAL_SECONDS', '5'))
+ETH_FEE_MAX_AGE_SECONDS = float(os.getenv('ETH_FEE_MAX_AGE_SECONDS', '30'))
+# eth_feeHistory: число блоков, перцентиль priority fee и минимальный priority fee (wei)
+ETH_FEE_HISTORY_BLOCKS = int(os.getenv('ETH_FEE_HISTORY_BLOCKS', '10'))
+ETH_PRIORITY_FEE_PERCENTILE = float(os.getenv('ETH_PRIORITY_FEE_PERCENTILE', '50'))
+ETH_MIN_PRIORITY_FEE_WEI = int(os.getenv('ETH_MIN_PRIORITY_FEE_WEI', '1000000000'))
+
 MPC_NODE_1_URL = os.getenv('MPC_NODE_1_URL', 'http://localhost:8001')
 MPC_NODE_2_URL = os.getenv('MPC_NODE_2_URL', 'http://localhost:8002')
 MPC_NODE_3_URL = os.getenv('MPC_NODE_3_URL', 'http://localhost:8003')
 
+# Общий дедлайн на параллельный запрос шардов со всех 3 нод (сек)
+MPC_SHARD_DEADLINE_SECONDS = float(os.getenv('MPC_SHARD_DEADLINE_SECONDS', '5'))
+
+# Пул keep-alive соединений к каждой MPC ноде и политика повторов
+MPC_HTTP_POOL_SIZE = int(os.getenv('MPC_HTTP_POOL_SIZE', '10'))
+MPC_HTTP_RETRIES = int(os.getenv('MPC_HTTP_RETRIES', '2'))
+MPC_HTTP_RETRY_BACKOFF = float(os.getenv('MPC_HTTP_RETRY_BACKOFF', '0.1'))
+
+# Фоновая проверка MPC нод и БД для /api/health: интервал и таймаут запроса к ноде (сек)
+MPC_HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv('MPC_HEALTH_PROBE_INTERVAL_SECONDS', '5'))
+MPC_HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv('MPC_HEALTH_PROBE_TIMEOUT_SECONDS', '2'))
+# /api/health?fresh=1 (без авторизации): не чаще одной принудительной проверки за столько секунд
+MPC_HEALTH_FRESH_MIN_INTERVAL_SECONDS = float(os.getenv('MPC_HEALTH_FRESH_MIN_INTERVAL_SECONDS', '1'))
+
+# Аренда шардов: вместо /get_shard на каждую подпись API получает у нод шард с TTL и лимитом
+# использований (сек, штук; ноды могут урезать до своих LEASE_MAX_*) и держит ключ в памяти до
+# истечения или отзыва. Период сверки аренды с нодами (отзыв замечается не позже чем через него)
+MPC_SHARD_LEASES = os.getenv('MPC_SHARD_LEASES', 'False') == 'True'
+# Секрет API для подписи запросов к нодам (= LEASE_API_SECRET нод); нужен для аренды,
+# а ноды с заданным секретом отдают и /get_shard только подписанным запросам
+MPC_LEASE_SECRET = os.getenv('MPC_LEASE_SECRET', '')
+if MPC_SHARD_LEASES and not MPC_LEASE_SECRET:
+    raise ImproperlyConfigured('MPC_SHARD_LEASES requires MPC_LEASE_SECRET')
+MPC_LEASE_TTL_SECONDS = int(os.getenv('MPC_LEASE_TTL_SECONDS', '60'))
+MPC_LEASE_MAX_USES = int(os.getenv('MPC_LEASE_MAX_USES', '100'))
+MPC_LEASE_CHECK_INTERVAL_SECONDS = float(os.getenv('MPC_LEASE_CHECK_INTERVAL_SECONDS', '5'))
+
+# Async путь (ASGI): ASYNC_VIEWS=True направляет wallet/create, wallet/sign, wallet/bulk-send и health
+# на async views (запуск через uvicorn crypto_wallet_service.asgi:application).
+# Лимит одновременных соединений aiohttp к каждой MPC ноде
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False').lower() in ('true', '1', 'yes')
+MPC_ASYNC_POOL_SIZE = int(os.getenv('MPC_ASYNC_POOL_SIZE', '100'))
+
 # Время жизни запроса (защита от replay)
 REQUEST_EXPIRY_SECONDS = int(os.getenv('REQUEST_EXPIRY_SECONDS', '300'))
 
 # Требовать подпись запросов (timestamp + nonce + signature)
 REQUIRE_REQUEST_SIGNATURE = os.getenv('REQUIRE_REQUEST_SIGNATURE', 'False').lower() in ('true', '1', 'yes')
 
+# Хранилище использованных nonce: db (UsedNonce, общее для воркеров), cache (Django cache, общее),
+# memory (память процесса - только для одного воркера). Корзин памяти на окно REQUEST_EXPIRY_SECONDS
+REPLAY_CACHE_BACKEND = os.getenv('REPLAY_CACHE_BACKEND', 'db')
+REPLAY_CACHE_BUCKETS = int(os.getenv('REPLAY_CACHE_BUCKETS', '10'))
+# Backend db: как часто процесс удаляет истекшие UsedNonce по ходу запросов (0 - только purge_used_nonces)
+REPLAY_CACHE_PURGE_INTERVAL_SECONDS = float(os.getenv('REPLAY_CACHE_PURGE_INTERVAL_SECONDS', '300'))
+
+# Сколько HD индексов процесс резервирует в БД за раз (1 - без резервирования)
+HD_INDEX_BLOCK_SIZE = int(os.getenv('HD_INDEX_BLOCK_SIZE', '1'))
+
+# Пул заранее выведенных адресов для /api/wallet/create: целевой размер (0 - пул выключен),
+# порог доливки, адресов за одну доливку, период проверки глубины (сек)
+ADDRESS_POOL_SIZE = int(os.getenv('ADDRESS_POOL_SIZE', '0'))
+ADDRESS_POOL_LOW_WATER = int(os.getenv('ADDRESS_POOL_LOW_WATER', '50'))
+ADDRESS_POOL_FILL_BATCH = int(os.getenv('ADDRESS_POOL_FILL_BATCH', '100'))
+ADDRESS_POOL_CHECK_INTERVAL_SECONDS = float(os.getenv('ADDRESS_POOL_CHECK_INTERVAL_SECONDS', '5'))
+
+# Максимальный размер пачки в /api/wallet/create-batch
+WALLET_BATCH_MAX_SIZE = int(os.getenv('WALLET_BATCH_MAX_SIZE', '5000'))
+
+# Задания bulk-send: потоки в процессе API, размер чанка (чекпоинт), газ на транзакцию,
+# через сколько секунд без heartbeat задание считается брошенным, период опроса воркера
+BULK_SEND_WORKERS = int(os.getenv('BULK_SEND_WORKERS', '2'))
+BULK_SEND_CHUNK_SIZE = int(os.getenv('BULK_SEND_CHUNK_SIZE', '100'))
+BULK_SEND_GAS_PER_TX = int(os.getenv('BULK_SEND_GAS_PER_TX', '21000'))
+BULK_SEND_JOB_STALE_SECONDS = int(os.getenv('BULK_SEND_JOB_STALE_SECONDS', '300'))
+BULK_SEND_POLL_INTERVAL_SECONDS = float(os.getenv('BULK_SEND_POLL_INTERVAL_SECONDS', '5'))
+BULK_SEND_RESULTS_PAGE_SIZE = int(os.getenv('BULK_SEND_RESULTS_PAGE_SIZE', '1000'))
+
+# Потоковая загрузка получателей bulk-send: размер куска чтения тела (байт) и пачка проверки/вставки
+BULK_SEND_UPLOAD_READ_BYTES = int(os.getenv('BULK_SEND_UPLOAD_READ_BYTES', '65536'))
+BULK_SEND_UPLOAD_BATCH_SIZE = int(os.getenv('BULK_SEND_UPLOAD_BATCH_SIZE', '1000'))
+
+# Keyset пагинация /api/wallets и /api/transactions: размер страницы по умолчанию и максимум
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '100'))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '1000'))
+
+# Потоковый экспорт транзакций: строк на выборку курсора, размер куска ответа (байт), уровень gzip
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+EXPORT_BUFFER_BYTES = int(os.getenv('EXPORT_BUFFER_BYTES', '65536'))
+EXPORT_GZIP_LEVEL = int(os.getenv('EXPORT_GZIP_LEVEL', '6'))
+
+# Whitelist индекс (mmap файл address -> hd_path, общий для воркеров) и порог слияния delta
+WHITELIST_INDEX_PATH = os.getenv('WHITELIST_INDEX_PATH', str(BASE_DIR / 'data' / 'whitelist.idx'))
+WHITELIST_DELTA_MAX_RECORDS = int(os.getenv('WHITELIST_DELTA_MAX_RECORDS', '1000'))
+
+# Кэш seed и account-ноды (m/44'/60'/0'/0) в памяти: TTL (0 - выключен) и лимит записей
+KEY_CACHE_TTL_SECONDS = float(os.getenv('KEY_CACHE_TTL_SECONDS', '300'))
+KEY_CACHE_MAX_ENTRIES = int(os.getenv('KEY_CACHE_MAX_ENTRIES', '4'))
+
+# Адреса кошельков m/44'/60'/0'/0/<N> из сохраненного xpub account-ноды (без MPC нод и PBKDF2);
+# xpub выводится из шардов один раз и хранится в БД (AccountXpub)
+WATCH_ONLY_DERIVATION = os.getenv('WATCH_ONLY_DERIVATION', 'True') == 'True'
+# Как часто процесс перечитывает xpub из БД (после manage.py refresh_account_xpub), сек
+WATCH_ONLY_XPUB_RELOAD_SECONDS = float(os.getenv('WATCH_ONLY_XPUB_RELOAD_SECONDS', '30'))
+
 # Ключ для шифрования шардов
 SHARD_ENCRYPTION_KEY = os.getenv('SHARD_ENCRYPTION_KEY', '')
@@ -1,6 +1,13 @@
 import os
+import sys
+import json
+import time
+import uuid
+import sqlite3
+import hmac
 import hashlib
-from flask import Flask, jsonify
+from functools import wraps
+from flask import Flask, Response, jsonify, request
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 import base64
@@ -13,14 +20,28 @@ NODE_SHARD = os.getenv('NODE_SHARD', '')
 ENCRYPTION_KEY = os.getenv('SHARD_ENCRYPTION_KEY', '')
 
 
-def get_encryption_key():
+# Аренда шарда (lease): API держит собранный ключ в памяти до истечения TTL, исчерпания
+# числа использований или отзыва. 0 - аренда выключена, только /get_shard
+LEASE_API_SECRET = os.getenv('LEASE_API_SECRET', '')
+# Допустимое расхождение часов API и ноды для подписи запросов (сек)
+LEASE_SIGNATURE_MAX_SKEW_SECONDS = int(os.getenv('LEASE_SIGNATURE_MAX_SKEW_SECONDS', '30'))
+LEASE_MAX_TTL_SECONDS = int(os.getenv('LEASE_MAX_TTL_SECONDS', '60'))
+LEASE_MAX_USES = int(os.getenv('LEASE_MAX_USES', '100'))
+# Аренды в SQLite: общие для всех воркеров gunicorn (отзыв виден любому воркеру)
+LEASE_DB_PATH = os.getenv('LEASE_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'leases.sqlite3'))
+
+
+def get_encryption_key(binding: str = ''):
+    """
+    Ключ AES-256; binding (lease id и instance id) дает отдельный ключ для каждой аренды
+    """
     if not ENCRYPTION_KEY:
         raise Exception('SHARD_ENCRYPTION_KEY not set')
-    return hashlib.sha256(ENCRYPTION_KEY.encode()).digest()
+    return hashlib.sha256(f"{ENCRYPTION_KEY}{binding}".encode()).digest()
 
 
-def encrypt_shard(shard: str) -> str:
-    key = get_encryption_key()
+def encrypt_shard(shard: str, binding: str = '') -> str:
+    key = get_encryption_key(binding)
     iv = os.urandom(16)
     cipher = Cipher(algorithms.AES(key), modes.CFB(iv), backend=default_backend())
     encryptor = cipher.encryptor()
@@ -28,6 +49,83 @@ def encrypt_shard(shard: str) -> str:
     return base64.b64encode(iv + encrypted).decode()
 
 
+def decrypt_shard(encrypted_shard: str) -> str:
+    data = base64.b64decode(encrypted_shard)
+    cipher = Cipher(algorithms.AES(get_encryption_key()), modes.CFB(data[:16]), backend=default_backend())
+    decryptor = cipher.decryptor()
+    return (decryptor.update(data[16:]) + decryptor.finalize()).decode()
+
+
+def leases_enabled() -> bool:
+    return bool(LEASE_API_SECRET) and LEASE_MAX_TTL_SECONDS > 0 and LEASE_MAX_USES > 0
+
+
+def lease_binding(lease_id: str, instance_id: str) -> str:
+    # Секрет API входит в ключ аренды: одного SHARD_ENCRYPTION_KEY недостаточно для расшифровки
+    return f":{LEASE_API_SECRET}:{lease_id}:{instance_id}"
+
+
+def request_signature(secret: str, method: str, path: str, query: str, timestamp: str, body: bytes) -> str:
+    """
+    HMAC-SHA256 запроса API -> нода (так же считает wallet_api.shard_lease.sign_node_request)
+    """
+    message = f"{method}\n{path}\n{query}\n{timestamp}\n".encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def signature_error():
+    timestamp = request.headers.get('X-Node-Timestamp', '')
+    signature = request.headers.get('X-Node-Signature', '')
+    try:
+        skew = abs(time.time() - int(timestamp))
+    except ValueError:
+        return 'X-Node-Timestamp header is required'
+    if skew > LEASE_SIGNATURE_MAX_SKEW_SECONDS:
+        return 'Request timestamp expired'
+    expected = request_signature(
+        LEASE_API_SECRET, request.method, request.path,
+        request.query_string.decode(), timestamp, request.get_data()
+    )
+    if not hmac.compare_digest(expected, signature):
+        return 'Invalid request signature'
+    return None
+
+
+def require_api_signature(view):
+    """
+    Аренды (и /get_shard, когда аренды включены) - только для API с LEASE_API_SECRET
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if LEASE_API_SECRET:
+            error = signature_error()
+            if error:
+                return jsonify({'error': error}), 401
+        elif view.__name__ != 'get_shard':
+            return jsonify({'error': f'Leases disabled on node {NODE_ID} (LEASE_API_SECRET not set)'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def lease_db():
+    conn = sqlite3.connect(LEASE_DB_PATH, timeout=5)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init_lease_db():
+    os.makedirs(os.path.dirname(LEASE_DB_PATH), exist_ok=True)
+    with lease_db() as conn:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS leases ('
+            'lease_id TEXT PRIMARY KEY, instance_id TEXT NOT NULL, '
+            'created_at REAL NOT NULL, expires_at REAL NOT NULL, '
+            'max_uses INTEGER NOT NULL, uses INTEGER NOT NULL DEFAULT 0, '
+            'revoked INTEGER NOT NULL DEFAULT 0)'
+        )
+
+
 if NODE_SHARD:
     ENCRYPTED_SHARD = encrypt_shard(NODE_SHARD)
     del NODE_SHARD
@@ -35,31 +133,203 @@ else:
     ENCRYPTED_SHARD = ''
 
 
+# Ответы не меняются за время жизни процесса - JSON кодируется один раз при старте
+HEALTH_BODY = json.dumps({
+    'status': 'healthy',
+    'node_id': NODE_ID,
+    'port': NODE_PORT,
+    'has_shard': bool(ENCRYPTED_SHARD)
+}).encode()
+
+SHARD_BODY = json.dumps({
+    'encrypted_shard': ENCRYPTED_SHARD,
+    'node_id': NODE_ID
+}).encode()
+
+
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({
-        'status': 'healthy',
-        'node_id': NODE_ID,
-        'port': NODE_PORT,
-        'has_shard': bool(ENCRYPTED_SHARD)
-    })
+    return Response(HEALTH_BODY, mimetype='application/json')
 
 
 @app.route('/get_shard', methods=['GET'])
+@require_api_signature
 def get_shard():
     if not ENCRYPTED_SHARD:
         return jsonify({'error': f'NODE_SHARD not set for node {NODE_ID}'}), 500
     
+    return Response(SHARD_BODY, mimetype='application/json')
+
+
+def lease_state(row) -> dict:
+    return {
+        'lease_id': row['lease_id'],
+        'node_id': NODE_ID,
+        'instance_id': row['instance_id'],
+        'expires_at': row['expires_at'],
+        'max_uses': row['max_uses'],
+        'uses': row['uses'],
+        'revoked': bool(row['revoked'])
+    }
+
+
+@app.route('/lease', methods=['POST'])
+@require_api_signature
+def grant_lease():
+    """
+    Выдает аренду шарда: {instance_id, ttl_seconds?, max_uses?} -> шард, зашифрованный ключом аренды.
+    TTL и число использований ограничены настройками ноды
+    """
+    if not ENCRYPTED_SHARD:
+        return jsonify({'error': f'NODE_SHARD not set for node {NODE_ID}'}), 500
+    if not leases_enabled():
+        return jsonify({'error': f'Leases disabled on node {NODE_ID}'}), 403
+
+    data = request.get_json(silent=True) or {}
+    instance_id = str(data.get('instance_id') or '')
+    if not instance_id:
+        return jsonify({'error': 'instance_id is required'}), 400
+    try:
+        ttl_seconds = min(int(data.get('ttl_seconds') or LEASE_MAX_TTL_SECONDS), LEASE_MAX_TTL_SECONDS)
+        max_uses = min(int(data.get('max_uses') or LEASE_MAX_USES), LEASE_MAX_USES)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'ttl_seconds and max_uses must be integers'}), 400
+    if ttl_seconds <= 0 or max_uses <= 0:
+        return jsonify({'error': 'ttl_seconds and max_uses must be positive'}), 400
+
+    lease_id = uuid.uuid4().hex
+    now = time.time()
+    with lease_db() as conn:
+        conn.execute('DELETE FROM leases WHERE expires_at < ?', (now - LEASE_MAX_TTL_SECONDS,))
+        conn.execute(
+            'INSERT INTO leases (lease_id, instance_id, created_at, expires_at, max_uses) VALUES (?, ?, ?, ?, ?)',
+            (lease_id, instance_id, now, now + ttl_seconds, max_uses)
+        )
+
+    app.logger.info(f"Lease {lease_id} granted to {instance_id}: {ttl_seconds}s, {max_uses} uses")
     return jsonify({
-        'encrypted_shard': ENCRYPTED_SHARD,
-        'node_id': NODE_ID
-    })
+        'lease_id': lease_id,
+        'node_id': NODE_ID,
+        'encrypted_shard': encrypt_shard(decrypt_shard(ENCRYPTED_SHARD), lease_binding(lease_id, instance_id)),
+        'ttl_seconds': ttl_seconds,
+        'max_uses': max_uses,
+        'expires_at': now + ttl_seconds
+    }), 201
+
+
+def lease_response(row):
+    """
+    200 - аренда действует; 410 - отозвана, истекла или превышен лимит использований
+    """
+    state = lease_state(row)
+    if state['revoked']:
+        return jsonify({**state, 'error': 'Lease revoked'}), 410
+    if state['expires_at'] <= time.time():
+        return jsonify({**state, 'error': 'Lease expired'}), 410
+    return jsonify(state)
+
+
+def owned_lease(conn, lease_id: str, instance_id: str):
+    row = conn.execute('SELECT * FROM leases WHERE lease_id = ?', (lease_id,)).fetchone()
+    if row is None or row['instance_id'] != instance_id:
+        return None
+    return row
+
 
+@app.route('/lease/<lease_id>', methods=['GET'])
+@require_api_signature
+def check_lease(lease_id):
+    """
+    Статус аренды для ее владельца (?instance_id=...), без изменений
+    """
+    with lease_db() as conn:
+        row = owned_lease(conn, lease_id, request.args.get('instance_id', ''))
+    if row is None:
+        return jsonify({'error': 'Lease not found'}), 404
+    return lease_response(row)
 
-if __name__ == '__main__':
+
+@app.route('/lease/<lease_id>/uses', methods=['POST'])
+@require_api_signature
+def report_lease_uses(lease_id):
+    """
+    API сообщает, сколько раз использовал ключ: {instance_id, uses}.
+    Превышение max_uses отзывает аренду; счетчик только растет
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        uses = int(data.get('uses'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'uses must be an integer'}), 400
+
+    with lease_db() as conn:
+        row = owned_lease(conn, lease_id, str(data.get('instance_id') or ''))
+        if row is None:
+            return jsonify({'error': 'Lease not found'}), 404
+        if uses > row['uses']:
+            conn.execute(
+                'UPDATE leases SET uses = ?, revoked = revoked OR ? WHERE lease_id = ?',
+                (uses, int(uses > row['max_uses']), lease_id)
+            )
+            row = conn.execute('SELECT * FROM leases WHERE lease_id = ?', (lease_id,)).fetchone()
+    return lease_response(row)
+
+
+def revoke_leases(lease_id: str = None, instance_id: str = None) -> int:
+    with lease_db() as conn:
+        if lease_id is not None:
+            return conn.execute('UPDATE leases SET revoked = 1 WHERE lease_id = ?', (lease_id,)).rowcount
+        if instance_id is not None:
+            return conn.execute(
+                'UPDATE leases SET revoked = 1 WHERE instance_id = ? AND revoked = 0', (instance_id,)
+            ).rowcount
+        return conn.execute('UPDATE leases SET revoked = 1 WHERE revoked = 0').rowcount
+
+
+@app.route('/lease/<lease_id>', methods=['DELETE'])
+@require_api_signature
+def revoke_lease(lease_id):
+    """
+    Досрочное освобождение аренды ее владельцем
+    """
+    if not revoke_leases(lease_id=lease_id):
+        return jsonify({'error': 'Lease not found'}), 404
+    app.logger.info(f"Lease {lease_id} revoked")
+    return jsonify({'lease_id': lease_id, 'revoked': True})
+
+
+@app.route('/lease', methods=['DELETE'])
+@require_api_signature
+def revoke_instance_leases():
+    """
+    Отзыв всех аренд экземпляра API: DELETE /lease?instance_id=...
+    """
+    instance_id = request.args.get('instance_id', '')
+    if not instance_id:
+        return jsonify({'error': 'instance_id is required'}), 400
+    revoked = revoke_leases(instance_id=instance_id)
+    app.logger.info(f"{revoked} leases of {instance_id} revoked")
+    return jsonify({'instance_id': instance_id, 'revoked': revoked})
+
+
+init_lease_db()
+
+
+if __name__ == '__main__' and len(sys.argv) > 1 and sys.argv[1] == 'revoke-leases':
+    # Отзыв оператором ноды (по SSH, без сетевого доступа): python app.py revoke-leases [--instance ID | LEASE_ID]
+    args = sys.argv[2:]
+    if args[:1] == ['--instance'] and len(args) == 2:
+        count = revoke_leases(instance_id=args[1])
+    elif len(args) == 1:
+        count = revoke_leases(lease_id=args[0])
+    else:
+        count = revoke_leases()
+    print(f"Node {NODE_ID}: {count} leases revoked")
+elif __name__ == '__main__':
     print(f"Starting MPC Node {NODE_ID} on port {NODE_PORT}")
     if not ENCRYPTED_SHARD:
         print(f"WARNING: NODE_SHARD is not set!")
     else:
         print(f"Node {NODE_ID}: Shard encrypted and ready")
+    # Dev сервер Flask (один процесс); в контейнере по умолчанию - gunicorn, см. gunicorn.conf.py
     app.run(host='0.0.0.0', port=NODE_PORT, debug=False)
@@ -13,8 +13,11 @@ fi
 /usr/sbin/sshd
 
 echo "Starting MPC Node $NODE_ID"
-echo "  - Flask API: port $NODE_PORT"
+echo "  - Flask API: port $NODE_PORT (${NODE_SERVER:-gunicorn})"
 echo "  - SSH: port 22 (user: mpcadmin)"
 
-# Запуск Flask приложения
-exec python app.py
+# Запуск Flask приложения: gunicorn (по умолчанию) или dev сервер Flask (NODE_SERVER=flask)
+if [ "${NODE_SERVER:-gunicorn}" = "flask" ]; then
+    exec python app.py
+fi
+exec gunicorn -c gunicorn.conf.py app:app
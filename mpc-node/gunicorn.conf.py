@@ -0,0 +1,19 @@
+import os
+
+# Production режим ноды: gunicorn с потоковыми воркерами (gthread держит keep-alive соединения,
+# sync воркеры закрывают соединение после каждого ответа).
+# Запуск: gunicorn -c gunicorn.conf.py app:app
+
+bind = f"0.0.0.0:{os.getenv('NODE_PORT', '8001')}"
+worker_class = 'gthread'
+workers = int(os.getenv('NODE_WORKERS', str(min(4, (os.cpu_count() or 1) * 2))))
+threads = int(os.getenv('NODE_THREADS', '8'))
+keepalive = int(os.getenv('NODE_KEEPALIVE_SECONDS', '75'))
+backlog = 2048
+
+# Шард шифруется один раз в мастере, воркеры получают готовые байты ответа
+preload_app = True
+
+accesslog = None
+errorlog = '-'
+loglevel = os.getenv('NODE_LOG_LEVEL', 'warning')
@@ -112,17 +112,21 @@ def test_list_wallets():
     """Тест 3: Список всех кошельков"""
     print("\n3. Список всех кошельков...")
     
-    response = requests.get(
-        f"{BASE_URL}/api/wallets",
-        headers=headers
-    )
-    
-    if response.status_code != 200:
-        print(f"   Ошибка: {response.status_code}")
-        print(f"   Ответ: {response.text}")
-        sys.exit(1)
+    wallets = []
+    url = f"{BASE_URL}/api/wallets"
     
-    wallets = response.json()
+    # Список постраничный - идем по ссылкам next до конца
+    while url:
+        response = requests.get(url, headers=headers)
+        
+        if response.status_code != 200:
+            print(f"   Ошибка: {response.status_code}")
+            print(f"   Ответ: {response.text}")
+            sys.exit(1)
+        
+        page = response.json()
+        wallets.extend(page['results'])
+        url = page['next']
     
     print(f"   Всего кошельков: {len(wallets)}")
     for wallet in wallets:
@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.db import connection
+from .hd_index import get_hd_index_allocator
+from .models import Wallet
+
+logger = logging.getLogger(__name__)
+
+
+class AddressPool:
+    """
+    Пул заранее выведенных, еще не выданных адресов (Wallet с assigned=False).
+
+    Создание кошелька забирает адрес из пула одним UPDATE ... RETURNING (Wallet.claim_from_pool),
+    без MPC нод и деривации. Фоновый поток доливает пул до `size`, как только глубина
+    опускается ниже `low_water` (проверка раз в `interval` и сразу после выдачи адреса).
+    Пул пуст - создание идет по обычному пути. Несколько воркеров доливают независимо,
+    поэтому пул может превысить `size` не больше чем на batch_size на воркер.
+    """
+
+    def __init__(self, size: int, low_water: int, batch_size: int, interval: float):
+        self.size = size
+        self.low_water = min(low_water, size)
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.claimed = 0
+        self.misses = 0
+        self.filled = 0
+        self.last_fill_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def claim(self, count: int = 1, hd_paths: Optional[List[str]] = None) -> List[Wallet]:
+        """
+        До `count` адресов из пула (или адреса пула с путями hd_paths); недостающие создаются вызывающим кодом
+        """
+        wallets = Wallet.claim_from_pool(count, hd_paths)
+        with self._lock:
+            self.claimed += len(wallets)
+            self.misses += (len(hd_paths) if hd_paths else count) - len(wallets)
+        self._wake.set()
+        return wallets
+
+    def depth(self) -> int:
+        return Wallet.all_objects.filter(assigned=False).count()
+
+    def fill(self) -> int:
+        """
+        Доливает пул до `size` пачками по batch_size; возвращает число добавленных адресов
+        """
+        from .mpc_client import get_mpc_client
+
+        added = 0
+        allocator = get_hd_index_allocator()
+        while True:
+            # Глубина перечитывается перед каждой пачкой: пул могли долить другие воркеры
+            count = min(self.batch_size, self.size - self.depth())
+            if count <= 0:
+                break
+            wallets_data = get_mpc_client().generate_wallets(allocator.allocate(count))
+            Wallet.all_objects.bulk_create([
+                Wallet(address=wallet_data['address'], hd_path=wallet_data['hd_path'], assigned=False)
+                for wallet_data in wallets_data
+            ])
+            added += count
+
+        with self._lock:
+            self.filled += added
+            self.last_fill_at = time.time()
+        if added:
+            logger.info(f"Address pool refilled with {added} addresses")
+        return added
+
+    def _fill_loop(self):
+        while True:
+            try:
+                if self.depth() < self.low_water:
+                    self.fill()
+                self.last_error = None
+            except RuntimeError:
+                # Пул потоков MPC клиента закрыт - интерпретатор завершается
+                return
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Address pool refill failed: {e}")
+            finally:
+                # Поток живет долго: соединение закрывается по CONN_MAX_AGE или при ошибке, как в конце запроса
+                connection.close_if_unusable_or_obsolete()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None or not self.enabled:
+                return
+            self._thread = threading.Thread(target=self._fill_loop, name='address-pool-filler', daemon=True)
+            self._thread.start()
+
+    def stats(self) -> Dict:
+        """
+        Метрики пула: глубина (общая для воркеров) и счетчики процесса
+        """
+        with self._lock:
+            counters = {
+                'claimed': self.claimed,
+                'misses': self.misses,
+                'filled': self.filled,
+                'last_fill_at': self.last_fill_at,
+            }
+        return {
+            'depth': self.depth(),
+            'size': self.size,
+            'low_water': self.low_water,
+            **counters,
+            'last_error': self.last_error
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_address_pool() -> AddressPool:
+    """
+    Общий на процесс AddressPool (поток доливки запускается при первом обращении, если пул включен)
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = AddressPool(
+                    size=settings.ADDRESS_POOL_SIZE,
+                    low_water=settings.ADDRESS_POOL_LOW_WATER,
+                    batch_size=settings.ADDRESS_POOL_FILL_BATCH,
+                    interval=settings.ADDRESS_POOL_CHECK_INTERVAL_SECONDS
+                )
+                _pool.start()
+    return _pool
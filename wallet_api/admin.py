@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Wallet, UsedNonce, Transaction
+from .models import Wallet, UsedNonce, Transaction, HDIndexSequence, AccountXpub, AccountNonce, BulkSendJob, BulkSendItem
 
 
 @admin.register(Wallet)
@@ -32,3 +32,51 @@ class TransactionAdmin(admin.ModelAdmin):
 
     def has_add_permission(self, request):
         return False
+
+
+@admin.register(HDIndexSequence)
+class HDIndexSequenceAdmin(admin.ModelAdmin):
+    list_display = ['account_path', 'next_index']
+    readonly_fields = ['account_path', 'next_index']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(AccountXpub)
+class AccountXpubAdmin(admin.ModelAdmin):
+    list_display = ['account_path', 'xpub', 'created_at']
+    readonly_fields = ['account_path', 'xpub', 'created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(AccountNonce)
+class AccountNonceAdmin(admin.ModelAdmin):
+    list_display = ['address', 'chain_id', 'next_nonce', 'synced_at']
+    search_fields = ['address']
+    readonly_fields = ['address', 'chain_id', 'next_nonce', 'synced_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+class BulkSendItemInline(admin.TabularInline):
+    model = BulkSendItem
+    fields = ['position', 'recipient', 'status', 'nonce', 'tx_hash', 'error_message']
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+    max_num = 0
+
+
+@admin.register(BulkSendJob)
+class BulkSendJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'master_address', 'amount_eth', 'send_tx', 'status', 'processed', 'failed', 'total_recipients', 'created_at']
+    readonly_fields = ['master_address', 'amount_eth', 'send_tx', 'status', 'total_recipients', 'processed', 'failed', 'error_message', 'heartbeat_at', 'created_at', 'updated_at']
+    list_filter = ['status', 'send_tx', 'created_at']
+    inlines = [BulkSendItemInline]
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import logging
+from asgiref.sync import sync_to_async
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from .authentication import SHA256Authentication
+from .eth_client import aget_eth_client
+from .health import get_health_prober
+from .mpc_client import get_async_mpc_client
+from .serializers import CreateWalletSerializer, SignTransactionSerializer
+from .serializers_bulk import BulkSendSerializer
+from .views import BulkSendMixin, CreateWalletMixin, SignTransactionMixin
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAPIView(View):
+    """
+    Async аналог APIView для ASGI (DRF 3.15 не умеет async обработчики).
+
+    Та же аутентификация и тот же формат ответов: обработчики возвращают DRF Response,
+    тело - JSON. Ожидание MPC нод и RPC не занимает поток воркера;
+    ORM и индексы вызываются через sync_to_async.
+    """
+    authentication_classes = [SHA256Authentication]
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = getattr(self, request.method.lower(), None)
+        if request.method.lower() not in self.http_method_names or not asyncio.iscoroutinefunction(handler):
+            response = Response({'detail': f'Method "{request.method}" not allowed.'},
+                                status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        else:
+            try:
+                if self.authentication_classes:
+                    await sync_to_async(self.authenticate)(request)
+                response = await handler(request, *args, **kwargs)
+            except exceptions.APIException as e:
+                # Как в APIView: у SHA256Authentication нет WWW-Authenticate, поэтому 403
+                status_code = status.HTTP_403_FORBIDDEN if isinstance(
+                    e, (exceptions.AuthenticationFailed, exceptions.NotAuthenticated)
+                ) else e.status_code
+                response = Response({'detail': e.detail}, status=status_code)
+        return self.finalize_response(response)
+
+    def authenticate(self, request):
+        for authenticator in self.authentication_classes:
+            authenticator().authenticate(request)
+
+    def finalize_response(self, response):
+        response.accepted_renderer = JSONRenderer()
+        response.accepted_media_type = 'application/json'
+        response.renderer_context = {'view': self}
+        return response
+
+    def parse_json(self, request):
+        if not request.body:
+            return {}
+        try:
+            return json.loads(request.body)
+        except ValueError as e:
+            raise exceptions.ParseError(f'JSON parse error - {e}')
+
+
+class AsyncCreateWalletView(CreateWalletMixin, AsyncAPIView):
+    """
+    POST /api/wallet/create (ASGI)
+
+    Создает новый ETH кошелек через MPC ноды с HD деривацией (или выдает адрес из пула)
+    """
+
+    async def post(self, request):
+        serializer = CreateWalletSerializer(data=self.parse_json(request))
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        hd_path = serializer.validated_data.get('hd_path')
+
+        try:
+            wallet, hd_path = await sync_to_async(self.claim_or_allocate)(hd_path)
+            if wallet is None:
+                wallet_data = await get_async_mpc_client().generate_wallet(hd_path)
+                wallet = await sync_to_async(self.save_wallet)(wallet_data)
+            return await sync_to_async(self.created_response)(wallet)
+
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class AsyncSignTransactionView(SignTransactionMixin, AsyncAPIView):
+    """
+    POST /api/wallet/sign (ASGI)
+
+    Подписывает транзакцию через MPC ноды и отправляет в Infura testnet
+    """
+
+    async def post(self, request):
+        serializer = SignTransactionSerializer(data=self.parse_json(request))
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        address = serializer.validated_data['address']
+        to_address = serializer.validated_data['to']
+        amount = serializer.validated_data['amount']
+        send_tx = serializer.validated_data.get('send_tx', 0)
+
+        error_response = await sync_to_async(self.whitelist_error)(address, to_address)
+        if error_response:
+            return error_response
+
+        nonce_manager = None
+        reserved_nonce = None
+        broadcast_hash = None
+
+        try:
+            eth_client = await aget_eth_client()
+
+            if not eth_client.is_connected():
+                return Response(
+                    {'error': 'Failed to connect to Ethereum network'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+
+            fee_fields = await eth_client.fee_fields()
+            balance_wei = await eth_client.get_balance(address) if self.sweeps_balance(amount) else None
+            amount, amount_wei, error_response = self.transfer_amount(amount, fee_fields, balance_wei)
+            if error_response:
+                return error_response
+
+            nonce_manager = eth_client.nonce_manager
+            nonce = await sync_to_async(self.take_nonce)(nonce_manager, address, send_tx)
+            if send_tx == 1:
+                reserved_nonce = nonce
+
+            transaction = self.build_transaction(nonce, to_address, amount_wei, await eth_client.chain_id(), fee_fields)
+            sign_result = await get_async_mpc_client().sign_transaction(transaction, address)
+
+            if send_tx == 1:
+                broadcast_hash = sign_result['tx_hash']
+                logger.info(f"Broadcasting transaction {broadcast_hash} to network")
+                await eth_client.send_raw_transaction(sign_result['raw_transaction'])
+                logger.info(f"Transaction {broadcast_hash} sent successfully")
+
+        except Exception as e:
+            return await sync_to_async(self.failed_response)(
+                address, to_address, amount, e, nonce_manager, reserved_nonce, broadcast_hash
+            )
+
+        return await sync_to_async(self.signed_response)(address, to_address, amount, sign_result, send_tx)
+
+
+class AsyncBulkSendView(BulkSendMixin, AsyncAPIView):
+    """
+    POST /api/wallet/bulk-send (ASGI)
+
+    Ставит задание на отправку ETH с мастер кошелька (m/44'/60'/0'/0/0) на несколько адресов.
+    Подпись и отправка идут в фоне, прогресс - GET /api/wallet/bulk-send/<id>
+    """
+
+    async def post(self, request):
+        serializer = BulkSendSerializer(data=self.parse_json(request))
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        recipient_addresses = serializer.validated_data['eth_wallets']
+        amount_per_wallet = serializer.validated_data['amount']
+        send_tx = serializer.validated_data.get('send_tx', 0)
+
+        try:
+            eth_client = await aget_eth_client()
+
+            if not eth_client.is_connected():
+                return Response(
+                    {'error': 'Failed to connect to Ethereum network'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+
+            # Адрес мастер кошелька через MPC и цена газа - одновременно
+            master_wallet, fee_fields = await asyncio.gather(
+                get_async_mpc_client().generate_wallet(self.master_hd_path),
+                eth_client.fee_fields()
+            )
+            master_address = master_wallet['address']
+
+            error_response = await sync_to_async(self.recipients_error)(master_address, recipient_addresses)
+            if error_response:
+                return error_response
+
+            master_balance_wei = await eth_client.get_balance(master_address)
+            error_response = self.shortfall_error(
+                master_balance_wei, fee_fields, master_address, amount_per_wallet, len(recipient_addresses)
+            )
+            if error_response:
+                return error_response
+
+            return await sync_to_async(self.create_job)(master_address, amount_per_wallet, send_tx, recipient_addresses)
+
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class AsyncHealthView(AsyncAPIView):
+    """
+    GET /api/health (ASGI)
+
+    Состояние сервиса из снимка фоновой проверки; ?fresh=1 - принудительная проверка в потоке
+    (не чаще раза в MPC_HEALTH_FRESH_MIN_INTERVAL_SECONDS)
+    """
+    authentication_classes = []
+
+    async def get(self, request):
+        prober = get_health_prober()
+        if request.GET.get('fresh') == '1':
+            health = prober.cached(max_age=prober.fresh_interval)
+            if health is None:
+                health = await sync_to_async(prober.fresh, thread_sensitive=False)()
+        else:
+            health = prober.cached()
+            if health is None:
+                health = await sync_to_async(prober.probe, thread_sensitive=False)()
+
+        status_code = status.HTTP_200_OK if health['status'] == 'healthy' else status.HTTP_503_SERVICE_UNAVAILABLE
+        return Response(health, status=status_code)
@@ -1,9 +1,10 @@
 import hashlib
+import hmac
 import time
 from rest_framework import exceptions
 from rest_framework.authentication import BaseAuthentication
 from django.conf import settings
-from django.db import IntegrityError
+from .replay_cache import get_replay_cache
 
 
 class SHA256Authentication(BaseAuthentication):
@@ -16,8 +17,6 @@ class SHA256Authentication(BaseAuthentication):
     """
     
     def authenticate(self, request):
-        from .models import UsedNonce
-        
         api_key = request.META.get('HTTP_X_API_KEY')
         
         # Проверка API ключа
@@ -61,31 +60,44 @@ class SHA256Authentication(BaseAuthentication):
         except ValueError:
             raise exceptions.AuthenticationFailed('Invalid timestamp format')
         
-        # Проверка nonce (защита от replay)
-        if UsedNonce.objects.filter(nonce=nonce).exists():
-            raise exceptions.AuthenticationFailed('Nonce already used - replay attack detected')
-        
-        # Получаем тело запроса
-        try:
-            body = request.body.decode('utf-8') if request.body else ''
-        except Exception:
-            body = ''
-        
-        # Вычисляем ожидаемую подпись: SHA256(key + timestamp + nonce + body)
-        message = f"{api_key}{timestamp}{nonce}{body}"
-        expected_signature = hashlib.sha256(message.encode()).hexdigest()
-        
-        # Проверяем подпись
-        if signature != expected_signature:
+        self.check_body_signature(request, BodySignature(api_key, timestamp, nonce, signature))
+        return (None, None)
+    
+    def check_body_signature(self, request, body_signature):
+        body_signature.update(request.body)
+        body_signature.verify()
+
+
+class StreamingSHA256Authentication(SHA256Authentication):
+    """
+    SHA256Authentication для потоковой загрузки: тело не читается целиком.
+    View прогоняет каждый прочитанный кусок через request.body_signature.update()
+    и в конце вызывает request.body_signature.verify() (при REQUIRE_REQUEST_SIGNATURE).
+    """
+    
+    def check_body_signature(self, request, body_signature):
+        request.body_signature = body_signature
+
+
+class BodySignature:
+    """
+    Инкрементальная проверка X-Signature = SHA256(key + timestamp + nonce + body)
+    """
+    
+    def __init__(self, api_key: str, timestamp: str, nonce: str, signature: str):
+        self._hash = hashlib.sha256(f"{api_key}{timestamp}{nonce}".encode())
+        self.signature = signature
+        self.nonce = nonce
+        self.timestamp = int(timestamp)
+    
+    def update(self, chunk: bytes):
+        self._hash.update(chunk)
+    
+    def verify(self):
+        if not hmac.compare_digest(self._hash.hexdigest(), self.signature):
             raise exceptions.AuthenticationFailed('Invalid signature')
         
-        # Сохраняем nonce
-        try:
-            UsedNonce.objects.create(nonce=nonce, timestamp=request_time)
-            # Чистка старых nonce
-            if int(time.time()) % 60 == 0:
-                UsedNonce.cleanup_old_nonces()
-        except IntegrityError:
+        # Проверка и сохранение nonce одной атомарной операцией (защита от replay).
+        # Делается после проверки подписи - неподписанные запросы не засоряют хранилище
+        if not get_replay_cache().check_and_store(self.nonce, self.timestamp):
             raise exceptions.AuthenticationFailed('Nonce already used - replay attack detected')
-        
-        return (None, None)
@@ -0,0 +1,322 @@
+import datetime
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from web3.exceptions import TransactionNotFound
+from .eth_client import get_eth_client
+from .models import BulkSendJob, BulkSendItem, Transaction
+from .mpc_client import get_mpc_client
+
+logger = logging.getLogger(__name__)
+
+# Ответы ноды на повторную отправку уже принятой транзакции (после рестарта воркера)
+ALREADY_KNOWN_ERRORS = ('already known', 'known transaction', 'alreadyknown')
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.BULK_SEND_WORKERS,
+                    thread_name_prefix='bulk-send'
+                )
+    return _executor
+
+
+def enqueue(job_id: int):
+    """
+    Ставит задание в пул воркеров текущего процесса
+    """
+    _get_executor().submit(_run_in_thread, job_id)
+
+
+def _run_in_thread(job_id: int):
+    close_old_connections()
+    try:
+        process_job(job_id)
+    except Exception:
+        logger.exception(f"Bulk-send job {job_id} crashed")
+    finally:
+        close_old_connections()
+
+
+def claim_job(job_id: int) -> bool:
+    """
+    Атомарно забирает задание: новое или брошенное (heartbeat старше BULK_SEND_JOB_STALE_SECONDS)
+    """
+    now = timezone.now()
+    stale_before = now - datetime.timedelta(seconds=settings.BULK_SEND_JOB_STALE_SECONDS)
+    claimed = BulkSendJob.objects.filter(
+        Q(status=BulkSendJob.STATUS_PENDING) |
+        Q(status=BulkSendJob.STATUS_RUNNING, heartbeat_at__lt=stale_before),
+        pk=job_id,
+    ).update(status=BulkSendJob.STATUS_RUNNING, heartbeat_at=now)
+    return bool(claimed)
+
+
+def resumable_job_ids() -> List[int]:
+    """
+    Задания, которые ждут обработки или брошены упавшим воркером
+    """
+    stale_before = timezone.now() - datetime.timedelta(seconds=settings.BULK_SEND_JOB_STALE_SECONDS)
+    return list(BulkSendJob.objects.filter(
+        Q(status=BulkSendJob.STATUS_PENDING) |
+        Q(status=BulkSendJob.STATUS_RUNNING, heartbeat_at__lt=stale_before)
+    ).order_by('created_at').values_list('pk', flat=True))
+
+
+def process_job(job_id: int):
+    """
+    Обрабатывает задание чанками по BULK_SEND_CHUNK_SIZE.
+
+    Чекпоинты: подписанные транзакции сохраняются (status=signed, raw tx, nonce)
+    до отправки, поэтому после падения воркера чанк дообрабатывается повторной
+    отправкой тех же raw транзакций - без новой подписи и без двойных nonce.
+    """
+    if not claim_job(job_id):
+        logger.info(f"Bulk-send job {job_id} is not claimable, skipping")
+        return
+
+    job = BulkSendJob.objects.get(pk=job_id)
+    logger.info(f"Bulk-send job {job_id}: started ({job.processed}/{job.total_recipients} done)")
+
+    # Транзакции с неизвестным исходом отправки: в этом проходе больше не берутся
+    deferred = []
+    try:
+        while True:
+            chunk = list(
+                job.items.filter(status__in=[BulkSendItem.STATUS_PENDING, BulkSendItem.STATUS_SIGNED])
+                .exclude(pk__in=deferred)
+                .order_by('position')[:settings.BULK_SEND_CHUNK_SIZE]
+            )
+            if not chunk:
+                break
+            deferred.extend(_process_chunk(job, chunk))
+            BulkSendJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now())
+    except Exception as e:
+        logger.error(f"Bulk-send job {job_id}: FAILED - {e}")
+        BulkSendJob.objects.filter(pk=job.pk).update(
+            status=BulkSendJob.STATUS_FAILED,
+            error_message=str(e)
+        )
+        return
+
+    if deferred:
+        # Обратно в очередь: воркер переотправит их позже ("already known" или receipt - ok)
+        BulkSendJob.objects.filter(pk=job.pk).update(status=BulkSendJob.STATUS_PENDING)
+        logger.info(f"Bulk-send job {job_id}: {len(deferred)} transactions with unknown outcome, requeued")
+        return
+
+    BulkSendJob.objects.filter(pk=job.pk).update(status=BulkSendJob.STATUS_DONE)
+    logger.info(f"Bulk-send job {job_id}: done")
+
+
+def _process_chunk(job: BulkSendJob, chunk: List[BulkSendItem]) -> List[int]:
+    """
+    Подпись и отправка чанка; возвращает pk items, оставшихся signed (исход отправки неизвестен)
+    """
+    eth_client = get_eth_client()
+    pending = [item for item in chunk if item.status == BulkSendItem.STATUS_PENDING]
+
+    if pending:
+        _sign_items(job, eth_client, pending)
+
+    signed = [item for item in chunk if item.status == BulkSendItem.STATUS_SIGNED]
+    if job.send_tx and signed:
+        _broadcast_items(job, eth_client, signed)
+    else:
+        for item in signed:
+            item.status = BulkSendItem.STATUS_OK
+
+    finished = [item for item in chunk if item.status in (BulkSendItem.STATUS_OK, BulkSendItem.STATUS_ERROR)]
+    failed = sum(1 for item in finished if item.status == BulkSendItem.STATUS_ERROR)
+
+    with transaction.atomic():
+        BulkSendItem.objects.bulk_update(finished, ['status', 'nonce', 'tx_hash', 'error_message'])
+        Transaction.objects.bulk_create([
+            Transaction(
+                tx_hash=item.tx_hash if item.status == BulkSendItem.STATUS_OK else 'ERROR',
+                from_address=job.master_address,
+                to_address=item.recipient,
+                amount_eth=job.amount_eth,
+                status=Transaction.STATUS_OK if item.status == BulkSendItem.STATUS_OK else Transaction.STATUS_ERROR,
+                error_message=item.error_message,
+                broadcasted=job.send_tx and item.status == BulkSendItem.STATUS_OK
+            )
+            for item in finished
+        ])
+        BulkSendJob.objects.filter(pk=job.pk).update(
+            processed=job.processed + len(finished),
+            failed=job.failed + failed
+        )
+    job.processed += len(finished)
+    job.failed += failed
+
+    logger.info(f"Bulk-send job {job.pk}: {job.processed}/{job.total_recipients} processed, {job.failed} failed")
+
+    return [item.pk for item in chunk if item.status == BulkSendItem.STATUS_SIGNED]
+
+
+def _assign_nonces(job: BulkSendJob, nonce_manager, items: List[BulkSendItem]):
+    """
+    Nonce для чанка. С отправкой - резерв в той же транзакции, что и запись nonce в items:
+    после падения воркера items получают те же nonce, а не новые (без пропуска в счетчике).
+    Без отправки - base_nonce задания + позиция, одинаковый для всех чанков
+    """
+    if not job.send_tx:
+        if job.base_nonce is None:
+            job.base_nonce = nonce_manager.peek(job.master_address)
+            BulkSendJob.objects.filter(pk=job.pk, base_nonce__isnull=True).update(base_nonce=job.base_nonce)
+            job.base_nonce = BulkSendJob.objects.values_list('base_nonce', flat=True).get(pk=job.pk)
+        for item in items:
+            item.nonce = job.base_nonce + item.position
+        return
+
+    unassigned = [item for item in items if item.nonce is None]
+    if not unassigned:
+        return
+    with transaction.atomic():
+        nonce = nonce_manager.reserve(job.master_address, len(unassigned))
+        for i, item in enumerate(unassigned):
+            item.nonce = nonce + i
+        BulkSendItem.objects.bulk_update(unassigned, ['nonce'])
+
+
+def _sign_items(job: BulkSendJob, eth_client, items: List[BulkSendItem]):
+    """
+    Назначает nonce и подписывает чанк одним восстановлением ключа; результат - чекпоинт
+    """
+    w3 = eth_client.w3
+    nonce_manager = eth_client.nonce_manager
+    _assign_nonces(job, nonce_manager, items)
+
+    fee_fields = eth_client.fee_oracle.fee_fields()
+    amount_wei = w3.to_wei(job.amount_eth, 'ether')
+    chain_id = eth_client.chain_id
+
+    unsigned_transactions = [
+        {
+            'nonce': item.nonce,
+            'to': item.recipient,
+            'value': amount_wei,
+            'gas': settings.BULK_SEND_GAS_PER_TX,
+            'chainId': chain_id,
+            **fee_fields
+        }
+        for item in items
+    ]
+
+    try:
+        sign_results = get_mpc_client().sign_transactions(job.master_address, unsigned_transactions)
+    except Exception:
+        if job.send_tx:
+            # Задание упадет: nonce чанка освобождаются, если они последние выданные;
+            # иначе остаются за items и переиспользуются при повторе задания (--retry-failed)
+            if _release_nonces(job, nonce_manager, items):
+                BulkSendItem.objects.bulk_update(items, ['nonce'])
+        raise
+
+    for item, sign_result in zip(items, sign_results):
+        if 'error' in sign_result:
+            item.status = BulkSendItem.STATUS_ERROR
+            item.error_message = sign_result['error']
+        else:
+            item.status = BulkSendItem.STATUS_SIGNED
+            item.raw_transaction = sign_result['raw_transaction']
+            item.tx_hash = sign_result['tx_hash']
+
+    if job.send_tx:
+        _release_failed_nonces(job, nonce_manager, items)
+
+    BulkSendItem.objects.bulk_update(items, ['status', 'nonce', 'raw_transaction', 'tx_hash', 'error_message'])
+
+
+def _release_nonces(job: BulkSendJob, nonce_manager, items: List[BulkSendItem]) -> bool:
+    """
+    Возвращает nonce items в счетчик (условный откат - только с вершины счетчика)
+    и сбрасывает их у items. False - nonce не подряд или за ними уже выданы другие
+    """
+    nonces = sorted(item.nonce for item in items if item.nonce is not None)
+    if not nonces or nonces != list(range(nonces[0], nonces[0] + len(nonces))):
+        return False
+    if not nonce_manager.release(job.master_address, nonces[0], len(nonces)):
+        return False
+    for item in items:
+        item.nonce = None
+    return True
+
+
+def _release_failed_nonces(job: BulkSendJob, nonce_manager, items: List[BulkSendItem]):
+    """
+    Транзакции с ошибкой в сеть не уйдут: освобождаются nonce хвоста чанка, а ошибка
+    в середине оставляет пропуск - транзакции за ним ждут его заполнения
+    """
+    by_nonce = sorted(items, key=lambda item: item.nonce)
+    trailing = []
+    while by_nonce and by_nonce[-1].status == BulkSendItem.STATUS_ERROR:
+        trailing.append(by_nonce.pop())
+    if trailing:
+        _release_nonces(job, nonce_manager, trailing)
+
+    gaps = sorted(item.nonce for item in items if item.status == BulkSendItem.STATUS_ERROR and item.nonce is not None)
+    if gaps:
+        logger.warning(f"Bulk-send job {job.pk}: nonces {gaps} of {job.master_address} are not used, later transactions wait for them")
+
+
+def _broadcast_items(job: BulkSendJob, eth_client, items: List[BulkSendItem]):
+    """
+    Отправка подписанных транзакций. Ошибка ответа не значит, что сеть транзакцию не приняла:
+    принятая, но еще не смайненная лежит в mempool без receipt. Исход неизвестен - item
+    остается signed и переотправляется позже; ошибкой считается только транзакция, которой
+    в сети точно нет
+    """
+    results = eth_client.send_raw_transactions([item.raw_transaction for item in items])
+
+    failed = False
+    unknown = False
+    for item, result in zip(items, results):
+        error = result.get('error')
+        if not error or any(marker in error.lower() for marker in ALREADY_KNOWN_ERRORS) \
+                or _is_mined(eth_client, item.tx_hash):
+            item.status = BulkSendItem.STATUS_OK
+            continue
+
+        known = eth_client.transaction_known(item.tx_hash)
+        if known:
+            item.status = BulkSendItem.STATUS_OK
+        elif known is None:
+            logger.warning(f"Bulk-send job {job.pk}: broadcast of {item.tx_hash} failed ({error}), outcome unknown")
+            unknown = True
+        else:
+            item.status = BulkSendItem.STATUS_ERROR
+            item.error_message = f"Broadcast failed: {error}"
+            failed = True
+
+    # Пока исход части транзакций неизвестен, счетчик не трогаем
+    if failed and not unknown:
+        _release_failed_nonces(job, eth_client.nonce_manager, items)
+        eth_client.nonce_manager.resync(job.master_address)
+
+
+def _is_mined(eth_client, tx_hash: str) -> bool:
+    """
+    Транзакция уже в блоке (повторная отправка после рестарта дает "nonce too low")
+    """
+    try:
+        receipt = eth_client.w3.eth.get_transaction_receipt(tx_hash)
+    except TransactionNotFound:
+        return False
+    except Exception as e:
+        logger.warning(f"Receipt check for {tx_hash} failed: {e}")
+        return False
+    return receipt.get('status', 1) == 1
@@ -0,0 +1,137 @@
+import csv
+import json
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from .whitelist import checksum_address
+
+FORMAT_CSV = 'csv'
+FORMAT_NDJSON = 'ndjson'
+
+# Content-Type потоковой загрузки -> формат
+CONTENT_TYPE_FORMATS = {
+    'text/csv': FORMAT_CSV,
+    'application/x-ndjson': FORMAT_NDJSON,
+    'application/jsonl': FORMAT_NDJSON,
+}
+
+# Строка длиннее - явно не адрес; ограничивает буфер, если в потоке нет переводов строк
+MAX_LINE_BYTES = 1024
+
+# Адрес во временном файле загрузки - запись фиксированной длины
+ADDRESS_RECORD_BYTES = 42
+
+
+class UploadError(Exception):
+    def __init__(self, message: str, line: Optional[int] = None):
+        self.line = line
+        super().__init__(f"Line {line}: {message}" if line else message)
+
+
+def iter_lines(read: Callable[[int], bytes], chunk_bytes: int,
+               on_chunk: Optional[Callable[[bytes], None]] = None) -> Iterator[Tuple[int, bytes]]:
+    """
+    (номер строки, строка) из потока, читая по chunk_bytes.
+    В памяти - только текущий кусок и хвост незавершенной строки.
+    on_chunk получает каждый прочитанный кусок (например, для хэша подписи).
+    """
+    tail = b''
+    line_no = 0
+    while True:
+        chunk = read(chunk_bytes)
+        if not chunk:
+            break
+        if on_chunk is not None:
+            on_chunk(chunk)
+
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+        for line in lines:
+            line_no += 1
+            yield line_no, line
+        if len(tail) > MAX_LINE_BYTES:
+            raise UploadError('Line is too long', line_no + 1)
+
+    if tail:
+        yield line_no + 1, tail
+
+
+def _decode(line_no: int, line: bytes) -> str:
+    try:
+        return line.decode('utf-8').strip()
+    except UnicodeDecodeError:
+        raise UploadError('Not valid UTF-8', line_no)
+
+
+def _csv_addresses(lines: Iterable[Tuple[int, bytes]]) -> Iterator[Tuple[int, str]]:
+    # Адрес - первая колонка или колонка address, если есть строка заголовка
+    column = 0
+    first_row = True
+    for line_no, line in lines:
+        text = _decode(line_no, line)
+        if not text:
+            continue
+        row = next(csv.reader([text]))
+        if first_row:
+            first_row = False
+            header = [cell.strip().lower() for cell in row]
+            if 'address' in header:
+                column = header.index('address')
+                continue
+        if column >= len(row):
+            raise UploadError('Address column is missing', line_no)
+        yield line_no, row[column].strip()
+
+
+def _ndjson_addresses(lines: Iterable[Tuple[int, bytes]]) -> Iterator[Tuple[int, str]]:
+    # Строка - {"address": "0x..."} или просто "0x..."
+    for line_no, line in lines:
+        text = _decode(line_no, line)
+        if not text:
+            continue
+        try:
+            value = json.loads(text)
+        except ValueError:
+            raise UploadError('Invalid JSON', line_no)
+        if isinstance(value, dict):
+            value = value.get('address')
+        if not isinstance(value, str):
+            raise UploadError('Expected an address string or {"address": ...}', line_no)
+        yield line_no, value.strip()
+
+
+def iter_recipients(lines: Iterable[Tuple[int, bytes]], upload_format: str) -> Iterator[str]:
+    """
+    Адреса получателей (в checksum форме) из строк CSV/NDJSON с проверкой формата адреса
+    """
+    parse = _csv_addresses if upload_format == FORMAT_CSV else _ndjson_addresses
+    for line_no, value in parse(lines):
+        address = checksum_address(value)
+        if address is None:
+            raise UploadError(f'Invalid address: {value[:64]}', line_no)
+        yield address
+
+
+def spool(addresses: Iterable[str], spool_file) -> int:
+    """
+    Пишет проверенные адреса во временный файл (ADDRESS_RECORD_BYTES на адрес); возвращает их число
+    """
+    count = 0
+    for address in addresses:
+        spool_file.write(address.encode('ascii'))
+        count += 1
+    spool_file.flush()
+    return count
+
+
+def iter_spooled(spool_file, size: int) -> Iterator[List[str]]:
+    """
+    Пачки по size адресов из файла spool(), с начала файла
+    """
+    spool_file.seek(0)
+    while True:
+        data = spool_file.read(size * ADDRESS_RECORD_BYTES)
+        if not data:
+            break
+        yield [
+            data[offset:offset + ADDRESS_RECORD_BYTES].decode('ascii')
+            for offset in range(0, len(data), ADDRESS_RECORD_BYTES)
+        ]
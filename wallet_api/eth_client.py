@@ -0,0 +1,238 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+import aiohttp
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from web3 import AsyncWeb3, Web3
+from web3.exceptions import TransactionNotFound
+from .fee_oracle import FeeOracle
+from .nonce_manager import NonceManager
+
+logger = logging.getLogger(__name__)
+
+
+class EthClient:
+    """
+    Долгоживущий Web3 клиент для одной сети Infura.
+
+    Держит пул keep-alive соединений к RPC, запоминает chain id
+    и проверяет доступность сети в фоновом потоке, а не на пути запроса.
+    """
+
+    def __init__(self, network: str, api_key: str):
+        self.network = network
+        self.rpc_url = f"https://{network}.infura.io/v3/{api_key}"
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.ETH_RPC_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.w3 = Web3(Web3.HTTPProvider(
+            self.rpc_url,
+            request_kwargs={'timeout': settings.ETH_RPC_TIMEOUT_SECONDS},
+            session=self.session
+        ))
+
+        self.fee_oracle = FeeOracle(self.w3)
+        self.nonce_manager = NonceManager(self)
+
+        self._chain_id: Optional[int] = None
+        self._connected: Optional[bool] = None
+        self.last_probe_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._probe_thread: Optional[threading.Thread] = None
+
+    def probe(self) -> bool:
+        """
+        Проверяет соединение с сетью и при первом успехе запоминает chain id
+        """
+        try:
+            connected = self.w3.is_connected()
+            if connected and self._chain_id is None:
+                self._chain_id = self.w3.eth.chain_id
+        except Exception as e:
+            logger.warning(f"Ethereum RPC probe failed ({self.network}): {e}")
+            connected = False
+
+        self._connected = connected
+        self.last_probe_at = time.time()
+        return connected
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(settings.ETH_HEALTH_PROBE_INTERVAL_SECONDS)
+            self.probe()
+
+    def start(self):
+        """
+        Первичная проверка (заодно запоминает chain id и цену газа)
+        и запуск фоновых потоков проверки сети и обновления цены газа
+        """
+        with self._lock:
+            if self._probe_thread is not None:
+                return
+            if self.probe():
+                try:
+                    self.fee_oracle.refresh()
+                except Exception as e:
+                    logger.warning(f"Initial fee refresh failed: {e}")
+            self.fee_oracle.start()
+            self._probe_thread = threading.Thread(
+                target=self._probe_loop,
+                name=f'eth-probe-{self.network}',
+                daemon=True
+            )
+            self._probe_thread.start()
+
+    def is_connected(self) -> bool:
+        """
+        Последний результат фоновой проверки (без RPC вызова)
+        """
+        return bool(self._connected)
+
+    def transaction_known(self, tx_hash: str) -> Optional[bool]:
+        """
+        Знает ли сеть транзакцию (в mempool или в блоке) - ответ на отправку мог потеряться.
+        None - проверить не удалось, исход неизвестен
+        """
+        try:
+            self.w3.eth.get_transaction(tx_hash)
+            return True
+        except TransactionNotFound:
+            return False
+        except Exception as e:
+            logger.warning(f"Transaction lookup for {tx_hash} failed: {e}")
+            return None
+
+    def send_raw_transactions(self, raw_transactions: List[str]) -> List[Dict]:
+        """
+        Отправка подписанных транзакций JSON-RPC батчами по ETH_RPC_BATCH_SIZE.
+
+        Порядок элементов (и nonce) сохраняется, батчи уходят последовательно.
+        Результат по каждой транзакции: {'tx_hash': ...} или {'error': ...};
+        ошибка одного элемента не прерывает остальные.
+        """
+        results: List[Dict] = []
+        chunk_size = max(1, settings.ETH_RPC_BATCH_SIZE)
+
+        for start in range(0, len(raw_transactions), chunk_size):
+            chunk = raw_transactions[start:start + chunk_size]
+            payload = [
+                {'jsonrpc': '2.0', 'id': start + i, 'method': 'eth_sendRawTransaction', 'params': [raw_tx]}
+                for i, raw_tx in enumerate(chunk)
+            ]
+
+            try:
+                response = self.session.post(
+                    self.rpc_url,
+                    json=payload,
+                    timeout=settings.ETH_RPC_TIMEOUT_SECONDS
+                )
+                response.raise_for_status()
+                replies = response.json()
+                if not isinstance(replies, list):
+                    # Провайдер отклонил батч целиком (например, rate limit)
+                    raise Exception(replies.get('error', replies) if isinstance(replies, dict) else replies)
+                by_id = {reply.get('id'): reply for reply in replies}
+            except Exception as e:
+                logger.error(f"Batch broadcast of {len(chunk)} transactions failed: {e}")
+                results.extend({'error': str(e)} for _ in chunk)
+                continue
+
+            for item in payload:
+                reply = by_id.get(item['id'])
+                if reply is None:
+                    results.append({'error': 'No response for batch element'})
+                elif 'error' in reply:
+                    error = reply['error']
+                    results.append({'error': error.get('message', str(error)) if isinstance(error, dict) else str(error)})
+                else:
+                    results.append({'tx_hash': reply.get('result')})
+
+        return results
+
+    @property
+    def chain_id(self) -> int:
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+
+_clients: Dict[str, EthClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_eth_client(network: Optional[str] = None) -> EthClient:
+    """
+    Общий на процесс EthClient для сети (по умолчанию settings.INFURA_NETWORK)
+    """
+    network = network or settings.INFURA_NETWORK
+    client = _clients.get(network)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(network)
+            if client is None:
+                client = EthClient(network, settings.INFURA_API_KEY)
+                client.start()
+                _clients[network] = client
+    return client
+
+
+class AsyncEthClient:
+    """
+    Async RPC (AsyncWeb3) поверх EthClient для ASGI views.
+
+    Состояние общее с EthClient: фоновая проверка сети, chain id, кэш цены газа
+    и NonceManager (вызовы БД - через sync_to_async).
+    """
+
+    def __init__(self, eth_client: EthClient):
+        self.eth_client = eth_client
+        self.network = eth_client.network
+        self.w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(
+            eth_client.rpc_url,
+            request_kwargs={'timeout': aiohttp.ClientTimeout(total=settings.ETH_RPC_TIMEOUT_SECONDS)}
+        ))
+
+    def is_connected(self) -> bool:
+        return self.eth_client.is_connected()
+
+    async def chain_id(self) -> int:
+        if self.eth_client._chain_id is None:
+            self.eth_client._chain_id = await self.w3.eth.chain_id
+        return self.eth_client._chain_id
+
+    async def fee_fields(self) -> Dict:
+        # Обычно готовый снимок; при устаревшем кэше - синхронный refresh в потоке
+        return await sync_to_async(self.eth_client.fee_oracle.fee_fields, thread_sensitive=False)()
+
+    async def get_balance(self, address: str) -> int:
+        return await self.w3.eth.get_balance(address)
+
+    async def send_raw_transaction(self, raw_transaction: str):
+        return await self.w3.eth.send_raw_transaction(raw_transaction)
+
+    @property
+    def nonce_manager(self):
+        # Счетчик nonce в БД - вызовы через sync_to_async
+        return self.eth_client.nonce_manager
+
+
+_async_clients: Dict[str, AsyncEthClient] = {}
+
+
+async def aget_eth_client(network: Optional[str] = None) -> AsyncEthClient:
+    """
+    Общий на процесс AsyncEthClient; EthClient создается (и запускается) в потоке
+    """
+    network = network or settings.INFURA_NETWORK
+    client = _async_clients.get(network)
+    if client is None:
+        eth_client = await sync_to_async(get_eth_client, thread_sensitive=False)(network)
+        client = _async_clients.setdefault(network, AsyncEthClient(eth_client))
+    return client
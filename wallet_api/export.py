@@ -0,0 +1,112 @@
+import csv
+import json
+import zlib
+from typing import Iterable, Iterator, List
+from django.conf import settings
+from .serializers import TransactionSerializer
+
+FORMAT_NDJSON = 'ndjson'
+FORMAT_CSV = 'csv'
+FORMATS = (FORMAT_NDJSON, FORMAT_CSV)
+
+CONTENT_TYPES = {
+    FORMAT_NDJSON: 'application/x-ndjson',
+    FORMAT_CSV: 'text/csv; charset=utf-8',
+}
+
+TRANSACTION_FIELDS = [
+    'tx_hash',
+    'from_address',
+    'to_address',
+    'amount_eth',
+    'status',
+    'error_message',
+    'broadcasted',
+    'created_at',
+]
+
+
+class _Echo:
+    """
+    Псевдо-файл для csv.writer: write() возвращает строку, а не пишет ее
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def iter_rows(queryset, fields: List[str]) -> Iterator[tuple]:
+    """
+    Строки queryset через серверный курсор (iterator) - в памяти не больше EXPORT_CHUNK_SIZE строк
+    """
+    return queryset.values_list(*fields).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+
+
+def _representers(fields: List[str]):
+    # Те же поля DRF, что и в /api/transactions - формат значений совпадает
+    serializer_fields = TransactionSerializer().fields
+    return [serializer_fields[name].to_representation for name in fields]
+
+
+def _render_values(row: tuple, representers) -> list:
+    return [None if value is None else represent(value) for value, represent in zip(row, representers)]
+
+
+def ndjson_lines(rows: Iterable[tuple], fields: List[str]) -> Iterator[str]:
+    representers = _representers(fields)
+    for row in rows:
+        yield json.dumps(dict(zip(fields, _render_values(row, representers))), ensure_ascii=False) + '\n'
+
+
+def csv_lines(rows: Iterable[tuple], fields: List[str]) -> Iterator[str]:
+    representers = _representers(fields)
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow(['' if value is None else value for value in _render_values(row, representers)])
+
+
+def buffered(lines: Iterable[str], buffer_size: int) -> Iterator[bytes]:
+    """
+    Склеивает строки в куски ~buffer_size байт, чтобы не отдавать по строке на chunk ответа
+    """
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        size += len(data)
+        if size >= buffer_size:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Потоковое gzip сжатие (формат .gz) без накопления всего ответа
+    """
+    compressor = zlib.compressobj(settings.EXPORT_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_transactions(queryset, export_format: str, gzip: bool = False) -> Iterator[bytes]:
+    """
+    Экспорт транзакций в NDJSON или CSV: генератор байтовых кусков для StreamingHttpResponse
+    """
+    rows = iter_rows(queryset, TRANSACTION_FIELDS)
+    if export_format == FORMAT_CSV:
+        lines = csv_lines(rows, TRANSACTION_FIELDS)
+    else:
+        lines = ndjson_lines(rows, TRANSACTION_FIELDS)
+
+    chunks = buffered(lines, settings.EXPORT_BUFFER_BYTES)
+    if gzip:
+        chunks = gzipped(chunks)
+    return chunks
@@ -0,0 +1,105 @@
+import logging
+import statistics
+import threading
+import time
+from typing import Dict, Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TX_TYPE_LEGACY = 'legacy'
+TX_TYPE_EIP1559 = 'eip1559'
+
+
+class FeeOracle:
+    """
+    Кэш цены газа: gas_price и eth_feeHistory обновляются в фоне,
+    запросы на подпись берут готовые значения без RPC вызова.
+
+    Поддерживает legacy (gasPrice) и type-2 (maxFeePerGas/maxPriorityFeePerGas) транзакции.
+    """
+
+    def __init__(self, w3):
+        self.w3 = w3
+        self.refresh_interval = settings.ETH_FEE_REFRESH_INTERVAL_SECONDS
+        self.max_age = settings.ETH_FEE_MAX_AGE_SECONDS
+        self._snapshot: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> Dict:
+        gas_price = self.w3.eth.gas_price
+        snapshot = {
+            'gas_price': gas_price,
+            'base_fee': None,
+            'priority_fee': None,
+            'updated_at': time.monotonic(),
+        }
+
+        try:
+            history = self.w3.eth.fee_history(
+                settings.ETH_FEE_HISTORY_BLOCKS,
+                'latest',
+                [settings.ETH_PRIORITY_FEE_PERCENTILE]
+            )
+            # Последний элемент baseFeePerGas - base fee следующего блока
+            snapshot['base_fee'] = history['baseFeePerGas'][-1]
+            rewards = [block_rewards[0] for block_rewards in history.get('reward', []) if block_rewards]
+            snapshot['priority_fee'] = int(statistics.median(rewards)) if rewards else 0
+        except Exception as e:
+            logger.warning(f"eth_feeHistory failed, EIP-1559 fees unavailable: {e}")
+
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Fee refresh failed: {e}")
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._refresh_loop, name='fee-oracle', daemon=True)
+            self._thread.start()
+
+    def snapshot(self) -> Dict:
+        """
+        Текущие значения; если кэш пуст или старше ETH_FEE_MAX_AGE_SECONDS - синхронное обновление
+        """
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - snapshot['updated_at'] > self.max_age:
+            snapshot = self.refresh()
+        return snapshot
+
+    def fee_fields(self, tx_type: Optional[str] = None) -> Dict:
+        """
+        Поля цены газа для словаря транзакции
+        """
+        tx_type = tx_type or settings.ETH_TX_TYPE
+        snapshot = self.snapshot()
+
+        if tx_type == TX_TYPE_EIP1559 and snapshot['base_fee'] is not None:
+            priority_fee = max(snapshot['priority_fee'], settings.ETH_MIN_PRIORITY_FEE_WEI)
+            return {
+                'type': 2,
+                'maxPriorityFeePerGas': priority_fee,
+                'maxFeePerGas': 2 * snapshot['base_fee'] + priority_fee,
+            }
+
+        return {'gasPrice': snapshot['gas_price']}
+
+    @staticmethod
+    def max_price_per_gas(fee_fields: Dict) -> int:
+        """
+        Верхняя граница цены газа для проверки баланса
+        """
+        if 'maxFeePerGas' in fee_fields:
+            return fee_fields['maxFeePerGas']
+        return fee_fields['gasPrice']
@@ -0,0 +1,84 @@
+import threading
+from typing import List
+from django.conf import settings
+from .key_cache import ACCOUNT_PATH
+from .models import HDIndexSequence, Wallet
+
+
+class HDIndexAllocator:
+    """
+    Выдача HD путей <ACCOUNT_PATH>/{index} без коллизий между запросами и воркерами.
+
+    При HD_INDEX_BLOCK_SIZE > 1 процесс резервирует в БД диапазон индексов
+    и раздает его из памяти; неиспользованный остаток диапазона при рестарте
+    процесса пропускается (пропуски индексов допустимы). Явный путь, переданный
+    другому воркеру, не сдвигает чужой диапазон в памяти, поэтому пути из диапазона
+    перед выдачей сверяются с Wallet.hd_path. Остается окно, пока кошелек с явным путем
+    еще не записан: тогда запись второго упадет на уникальности адреса (адрес
+    детерминирован путем), а не выдаст один адрес дважды.
+    """
+
+    def __init__(self, account_path: str = ACCOUNT_PATH, block_size: int = 1):
+        self.account_path = account_path
+        self.block_size = max(1, block_size)
+        self._next = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def allocate(self, count: int = 1) -> List[str]:
+        hd_paths = []
+        while len(hd_paths) < count:
+            need = count - len(hd_paths)
+            from_block = False
+            with self._lock:
+                if self._end - self._next >= need:
+                    start = self._next
+                    self._next += need
+                    from_block = True
+                elif need >= self.block_size:
+                    start = HDIndexSequence.reserve(self.account_path, need)
+                else:
+                    start = HDIndexSequence.reserve(self.account_path, self.block_size)
+                    self._next, self._end = start + need, start + self.block_size
+
+            paths = [f"{self.account_path}/{index}" for index in range(start, start + need)]
+            if from_block:
+                # Индекс из диапазона в памяти мог быть занят явным путем в другом воркере
+                taken = set(Wallet.all_objects.filter(hd_path__in=paths).values_list('hd_path', flat=True))
+                paths = [hd_path for hd_path in paths if hd_path not in taken]
+            hd_paths.extend(paths)
+
+        return hd_paths
+
+    def mark_used(self, *hd_paths: str):
+        """
+        Учитывает явно переданные пути, чтобы авто-выдача не выдала их повторно:
+        счетчик в БД поднимается выше максимального индекса, а если индекс попал
+        в зарезервированный процессом диапазон - выдача из памяти продолжается за ним
+        """
+        prefix = self.account_path + '/'
+        indexes = [
+            int(hd_path[len(prefix):]) for hd_path in hd_paths
+            if hd_path.startswith(prefix) and hd_path[len(prefix):].isdigit()
+        ]
+        if not indexes:
+            return
+
+        with self._lock:
+            reserved = [index for index in indexes if self._next <= index < self._end]
+            if reserved:
+                self._next = max(reserved) + 1
+        HDIndexSequence.ensure_above(self.account_path, max(indexes))
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_hd_index_allocator() -> HDIndexAllocator:
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = HDIndexAllocator(block_size=settings.HD_INDEX_BLOCK_SIZE)
+    return _allocator
@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import requests
+from django.conf import settings
+from django.db import connection
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class HealthProber:
+    """
+    Состояние БД и MPC нод, которое проверяется в фоне.
+
+    Все ноды опрашиваются одновременно раз в MPC_HEALTH_PROBE_INTERVAL_SECONDS,
+    /api/health отдает готовый снимок без сетевых вызовов и запросов к БД.
+    По каждой ноде хранится время ответа и время последнего успешного ответа.
+    Принудительная проверка (?fresh=1, эндпоинт без авторизации) - не чаще раза
+    в fresh_interval на процесс, в остальное время отдается снимок.
+    """
+
+    def __init__(self, nodes: List[Tuple[str, str]], interval: float, timeout: float, fresh_interval: float = 1):
+        self.nodes = nodes
+        # Своя сессия без повторов: зависшая нода дает ошибку через timeout, а не через timeout * (1 + retries),
+        # и не занимает соединения пула, через который идут запросы шардов
+        adapter = HTTPAdapter(pool_connections=len(nodes), pool_maxsize=2, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.interval = interval
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=len(nodes), thread_name_prefix='mpc-health')
+        self._last_seen: Dict[str, float] = {}
+        self.fresh_interval = fresh_interval
+        self._snapshot: Optional[Dict] = None
+        self._probed_at = 0.0
+        self._lock = threading.Lock()
+        self._fresh_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def probe_node(self, node_name: str, node_url: str) -> Dict:
+        started = time.monotonic()
+        try:
+            resp = self.session.get(f'{node_url}/health', timeout=self.timeout)
+            if resp.status_code == 200:
+                data = resp.json()
+                result = {
+                    'status': 'ok',
+                    'has_shard': data.get('has_shard', False)
+                }
+                self._last_seen[node_name] = time.time()
+            else:
+                result = {'status': f'error: HTTP {resp.status_code}'}
+        except Exception as e:
+            result = {'status': f'error: {str(e)}'}
+
+        result['latency_ms'] = round((time.monotonic() - started) * 1000, 1)
+        result['last_seen'] = _isoformat(self._last_seen.get(node_name))
+        return result
+
+    def probe_database(self) -> str:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            return 'ok'
+        except Exception as e:
+            return f'error: {str(e)}'
+        finally:
+            # Поток живет долго: соединение закрывается по CONN_MAX_AGE или при ошибке, как в конце запроса
+            connection.close_if_unusable_or_obsolete()
+
+    def probe_address_pool(self) -> Optional[Dict]:
+        from .address_pool import get_address_pool
+
+        pool = get_address_pool()
+        if not pool.enabled:
+            return None
+        try:
+            stats = pool.stats()
+            stats['last_fill_at'] = _isoformat(stats['last_fill_at'])
+            return stats
+        except Exception as e:
+            return {'error': str(e)}
+        finally:
+            connection.close_if_unusable_or_obsolete()
+
+    def probe(self) -> Dict:
+        """
+        Одновременная проверка всех нод и БД; результат становится текущим снимком
+        """
+        futures = {
+            node_name: self.executor.submit(self.probe_node, node_name, node_url)
+            for node_name, node_url in self.nodes
+        }
+        database = self.probe_database()
+        address_pool = self.probe_address_pool()
+        # timeout у requests - на подключение и на каждое чтение, поэтому общий дедлайн с запасом
+        done, not_done = wait(futures.values(), timeout=self.timeout * 2)
+
+        health = {
+            'status': 'healthy',
+            'database': database,
+            'mpc_nodes': {},
+            'checked_at': _isoformat(time.time())
+        }
+        if database != 'ok':
+            health['status'] = 'unhealthy'
+
+        for node_name, _ in self.nodes:
+            if futures[node_name] in done:
+                node_health = futures[node_name].result()
+            else:
+                node_health = {
+                    'status': f'error: no response in {self.timeout * 2}s',
+                    'latency_ms': None,
+                    'last_seen': _isoformat(self._last_seen.get(node_name))
+                }
+            health['mpc_nodes'][node_name] = node_health
+            if node_health['status'] != 'ok':
+                health['status'] = 'unhealthy'
+
+        # Пустой пул не делает сервис unhealthy - создание кошельков идет по обычному пути
+        if address_pool is not None:
+            health['address_pool'] = address_pool
+
+        with self._lock:
+            self._snapshot = health
+            self._probed_at = time.monotonic()
+        return health
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.probe()
+            except RuntimeError:
+                # Пул потоков закрыт - интерпретатор завершается
+                return
+            except Exception as e:
+                logger.warning(f"Health probe failed: {e}")
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._probe_loop, name='mpc-health-probe', daemon=True)
+            self._thread.start()
+
+    def cached(self, max_age: Optional[float] = None) -> Optional[Dict]:
+        """
+        Последний снимок без проверки; None - проверок еще не было или снимок старше max_age секунд
+        """
+        with self._lock:
+            if max_age is not None and time.monotonic() - self._probed_at >= max_age:
+                return None
+            return self._snapshot
+
+    def fresh(self) -> Dict:
+        """
+        Проверка для ?fresh=1: снимок моложе fresh_interval отдается как есть,
+        пока идет одна принудительная проверка, остальные запросы получают текущий снимок
+        """
+        snapshot = self.cached(max_age=self.fresh_interval)
+        if snapshot is not None:
+            return snapshot
+        if not self._fresh_lock.acquire(blocking=False):
+            return self.snapshot()
+        try:
+            return self.cached(max_age=self.fresh_interval) or self.probe()
+        finally:
+            self._fresh_lock.release()
+
+    def snapshot(self) -> Dict:
+        """
+        Последний снимок; до первой проверки - синхронная проверка
+        """
+        snapshot = self.cached()
+        if snapshot is None:
+            snapshot = self.probe()
+        return snapshot
+
+
+_prober = None
+_prober_lock = threading.Lock()
+
+
+def get_health_prober() -> HealthProber:
+    """
+    Общий на процесс HealthProber (фоновый поток запускается при первом обращении)
+    """
+    global _prober
+    if _prober is None:
+        with _prober_lock:
+            if _prober is None:
+                _prober = HealthProber(
+                    nodes=[
+                        ('node1', settings.MPC_NODE_1_URL),
+                        ('node2', settings.MPC_NODE_2_URL),
+                        ('node3', settings.MPC_NODE_3_URL)
+                    ],
+                    interval=settings.MPC_HEALTH_PROBE_INTERVAL_SECONDS,
+                    timeout=settings.MPC_HEALTH_PROBE_TIMEOUT_SECONDS,
+                    fresh_interval=settings.MPC_HEALTH_FRESH_MIN_INTERVAL_SECONDS
+                )
+                _prober.start()
+    return _prober
@@ -0,0 +1,145 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from hdwallet import HDWallet
+from hdwallet.symbols import ETH
+
+
+ACCOUNT_PATH = "m/44'/60'/0'/0"
+
+
+def account_child_index(hd_path: str) -> Optional[int]:
+    """
+    Индекс дочернего адреса, если путь - m/44'/60'/0'/0/<N> без hardened
+    """
+    prefix = ACCOUNT_PATH + '/'
+    if not hd_path.startswith(prefix):
+        return None
+    tail = hd_path[len(prefix):]
+    if not tail.isdigit() or int(tail) >= 2 ** 31:
+        return None
+    return int(tail)
+
+
+class _CacheEntry:
+    __slots__ = ('seed', 'account_xprv', 'expires_at')
+
+    def __init__(self, seed: bytearray, account_xprv: bytearray, expires_at: float):
+        self.seed = seed
+        self.account_xprv = account_xprv
+        self.expires_at = expires_at
+
+    def zeroize(self):
+        for buf in (self.seed, self.account_xprv):
+            for i in range(len(buf)):
+                buf[i] = 0
+
+
+class KeyCache:
+    """
+    Кэш BIP39 seed и account-ноды (m/44'/60'/0'/0) для мнемоника.
+
+    Позволяет пропустить PBKDF2 (2048 раундов) и проход BIP32 от корня:
+    дочерний адрес account-ноды получается одним шагом CKD.
+    Записи ограничены по количеству и TTL, при вытеснении буферы затираются нулями
+    (best-effort: промежуточные строки hdwallet Python не позволяет затереть).
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, _CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @staticmethod
+    def _cache_key(mnemonic: str) -> str:
+        return hashlib.sha256(mnemonic.encode()).hexdigest()
+
+    def _build_entry(self, mnemonic: str) -> _CacheEntry:
+        hdwallet = HDWallet(symbol=ETH)
+        hdwallet.from_mnemonic(mnemonic)
+        seed = bytearray.fromhex(hdwallet.seed())
+        hdwallet.from_path(ACCOUNT_PATH)
+        account_xprv = bytearray(hdwallet.xprivate_key().encode())
+        return _CacheEntry(seed, account_xprv, time.monotonic() + self.ttl_seconds)
+
+    def _get_material(self, mnemonic: str) -> Tuple[str, str]:
+        """
+        Возвращает (seed hex, account xprv), снимая копию под локом,
+        чтобы параллельное вытеснение не затерло данные посреди деривации
+        """
+        key = self._cache_key(mnemonic)
+
+        with self._lock:
+            self._purge_expired_locked()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry.seed.hex(), entry.account_xprv.decode()
+
+        entry = self._build_entry(mnemonic)
+
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                entry.zeroize()
+                entry = existing
+            else:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    _, evicted = self._entries.popitem(last=False)
+                    evicted.zeroize()
+                timer = threading.Timer(self.ttl_seconds, self.purge_expired)
+                timer.daemon = True
+                timer.start()
+            return entry.seed.hex(), entry.account_xprv.decode()
+
+    def derive(self, mnemonic: str, hd_path: str) -> Dict:
+        """
+        Деривация кошелька через кэшированную account-ноду или seed
+        """
+        seed_hex, account_xprv = self._get_material(mnemonic)
+        hdwallet = HDWallet(symbol=ETH)
+
+        index = account_child_index(hd_path)
+        if index is not None:
+            hdwallet.from_xprivate_key(account_xprv)
+            hdwallet.from_index(index)
+        else:
+            hdwallet.from_seed(seed_hex)
+            hdwallet.from_path(hd_path)
+
+        return {
+            'address': hdwallet.p2pkh_address(),
+            'private_key': hdwallet.private_key(),
+            'public_key': hdwallet.public_key()
+        }
+
+    def evict(self, mnemonic: str):
+        with self._lock:
+            entry = self._entries.pop(self._cache_key(mnemonic), None)
+        if entry is not None:
+            entry.zeroize()
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            entry.zeroize()
+
+    def purge_expired(self):
+        with self._lock:
+            self._purge_expired_locked()
+
+    def _purge_expired_locked(self):
+        now = time.monotonic()
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            self._entries.pop(key).zeroize()
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from wallet_api.models import Transaction, WalletLedgerEntry
+
+
+class Command(BaseCommand):
+    help = 'Заполняет журнал WalletLedgerEntry по существующим транзакциям (повторный запуск безопасен)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Транзакций за один проход')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        processed = 0
+        created = 0
+
+        while True:
+            batch = list(
+                Transaction.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'from_address', 'to_address', 'created_at')[:batch_size]
+            )
+            if not batch:
+                break
+
+            entries = WalletLedgerEntry.entries_for(batch)
+            with transaction.atomic():
+                before = WalletLedgerEntry.objects.filter(transaction_id__in=[tx.id for tx in batch]).count()
+                # Уже записанные строки пропускаются по уникальному ограничению
+                WalletLedgerEntry.objects.bulk_create(entries, ignore_conflicts=True)
+                after = WalletLedgerEntry.objects.filter(transaction_id__in=[tx.id for tx in batch]).count()
+
+            last_id = batch[-1].id
+            processed += len(batch)
+            created += after - before
+            self.stdout.write(f'{processed} transactions processed, {created} ledger entries created')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Wallet ledger backfilled: {processed} transactions, {created} new entries'
+        ))
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from wallet_api.address_pool import AddressPool
+
+
+class Command(BaseCommand):
+    help = 'Доливает пул заранее выведенных адресов до ADDRESS_POOL_SIZE (например, перед стартом сервиса)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=settings.ADDRESS_POOL_SIZE,
+                            help='Целевой размер пула (по умолчанию ADDRESS_POOL_SIZE)')
+
+    def handle(self, *args, **options):
+        pool = AddressPool(
+            size=options['size'],
+            low_water=options['size'],
+            batch_size=settings.ADDRESS_POOL_FILL_BATCH,
+            interval=settings.ADDRESS_POOL_CHECK_INTERVAL_SECONDS
+        )
+        added = pool.fill()
+        self.stdout.write(self.style.SUCCESS(f'Address pool: {added} added, depth {pool.depth()}'))
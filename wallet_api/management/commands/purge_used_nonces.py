@@ -0,0 +1,22 @@
+import time
+from django.core.management.base import BaseCommand
+from wallet_api.replay_cache import get_replay_cache
+
+
+class Command(BaseCommand):
+    help = 'Удаляет истекшие nonce из хранилища replay защиты (запускать по cron или с --interval)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, metavar='SECONDS',
+                            help='Повторять очистку каждые SECONDS секунд, не завершаясь')
+
+    def handle(self, *args, **options):
+        replay_cache = get_replay_cache()
+
+        while True:
+            removed = replay_cache.purge()
+            self.stdout.write(f'Purged {removed} expired nonce(s)')
+
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
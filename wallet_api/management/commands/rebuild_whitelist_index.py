@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from wallet_api.whitelist import get_whitelist_index
+
+
+class Command(BaseCommand):
+    help = 'Полная пересборка whitelist индекса (address -> hd_path) из таблицы Wallet'
+
+    def handle(self, *args, **options):
+        index = get_whitelist_index()
+        index.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Whitelist index rebuilt: {index.path}'))
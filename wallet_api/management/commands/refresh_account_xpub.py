@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from wallet_api.models import AccountXpub
+from wallet_api.mpc_client import get_mpc_client
+from wallet_api.watch_only import get_watch_only_deriver
+
+
+class Command(BaseCommand):
+    help = "Выводит xpub account-ноды из шардов MPC нод и сохраняет его (после смены шардов)"
+
+    def handle(self, *args, **options):
+        deriver = get_watch_only_deriver()
+        xpub = deriver.xpub_from_mnemonic(get_mpc_client().get_mnemonic())
+
+        previous = AccountXpub.objects.filter(account_path=deriver.account_path).values_list('xpub', flat=True).first()
+        AccountXpub.objects.update_or_create(account_path=deriver.account_path, defaults={'xpub': xpub})
+        deriver.reset()
+
+        if previous is not None and previous != xpub:
+            self.stdout.write(self.style.WARNING(
+                'Account xpub changed: addresses derived from the old key belong to other shards'
+            ))
+        self.stdout.write(self.style.SUCCESS(f'Account xpub for {deriver.account_path}: {xpub}'))
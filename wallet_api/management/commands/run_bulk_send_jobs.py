@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from wallet_api.bulk_jobs import process_job, resumable_job_ids
+from wallet_api.models import BulkSendJob
+
+
+class Command(BaseCommand):
+    help = 'Воркер заданий массовой отправки: обрабатывает новые и дообрабатывает брошенные задания'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Обработать очередь один раз и выйти')
+        parser.add_argument('--retry-failed', type=int, metavar='JOB_ID',
+                            help='Вернуть упавшее задание в очередь (необработанные получатели)')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            updated = BulkSendJob.objects.filter(
+                pk=options['retry_failed'], status=BulkSendJob.STATUS_FAILED
+            ).update(status=BulkSendJob.STATUS_PENDING, error_message=None)
+            if not updated:
+                self.stderr.write(f"Job {options['retry_failed']} is not in failed state")
+                return
+
+        while True:
+            for job_id in resumable_job_ids():
+                self.stdout.write(f'Processing bulk-send job {job_id}')
+                process_job(job_id)
+
+            if options['once']:
+                return
+            time.sleep(settings.BULK_SEND_POLL_INTERVAL_SECONDS)
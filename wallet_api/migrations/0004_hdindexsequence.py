@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-17 02:02
+
+from django.db import migrations, models
+
+
+ACCOUNT_PATH = "m/44'/60'/0'/0"
+
+
+def seed_sequence(apps, schema_editor):
+    """
+    Стартовое значение: после всех уже выданных индексов (раньше индекс брался из count())
+    """
+    Wallet = apps.get_model('wallet_api', 'Wallet')
+    HDIndexSequence = apps.get_model('wallet_api', 'HDIndexSequence')
+
+    next_index = Wallet.objects.count()
+    prefix = ACCOUNT_PATH + '/'
+    for hd_path in Wallet.objects.filter(hd_path__startswith=prefix).values_list('hd_path', flat=True).iterator():
+        tail = hd_path[len(prefix):]
+        if tail.isdigit():
+            next_index = max(next_index, int(tail) + 1)
+
+    HDIndexSequence.objects.create(account_path=ACCOUNT_PATH, next_index=next_index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_api', '0003_transaction_broadcasted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HDIndexSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account_path', models.CharField(max_length=100, unique=True)),
+                ('next_index', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequence, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-17 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_api', '0004_hdindexsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountNonce',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(max_length=42)),
+                ('chain_id', models.BigIntegerField()),
+                ('next_nonce', models.BigIntegerField()),
+                ('synced_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('address', 'chain_id'), name='unique_account_nonce')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2 on 2026-10-17 02:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_api', '0005_accountnonce'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkSendJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('master_address', models.CharField(max_length=42)),
+                ('amount_eth', models.DecimalField(decimal_places=18, max_digits=32)),
+                ('send_tx', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('total_recipients', models.IntegerField(default=0)),
+                ('processed', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'heartbeat_at'], name='wallet_api__status_3fa651_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BulkSendItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.IntegerField()),
+                ('recipient', models.CharField(max_length=42)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('signed', 'Signed'), ('ok', 'OK'), ('error', 'Error')], default='pending', max_length=10)),
+                ('nonce', models.BigIntegerField(blank=True, null=True)),
+                ('tx_hash', models.CharField(blank=True, max_length=66, null=True)),
+                ('raw_transaction', models.TextField(blank=True, null=True)),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='wallet_api.bulksendjob')),
+            ],
+            options={
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['job', 'status', 'position'], name='wallet_api__job_id_1285d4_idx')],
+                'constraints': [models.UniqueConstraint(fields=('job', 'position'), name='unique_bulk_send_item_position')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 02:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_api', '0007_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wallet', models.CharField(max_length=42)),
+                ('direction', models.CharField(choices=[('in', 'In'), ('out', 'Out'), ('self', 'Self')], max_length=4)),
+                ('created_at', models.DateTimeField()),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='wallet_api.transaction')),
+            ],
+            options={
+                'ordering': ['-created_at', '-transaction_id'],
+                'indexes': [models.Index(fields=['wallet', 'created_at', 'transaction'], name='wallet_api__wallet_1ae4b0_idx')],
+                'constraints': [models.UniqueConstraint(fields=('wallet', 'transaction', 'direction'), name='uniq_ledger_wallet_tx_direction')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-17 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_api', '0008_walletledgerentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountXpub',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account_path', models.CharField(max_length=100, unique=True)),
+                ('xpub', models.CharField(max_length=120)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-17 02:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_api', '0009_accountxpub'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wallet',
+            name='assigned',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='wallet',
+            index=models.Index(condition=models.Q(('assigned', False)), fields=['id'], name='wallet_pool_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wallet_api', '0010_address_pool'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bulksendjob',
+            name='base_nonce',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
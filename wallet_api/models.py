@@ -1,15 +1,70 @@
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models.functions import Greatest
 from django.utils import timezone
 import datetime
+from typing import List, Optional
+
+
+class AssignedWalletManager(models.Manager):
+    """
+    Только выданные кошельки: адреса пула (assigned=False) не видны API, whitelist и админке
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(assigned=True)
 
 
 class Wallet(models.Model):
     address = models.CharField(max_length=42, unique=True)
     hd_path = models.CharField(max_length=100)
+    # False - заранее выведенный адрес из пула, еще не выдан клиенту
+    assigned = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = AssignedWalletManager()
+    all_objects = models.Manager()
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Keyset пагинация /api/wallets
+            models.Index(fields=['created_at', 'id']),
+            # Очередь пула: частичный индекс только по невыданным адресам
+            models.Index(fields=['id'], condition=models.Q(assigned=False), name='wallet_pool_idx'),
+        ]
+
+    @classmethod
+    def claim_from_pool(cls, count: int = 1, hd_paths: Optional[List[str]] = None) -> List['Wallet']:
+        """
+        Выдает до `count` адресов из пула (или адреса пула с путями hd_paths) одним UPDATE ... RETURNING.
+        Условие assigned = FALSE повторяется во внешнем WHERE: адрес, который параллельно
+        выдал другой запрос, не выдается дважды (PostgreSQL дополнительно пропускает заблокированные строки)
+        """
+        table = connection.ops.quote_name(cls._meta.db_table)
+        now = timezone.now()
+        skip_locked = ' FOR UPDATE SKIP LOCKED' if connection.features.has_select_for_update_skip_locked else ''
+
+        condition = 'assigned = %s'
+        params = [False]
+        if hd_paths:
+            condition += f" AND hd_path IN ({', '.join(['%s'] * len(hd_paths))})"
+            params += list(hd_paths)
+            count = len(hd_paths)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET assigned = %s, created_at = %s "
+                f"WHERE assigned = %s AND id IN ("
+                f"SELECT id FROM {table} WHERE {condition} ORDER BY id LIMIT %s{skip_locked}"
+                f") RETURNING id, address, hd_path",
+                [True, connection.ops.adapt_datetimefield_value(now), False, *params, count]
+            )
+            rows = cursor.fetchall()
+
+        return [
+            cls(id=wallet_id, address=address, hd_path=hd_path, assigned=True, created_at=now)
+            for wallet_id, address, hd_path in sorted(rows)
+        ]
     
     def __str__(self):
         return self.address
@@ -31,15 +86,27 @@ class UsedNonce(models.Model):
         ]
     
     @classmethod
-    def cleanup_old_nonces(cls):
-        """Удаляет nonce старше 10 минут"""
-        cutoff = timezone.now() - datetime.timedelta(minutes=10)
-        cls.objects.filter(created_at__lt=cutoff).delete()
+    def cleanup_old_nonces(cls, max_age_seconds: int = 600) -> int:
+        """Удаляет nonce старше max_age_seconds (по умолчанию 10 минут)"""
+        cutoff = timezone.now() - datetime.timedelta(seconds=max_age_seconds)
+        deleted, _ = cls.objects.filter(created_at__lt=cutoff).delete()
+        return deleted
     
     def __str__(self):
         return f"{self.nonce} - {self.timestamp}"
 
 
+class TransactionQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        bulk_create с записью строк WalletLedgerEntry в той же транзакции БД
+        """
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            WalletLedgerEntry.objects.using(self.db).bulk_create(WalletLedgerEntry.entries_for(objs))
+        return objs
+
+
 class Transaction(models.Model):
     """
     Проведенные транзакции через API
@@ -60,13 +127,291 @@ class Transaction(models.Model):
     broadcasted = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = TransactionQuerySet.as_manager()
+    
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         indexes = [
             models.Index(fields=['tx_hash']),
             models.Index(fields=['from_address']),
-            models.Index(fields=['created_at']),
+            # Keyset пагинация /api/transactions (покрывает и сортировку по created_at)
+            models.Index(fields=['created_at', 'id']),
         ]
     
     def __str__(self):
         return f"{self.tx_hash} - {self.status}"
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                WalletLedgerEntry.objects.bulk_create(WalletLedgerEntry.entries_for([self]))
+
+
+class WalletLedgerEntry(models.Model):
+    """
+    Денормализованная история кошелька: строка на (кошелек, транзакция, направление).
+
+    История кошелька - один seek по индексу (wallet, created_at, transaction)
+    вместо from_address OR to_address по всей таблице Transaction.
+    Пишется вместе с Transaction (save / bulk_create), старые данные - backfill_wallet_ledger.
+    """
+    DIRECTION_IN = 'in'
+    DIRECTION_OUT = 'out'
+    # Перевод самому себе - одна строка, чтобы история не дублировала транзакцию
+    DIRECTION_SELF = 'self'
+    DIRECTION_CHOICES = [
+        (DIRECTION_IN, 'In'),
+        (DIRECTION_OUT, 'Out'),
+        (DIRECTION_SELF, 'Self'),
+    ]
+
+    wallet = models.CharField(max_length=42)
+    transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='ledger_entries')
+    direction = models.CharField(max_length=4, choices=DIRECTION_CHOICES)
+    # Копия Transaction.created_at - ключ сортировки истории
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at', '-transaction_id']
+        constraints = [
+            models.UniqueConstraint(fields=['wallet', 'transaction', 'direction'], name='uniq_ledger_wallet_tx_direction'),
+        ]
+        indexes = [
+            models.Index(fields=['wallet', 'created_at', 'transaction']),
+        ]
+
+    def __str__(self):
+        return f"{self.wallet} {self.direction} {self.transaction_id}"
+
+    @classmethod
+    def entries_for(cls, transactions) -> list:
+        """
+        Строки журнала для сохраненных транзакций (pk и created_at уже заполнены)
+        """
+        entries = []
+        for tx in transactions:
+            if tx.pk is None:
+                raise ValueError("Transaction must be saved before ledger entries are built")
+            if tx.from_address == tx.to_address:
+                entries.append(cls(wallet=tx.from_address, transaction=tx,
+                                   direction=cls.DIRECTION_SELF, created_at=tx.created_at))
+                continue
+            entries.append(cls(wallet=tx.from_address, transaction=tx,
+                               direction=cls.DIRECTION_OUT, created_at=tx.created_at))
+            entries.append(cls(wallet=tx.to_address, transaction=tx,
+                               direction=cls.DIRECTION_IN, created_at=tx.created_at))
+        return entries
+
+
+class HDIndexSequence(models.Model):
+    """
+    Счетчик индексов HD деривации (<account_path>/{index}) - выдает индексы атомарно
+    """
+    account_path = models.CharField(max_length=100, unique=True)
+    next_index = models.BigIntegerField(default=0)
+
+    @classmethod
+    def reserve(cls, account_path: str, count: int = 1) -> int:
+        """
+        Резервирует `count` подряд идущих индексов и возвращает первый.
+        UPDATE выполняется первым: он берет блокировку строки (PostgreSQL)
+        или блокировку записи БД (SQLite), поэтому параллельные вызовы не пересекаются.
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(account_path=account_path).update(
+                next_index=models.F('next_index') + count
+            )
+            if not updated:
+                cls.objects.get_or_create(account_path=account_path)
+                cls.objects.filter(account_path=account_path).update(
+                    next_index=models.F('next_index') + count
+                )
+            next_index = cls.objects.values_list('next_index', flat=True).get(account_path=account_path)
+        return next_index - count
+
+    @classmethod
+    def ensure_above(cls, account_path: str, index: int):
+        """
+        Сдвигает счетчик за явно занятый индекс, чтобы авто-выдача его не повторила
+        """
+        updated = cls.objects.filter(account_path=account_path, next_index__lte=index).update(
+            next_index=index + 1
+        )
+        if not updated:
+            # Счетчика еще нет (авто-выдачи не было) - создаем сразу за индексом
+            cls.objects.get_or_create(account_path=account_path, defaults={'next_index': index + 1})
+
+    def __str__(self):
+        return f"{self.account_path} -> {self.next_index}"
+
+
+class AccountXpub(models.Model):
+    """
+    Extended public key account-ноды (m/44'/60'/0'/0) - адреса кошельков выводятся без шардов
+    """
+    account_path = models.CharField(max_length=100, unique=True)
+    xpub = models.CharField(max_length=120)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @classmethod
+    def store(cls, account_path: str, xpub: str) -> str:
+        """
+        Сохраняет xpub, если его еще нет; возвращает сохраненное значение (первая запись побеждает)
+        """
+        obj, _ = cls.objects.get_or_create(account_path=account_path, defaults={'xpub': xpub})
+        return obj.xpub
+
+    def __str__(self):
+        return f"{self.account_path} -> {self.xpub[:16]}..."
+
+
+class AccountNonce(models.Model):
+    """
+    Следующий nonce отправителя в сети - выдается атомарно без RPC на каждую подпись
+    """
+    address = models.CharField(max_length=42)
+    chain_id = models.BigIntegerField()
+    next_nonce = models.BigIntegerField()
+    synced_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['address', 'chain_id'], name='unique_account_nonce'),
+        ]
+
+    @classmethod
+    def reserve(cls, address: str, chain_id: int, count: int = 1) -> Optional[int]:
+        """
+        Резервирует `count` nonce подряд и возвращает первый; None - аккаунт еще не засинхронизирован.
+        Как и HDIndexSequence.reserve, UPDATE идет первым и блокирует строку до конца транзакции.
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(address=address, chain_id=chain_id).update(
+                next_nonce=models.F('next_nonce') + count
+            )
+            if not updated:
+                return None
+            next_nonce = cls.objects.values_list('next_nonce', flat=True).get(
+                address=address, chain_id=chain_id
+            )
+        return next_nonce - count
+
+    @classmethod
+    def seed(cls, address: str, chain_id: int, chain_nonce: int):
+        """
+        Первичная синхронизация с сетью; если строку уже создал параллельный запрос - не трогает ее
+        """
+        cls.objects.get_or_create(
+            address=address,
+            chain_id=chain_id,
+            defaults={'next_nonce': chain_nonce}
+        )
+
+    @classmethod
+    def release(cls, address: str, chain_id: int, nonce: int, count: int = 1) -> bool:
+        """
+        Возвращает `count` nonce с `nonce` в счетчик, только если это последние выданные
+        (next_nonce == nonce + count): после них никто ничего не резервировал.
+        False - счетчик уже ушел дальше, откатывать нельзя
+        """
+        released = cls.objects.filter(address=address, chain_id=chain_id, next_nonce=nonce + count).update(
+            next_nonce=nonce
+        )
+        return bool(released)
+
+    @classmethod
+    def resync(cls, address: str, chain_id: int, chain_nonce: int) -> int:
+        """
+        Поднимает счетчик до nonce сети, если сеть ушла дальше; никогда не опускает:
+        pending nonce сети не видит nonce, выданные другим воркерам и еще не отправленные.
+        Возвращает итоговый next_nonce
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(address=address, chain_id=chain_id).update(
+                next_nonce=Greatest(models.F('next_nonce'), models.Value(chain_nonce)),
+                synced_at=timezone.now()
+            )
+            if not updated:
+                cls.seed(address, chain_id, chain_nonce)
+            return cls.objects.values_list('next_nonce', flat=True).get(address=address, chain_id=chain_id)
+
+    def __str__(self):
+        return f"{self.address}@{self.chain_id} -> {self.next_nonce}"
+
+
+class BulkSendJob(models.Model):
+    """
+    Задание массовой отправки - обрабатывается воркерами чанками с чекпоинтами
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    master_address = models.CharField(max_length=42)
+    amount_eth = models.DecimalField(max_digits=32, decimal_places=18)
+    send_tx = models.BooleanField(default=False)
+    # Подпись без отправки: nonce получателя = base_nonce + position (читается из сети один раз на задание)
+    base_nonce = models.BigIntegerField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    total_recipients = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    error_message = models.TextField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'heartbeat_at']),
+        ]
+
+    def __str__(self):
+        return f"Job {self.pk} - {self.status} ({self.processed}/{self.total_recipients})"
+
+
+class BulkSendItem(models.Model):
+    """
+    Получатель в задании массовой отправки и результат по нему
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SIGNED = 'signed'
+    STATUS_OK = 'ok'
+    STATUS_ERROR = 'error'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SIGNED, 'Signed'),
+        (STATUS_OK, 'OK'),
+        (STATUS_ERROR, 'Error'),
+    ]
+
+    job = models.ForeignKey(BulkSendJob, on_delete=models.CASCADE, related_name='items')
+    position = models.IntegerField()
+    recipient = models.CharField(max_length=42)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    nonce = models.BigIntegerField(null=True, blank=True)
+    tx_hash = models.CharField(max_length=66, blank=True, null=True)
+    raw_transaction = models.TextField(blank=True, null=True)
+    error_message = models.TextField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['job', 'position'], name='unique_bulk_send_item_position'),
+        ]
+        indexes = [
+            models.Index(fields=['job', 'status', 'position']),
+        ]
+
+    def __str__(self):
+        return f"{self.job_id}#{self.position} {self.recipient} - {self.status}"
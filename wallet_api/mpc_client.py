@@ -1,6 +1,19 @@
+import asyncio
 import requests
+import time
+import logging
+import threading
+import weakref
+import aiohttp
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import List, Dict
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .key_cache import KeyCache
+from .shard_lease import LeaseManager, sign_node_request
+from .watch_only import get_watch_only_deriver
 from hdwallet import HDWallet
 from hdwallet.symbols import ETH
 from eth_account import Account
@@ -11,6 +24,24 @@ from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 import os
 
+logger = logging.getLogger(__name__)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_mpc_client() -> 'MPCClient':
+    """
+    Общий на процесс MPCClient с keep-alive пулами соединений к нодам
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MPCClient()
+    return _client
+
 
 class MPCClient:
     """
@@ -24,12 +55,69 @@ class MPCClient:
             settings.MPC_NODE_3_URL,
         ]
         self.encryption_key = settings.SHARD_ENCRYPTION_KEY
+        self.shard_deadline = settings.MPC_SHARD_DEADLINE_SECONDS
+        # Время ответа каждой ноды (сек) за последний вызов get_shards в текущем потоке (см. last_timings)
+        self._local = threading.local()
+        self.key_cache = KeyCache(
+            ttl_seconds=settings.KEY_CACHE_TTL_SECONDS,
+            max_entries=settings.KEY_CACHE_MAX_ENTRIES
+        )
+        self.sessions = {node_url: self._build_session() for node_url in self.nodes}
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.MPC_HTTP_POOL_SIZE * len(self.nodes),
+            thread_name_prefix='mpc-fetch'
+        )
+        # Аренда шардов (MPC_SHARD_LEASES): ноды выходят из горячего пути на время аренды
+        self.lease_manager = LeaseManager(
+            self,
+            secret=settings.MPC_LEASE_SECRET,
+            ttl_seconds=settings.MPC_LEASE_TTL_SECONDS,
+            max_uses=settings.MPC_LEASE_MAX_USES,
+            check_interval=settings.MPC_LEASE_CHECK_INTERVAL_SECONDS
+        ) if settings.MPC_SHARD_LEASES else None
+        # Адреса из сохраненного xpub account-ноды - создание кошелька без шардов
+        self.watch_only = get_watch_only_deriver() if settings.WATCH_ONLY_DERIVATION else None
+
+    def _build_session(self) -> requests.Session:
+        """
+        Сессия с keep-alive пулом соединений и политикой повторов для одной ноды
+        """
+        retry = Retry(
+            total=settings.MPC_HTTP_RETRIES,
+            backoff_factor=settings.MPC_HTTP_RETRY_BACKOFF,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.MPC_HTTP_POOL_SIZE,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def session_for(self, node_url: str) -> requests.Session:
+        return self.sessions[node_url]
+
+    def shard_request_headers(self, node_url: str) -> Dict[str, str]:
+        """
+        Подпись GET /get_shard: ноды с LEASE_API_SECRET отдают шард только подписанным запросам
+        """
+        if not settings.MPC_LEASE_SECRET:
+            return {}
+        return sign_node_request(settings.MPC_LEASE_SECRET, node_url, 'GET', '/get_shard')
     
-    def decrypt_shard(self, encrypted_shard: str) -> str:
+    def decrypt_shard(self, encrypted_shard: str, binding: str = '') -> str:
+        """
+        binding - ":<lease_id>:<instance_id>" для шарда, выданного в аренду
+        """
         if not self.encryption_key:
             raise Exception('SHARD_ENCRYPTION_KEY not set')
         
-        key = hashlib.sha256(self.encryption_key.encode()).digest()
+        key = hashlib.sha256(f"{self.encryption_key}{binding}".encode()).digest()
         data = base64.b64decode(encrypted_shard)
         iv = data[:16]
         encrypted = data[16:]
@@ -39,42 +127,94 @@ class MPCClient:
         decrypted = decryptor.update(encrypted) + decryptor.finalize()
         return decrypted.decode()
     
+    def fetch_shard(self, node_url: str) -> str:
+        """
+        Запрашивает и расшифровывает шард одной ноды
+        """
+        response = self.session_for(node_url).get(
+            f"{node_url}/get_shard",
+            headers=self.shard_request_headers(node_url),
+            timeout=self.shard_deadline
+        )
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}")
+        data = response.json()
+        return self.decrypt_shard(data['encrypted_shard'])
+
+    @property
+    def last_timings(self) -> Dict[str, float]:
+        """
+        {node_url: сек} последнего get_shards этого потока - параллельные запросы не перетирают друг друга
+        """
+        return getattr(self._local, 'timings', {})
+
+    def _timed_fetch(self, node_url: str, timings: Dict[str, float]) -> str:
+        started = time.monotonic()
+        try:
+            return self.fetch_shard(node_url)
+        finally:
+            timings[node_url] = time.monotonic() - started
+
     def get_shards(self) -> Dict[int, str]:
         """
-        Получает шарды от всех 3 нод и расшифровывает их
+        Получает шарды от всех 3 нод параллельно и расшифровывает их.
+        Общий дедлайн - MPC_SHARD_DEADLINE_SECONDS на все ноды сразу.
         """
         shards = {}
-        
-        for i, node_url in enumerate(self.nodes, 1):
+        timings = {}
+        self._local.timings = timings
+
+        futures = {
+            self.executor.submit(self._timed_fetch, node_url, timings): (i, node_url)
+            for i, node_url in enumerate(self.nodes, 1)
+        }
+        # Зависшие запросы не ждем - они завершатся по собственному таймауту
+        done, not_done = wait(futures, timeout=self.shard_deadline)
+
+        for future in done:
+            i, node_url = futures[future]
             try:
-                response = requests.get(
-                    f"{node_url}/get_shard",
-                    timeout=5
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    encrypted_shard = data['encrypted_shard']
-                    decrypted_shard = self.decrypt_shard(encrypted_shard)
-                    shards[i] = decrypted_shard
+                shards[i] = future.result()
             except Exception as e:
-                print(f"Node {node_url} failed: {e}")
-                continue
-        
+                logger.warning(f"Node {node_url} failed: {e}")
+
+        for future in not_done:
+            i, node_url = futures[future]
+            logger.warning(f"Node {node_url} missed deadline {self.shard_deadline}s")
+
+        logger.info("Shard fetch timings: " + ", ".join(
+            f"{node_url}={timings.get(node_url, self.shard_deadline):.3f}s"
+            for node_url in self.nodes
+        ))
+
         if len(shards) != 3:
             raise Exception(f"Need all 3 shards, got {len(shards)}")
-        
+
         return shards
-    
+
     def combine_shards(self, shards: Dict[int, str]) -> str:
         """
         Объединяет шарды в полный мнемоник
         """
         return f"{shards[1]} {shards[2]} {shards[3]}"
+
+    def get_mnemonic(self) -> str:
+        """
+        Мнемоник из действующей аренды; без аренды - шарды со всех нод
+        """
+        if self.lease_manager is not None:
+            mnemonic = self.lease_manager.mnemonic()
+            if mnemonic is not None:
+                return mnemonic
+        return self.combine_shards(self.get_shards())
     
     def derive_wallet(self, mnemonic: str, hd_path: str) -> Dict:
         """
-        Деривация кошелька из мнемоника
+        Деривация кошелька из мнемоника (через KeyCache, если кэш включен)
         """
+        if self.key_cache.enabled:
+            return self.key_cache.derive(mnemonic, hd_path)
+
         hdwallet = HDWallet(symbol=ETH)
         hdwallet.from_mnemonic(mnemonic)
         hdwallet.from_path(hd_path)
@@ -87,37 +227,237 @@ class MPCClient:
     
     def generate_wallet(self, hd_path: str) -> Dict:
         """
-        Генерация кошелька: получает шарды, собирает мнемоник, делает деривацию
+        Генерация кошелька: адрес из xpub, если путь под account-нодой,
+        иначе шарды -> мнемоник -> деривация
         """
-        shards = self.get_shards()
-        mnemonic = self.combine_shards(shards)
-        wallet = self.derive_wallet(mnemonic, hd_path)
-        
-        return {
-            'address': wallet['address'],
-            'hd_path': hd_path
-        }
+        return self.generate_wallets([hd_path])[0]
+    
+    def generate_wallets(self, hd_paths: List[str]) -> List[Dict]:
+        """
+        Пакетная генерация, порядок сохраняется. Пути m/44'/60'/0'/0/<N> выводятся из xpub
+        без нод; для остальных (и для первого вывода xpub) - один запрос шардов на все пути
+        """
+        addresses = {}
+        key = self.watch_only.load() if self.watch_only is not None else None
+        if key is not None:
+            addresses = self.watch_only.addresses(key, hd_paths)
+
+        missing = [hd_path for hd_path in hd_paths if hd_path not in addresses]
+        if missing:
+            mnemonic = self.get_mnemonic()
+            if self.watch_only is not None and key is None:
+                key = self.watch_only.store_from_mnemonic(mnemonic)
+                if key is not None:
+                    addresses = self.watch_only.addresses(key, hd_paths)
+            for hd_path in missing:
+                if hd_path not in addresses:
+                    addresses[hd_path] = self.derive_wallet(mnemonic, hd_path)['address']
+
+        return [
+            {
+                'address': addresses[hd_path],
+                'hd_path': hd_path
+            }
+            for hd_path in hd_paths
+        ]
     
     def sign_transaction(self, w3, transaction_dict: Dict, from_address: str) -> Dict:
         """
         Подписывает транзакцию: получает шарды, восстанавливает private key, подписывает raw tx
         """
-        from .models import Wallet
-        
-        try:
-            wallet_obj = Wallet.objects.get(address=from_address)
-            hd_path = wallet_obj.hd_path
-        except Wallet.DoesNotExist:
+        result = self.sign_transactions(from_address, [transaction_dict])[0]
+        if 'error' in result:
+            raise Exception(result['error'])
+        return result
+
+    def sign_transactions(self, from_address: str, transaction_dicts: List[Dict]) -> List[Dict]:
+        """
+        Пакетная подпись: ключ восстанавливается один раз на весь список.
+        Результаты в том же порядке; ошибка подписи отдельной транзакции
+        возвращается в элементе как {'error': ...} и не прерывает остальные.
+        """
+        from .whitelist import get_whitelist_index
+
+        hd_path = get_whitelist_index().lookup(from_address)
+        if hd_path is None:
             raise Exception(f"Wallet {from_address} not found in database")
         
-        shards = self.get_shards()
-        mnemonic = self.combine_shards(shards)
+        mnemonic = self.get_mnemonic()
+        return self.sign_with_mnemonic(mnemonic, hd_path, transaction_dicts)
+
+    def sign_with_mnemonic(self, mnemonic: str, hd_path: str, transaction_dicts: List[Dict]) -> List[Dict]:
+        """
+        Подпись списка транзакций ключом hd_path (шарды уже получены)
+        """
         wallet = self.derive_wallet(mnemonic, hd_path)
-        
+        if self.watch_only is not None:
+            # Ключ уже выведен из шардов - заодно проверяем, что сохраненный xpub от них же
+            self.watch_only.check_address(hd_path, wallet['address'])
         account = Account.from_key(wallet['private_key'])
-        signed_tx = account.sign_transaction(transaction_dict)
-        
+
+        results = []
+        for transaction_dict in transaction_dicts:
+            try:
+                signed_tx = account.sign_transaction(transaction_dict)
+                results.append({
+                    'raw_transaction': signed_tx.rawTransaction.hex(),
+                    'tx_hash': signed_tx.hash.hex()
+                })
+            except Exception as e:
+                results.append({'error': str(e)})
+
+        return results
+
+
+class AsyncMPCClient:
+    """
+    Асинхронный клиент MPC нод (aiohttp) для ASGI: ожидание нод не занимает поток.
+
+    Только сетевой обмен асинхронный; расшифровка, деривация (вместе с KeyCache)
+    и подпись - общие с синхронным MPCClient.
+    """
+
+    def __init__(self, mpc_client: MPCClient):
+        self.mpc_client = mpc_client
+        self.nodes = mpc_client.nodes
+        self.shard_deadline = mpc_client.shard_deadline
+        # aiohttp сессия привязана к event loop - по одной на loop
+        self._sessions = weakref.WeakKeyDictionary()
+
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0, limit_per_host=settings.MPC_ASYNC_POOL_SIZE),
+                timeout=aiohttp.ClientTimeout(total=self.shard_deadline)
+            )
+            self._sessions[loop] = session
+        return session
+
+    async def fetch_shard(self, node_url: str) -> str:
+        """
+        Запрашивает и расшифровывает шард одной ноды (повторы на 502/503/504 как у MPCClient)
+        """
+        retries = settings.MPC_HTTP_RETRIES
+        for attempt in range(retries + 1):
+            headers = self.mpc_client.shard_request_headers(node_url)
+            async with self.session().get(f"{node_url}/get_shard", headers=headers) as response:
+                if response.status in (502, 503, 504) and attempt < retries:
+                    await asyncio.sleep(settings.MPC_HTTP_RETRY_BACKOFF * (2 ** attempt))
+                    continue
+                if response.status != 200:
+                    raise Exception(f"HTTP {response.status}")
+                data = await response.json(content_type=None)
+                return self.mpc_client.decrypt_shard(data['encrypted_shard'])
+
+    async def _timed_fetch(self, node_url: str, timings: Dict[str, float]) -> str:
+        started = time.monotonic()
+        try:
+            return await self.fetch_shard(node_url)
+        finally:
+            timings[node_url] = time.monotonic() - started
+
+    async def get_shards(self) -> Dict[int, str]:
+        """
+        Шарды всех 3 нод параллельно, общий дедлайн MPC_SHARD_DEADLINE_SECONDS
+        """
+        shards = {}
+        timings = {}
+
+        tasks = {
+            asyncio.ensure_future(self._timed_fetch(node_url, timings)): (i, node_url)
+            for i, node_url in enumerate(self.nodes, 1)
+        }
+        done, not_done = await asyncio.wait(tasks, timeout=self.shard_deadline)
+
+        for task in done:
+            i, node_url = tasks[task]
+            try:
+                shards[i] = task.result()
+            except Exception as e:
+                logger.warning(f"Node {node_url} failed: {e}")
+
+        for task in not_done:
+            task.cancel()
+            i, node_url = tasks[task]
+            logger.warning(f"Node {node_url} missed deadline {self.shard_deadline}s")
+
+        logger.info("Shard fetch timings: " + ", ".join(
+            f"{node_url}={timings.get(node_url, self.shard_deadline):.3f}s"
+            for node_url in self.nodes
+        ))
+
+        if len(shards) != 3:
+            raise Exception(f"Need all 3 shards, got {len(shards)}")
+
+        return shards
+
+    async def get_mnemonic(self) -> str:
+        """
+        Как MPCClient.get_mnemonic: действующая аренда берется без потока,
+        новая аренда запрашивается синхронным клиентом в потоке
+        """
+        lease_manager = self.mpc_client.lease_manager
+        if lease_manager is not None:
+            mnemonic = lease_manager.try_use()
+            if mnemonic is None:
+                mnemonic = await asyncio.to_thread(lease_manager.mnemonic)
+            if mnemonic is not None:
+                return mnemonic
+        return self.mpc_client.combine_shards(await self.get_shards())
+
+    async def generate_wallet(self, hd_path: str) -> Dict:
+        watch_only = self.mpc_client.watch_only
+        if watch_only is not None and watch_only.child_index(hd_path) is not None:
+            key = watch_only.cached_key() or await sync_to_async(watch_only.load)()
+            if key is not None:
+                # Public CKD ~1 мс - прямо в event loop
+                return {
+                    'address': key.child_address(watch_only.child_index(hd_path)),
+                    'hd_path': hd_path
+                }
+
+        mnemonic = await self.get_mnemonic()
+        if watch_only is not None and watch_only.cached_key() is None:
+            # Первый вывод xpub (PBKDF2) и запись в БД - в потоке
+            await sync_to_async(watch_only.store_from_mnemonic)(mnemonic)
+        # Деривация - CPU, в пуле потоков, чтобы не стопорить event loop
+        wallet = await asyncio.to_thread(self.mpc_client.derive_wallet, mnemonic, hd_path)
         return {
-            'raw_transaction': signed_tx.rawTransaction.hex(),
-            'tx_hash': signed_tx.hash.hex()
+            'address': wallet['address'],
+            'hd_path': hd_path
         }
+
+    async def sign_transactions(self, from_address: str, transaction_dicts: List[Dict]) -> List[Dict]:
+        from .whitelist import get_whitelist_index
+
+        # Промах индекса перепроверяется в БД - поэтому через sync_to_async
+        hd_path = await sync_to_async(get_whitelist_index().lookup)(from_address)
+        if hd_path is None:
+            raise Exception(f"Wallet {from_address} not found in database")
+
+        mnemonic = await self.get_mnemonic()
+        return await asyncio.to_thread(self.mpc_client.sign_with_mnemonic, mnemonic, hd_path, transaction_dicts)
+
+    async def sign_transaction(self, transaction_dict: Dict, from_address: str) -> Dict:
+        result = (await self.sign_transactions(from_address, [transaction_dict]))[0]
+        if 'error' in result:
+            raise Exception(result['error'])
+        return result
+
+
+_async_client = None
+
+
+def get_async_mpc_client() -> AsyncMPCClient:
+    """
+    Общий на процесс AsyncMPCClient (поверх общего MPCClient)
+    """
+    global _async_client
+    if _async_client is None:
+        mpc_client = get_mpc_client()
+        with _client_lock:
+            if _async_client is None:
+                _async_client = AsyncMPCClient(mpc_client)
+    return _async_client
@@ -0,0 +1,67 @@
+import logging
+from .models import AccountNonce
+
+logger = logging.getLogger(__name__)
+
+
+class NonceManager:
+    """
+    Выдача nonce отправителям из БД: синхронизация с сетью один раз,
+    дальше строго возрастающие значения для параллельных подписей без RPC.
+    """
+
+    def __init__(self, eth_client):
+        self.eth_client = eth_client
+
+    def _chain_nonce(self, address: str) -> int:
+        return self.eth_client.w3.eth.get_transaction_count(address, 'pending')
+
+    def reserve(self, address: str, count: int = 1) -> int:
+        """
+        Резервирует `count` nonce подряд для адреса и возвращает первый
+        """
+        chain_id = self.eth_client.chain_id
+        nonce = AccountNonce.reserve(address, chain_id, count)
+        if nonce is None:
+            AccountNonce.seed(address, chain_id, self._chain_nonce(address))
+            nonce = AccountNonce.reserve(address, chain_id, count)
+        return nonce
+
+    def peek(self, address: str) -> int:
+        """
+        Следующий nonce без резервирования (для подписи без отправки)
+        """
+        chain_id = self.eth_client.chain_id
+        nonce = AccountNonce.objects.filter(address=address, chain_id=chain_id).values_list(
+            'next_nonce', flat=True
+        ).first()
+        if nonce is None:
+            AccountNonce.seed(address, chain_id, self._chain_nonce(address))
+            nonce = AccountNonce.objects.values_list('next_nonce', flat=True).get(
+                address=address, chain_id=chain_id
+            )
+        return nonce
+
+    def release(self, address: str, nonce: int, count: int = 1) -> bool:
+        """
+        Освобождает зарезервированные, но не отправленные nonce после ошибки.
+        Откат - только если они последние выданные; иначе за ними уже выданы nonce
+        другим запросам, и счетчик лишь подтягивается к сети (resync). True - nonce освобождены
+        """
+        if AccountNonce.release(address, self.eth_client.chain_id, nonce, count):
+            logger.info(f"Nonce {nonce}..{nonce + count - 1} for {address} released")
+            return True
+        self.resync(address)
+        return False
+
+    def resync(self, address: str):
+        """
+        Подтягивает счетчик к pending nonce сети, если сеть ушла дальше (транзакции отправлены
+        в обход сервиса); счетчик никогда не опускается - выданные nonce не выдаются повторно
+        """
+        try:
+            chain_nonce = self._chain_nonce(address)
+            next_nonce = AccountNonce.resync(address, self.eth_client.chain_id, chain_nonce)
+            logger.info(f"Nonce for {address} resynced: network {chain_nonce}, next {next_nonce}")
+        except Exception as e:
+            logger.error(f"Nonce resync for {address} failed: {e}")
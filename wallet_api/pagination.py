@@ -0,0 +1,150 @@
+import base64
+import datetime
+import json
+from typing import Optional, Tuple
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) пагинация по (created_at, id) от новых к старым.
+
+    Курсор - непрозрачная base64 строка с ключом граничной строки страницы, поэтому
+    любая страница - один range scan по индексу (created_at, id), без OFFSET.
+    Размер страницы: ?page_size=, по умолчанию API_PAGE_SIZE, не больше API_MAX_PAGE_SIZE.
+    Поля ключа можно переопределить (key_fields), например для выборки из WalletLedgerEntry.
+    """
+    key_fields = ('created_at', 'id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, settings.API_PAGE_SIZE))
+        except ValueError:
+            page_size = settings.API_PAGE_SIZE
+        return min(max(1, page_size), settings.API_MAX_PAGE_SIZE)
+
+    # --- Курсор ---
+
+    @staticmethod
+    def encode_cursor(created_at: datetime.datetime, pk: int, reverse: bool) -> str:
+        payload = {'c': created_at.isoformat(), 'i': pk}
+        if reverse:
+            payload['r'] = 1
+        data = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, request) -> Optional[Tuple[datetime.datetime, int, bool]]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            return datetime.datetime.fromisoformat(data['c']), int(data['i']), bool(data.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    # --- Страница ---
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        created_field, id_field = self.key_fields
+        reverse = False
+        if cursor is None:
+            queryset = queryset.order_by(f'-{created_field}', f'-{id_field}')
+        else:
+            created_at, pk, reverse = cursor
+            if reverse:
+                # Предыдущая страница: строки новее курсора, ближайшие первыми
+                queryset = queryset.filter(**{f'{created_field}__gte': created_at}).filter(
+                    Q(**{f'{created_field}__gt': created_at}) | Q(**{f'{id_field}__gt': pk})
+                ).order_by(created_field, id_field)
+            else:
+                queryset = queryset.filter(**{f'{created_field}__lte': created_at}).filter(
+                    Q(**{f'{created_field}__lt': created_at}) | Q(**{f'{id_field}__lt': pk})
+                ).order_by(f'-{created_field}', f'-{id_field}')
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            # Назад уходили от существующей строки - следующая страница есть всегда
+            self.has_next = bool(rows)
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None and bool(rows)
+
+        # Ключи границ запоминаются сразу: вызывающий код может менять строки
+        self.first_key = self.row_key(rows[0]) if rows else None
+        self.last_key = self.row_key(rows[-1]) if rows else None
+        return rows
+
+    def row_key(self, row) -> Tuple[datetime.datetime, int]:
+        # Строки - модели или словари из values() (быстрый путь чтения)
+        created_field, id_field = self.key_fields
+        if isinstance(row, dict):
+            return row[created_field], row[id_field]
+        return getattr(row, created_field), getattr(row, id_field)
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next:
+            return None
+        cursor = self.encode_cursor(*self.last_key, reverse=False)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous:
+            return None
+        cursor = self.encode_cursor(*self.first_key, reverse=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor from the next/previous link',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Page size (max {settings.API_MAX_PAGE_SIZE})',
+                'schema': {'type': 'integer'},
+            },
+        ]
@@ -0,0 +1,27 @@
+from decimal import Decimal
+import orjson
+from rest_framework.renderers import BaseRenderer
+
+
+def _default(obj):
+    # Decimal - строкой без экспоненты, как DecimalField в сериализаторах
+    if isinstance(obj, Decimal):
+        return format(obj, 'f')
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Быстрый JSON рендерер (orjson) для read-path эндпоинтов.
+
+    Принимает сырые строки из values(): datetime кодируется нативно
+    (ISO 8601, UTC с суффиксом Z - как DateTimeField), Decimal - строкой.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_default, option=orjson.OPT_UTC_Z)
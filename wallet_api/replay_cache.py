@@ -0,0 +1,178 @@
+import logging
+import math
+from abc import ABC, abstractmethod
+import threading
+import time
+from typing import Dict, Optional, Set
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DB = 'db'
+BACKEND_MEMORY = 'memory'
+BACKEND_CACHE = 'cache'
+
+
+class ReplayCache(ABC):
+    """
+    Хранилище использованных X-Nonce (защита от replay).
+
+    Nonce нужно помнить, пока запрос с ним проходит проверку timestamp:
+    timestamp запроса в пределах REQUEST_EXPIRY_SECONDS от текущего времени.
+    """
+
+    def __init__(self, expiry_seconds: int):
+        self.expiry_seconds = expiry_seconds
+
+    @abstractmethod
+    def check_and_store(self, nonce: str, timestamp: int) -> bool:
+        """
+        Атомарно запоминает nonce. False - nonce уже использован (replay)
+        """
+
+    def purge(self) -> int:
+        """
+        Удаляет истекшие nonce, возвращает сколько удалено
+        """
+        return 0
+
+
+class MemoryReplayCache(ReplayCache):
+    """
+    Nonce в памяти процесса, разложенные по корзинам времени (timestamp // bucket_seconds).
+
+    Истекшая корзина удаляется целиком - O(1) на корзину, без обхода nonce.
+    Размер корзины - REQUEST_EXPIRY_SECONDS / REPLAY_CACHE_BUCKETS, поэтому живых корзин
+    не больше ~2 * REPLAY_CACHE_BUCKETS (окно timestamp +-REQUEST_EXPIRY_SECONDS).
+    Кэш свой у каждого процесса: подходит для одного воркера (потоки - можно).
+    """
+
+    def __init__(self, expiry_seconds: int, buckets: int):
+        super().__init__(expiry_seconds)
+        self.bucket_seconds = max(1, math.ceil(expiry_seconds / max(1, buckets)))
+        self._buckets: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._purged_at: Optional[int] = None
+
+    def _bucket_expired(self, bucket_id: int, now: int) -> bool:
+        # Самый поздний timestamp корзины перестает проходить проверку через expiry_seconds
+        return (bucket_id + 1) * self.bucket_seconds + self.expiry_seconds <= now
+
+    def _evict(self, now: int) -> int:
+        expired = [bucket_id for bucket_id in self._buckets if self._bucket_expired(bucket_id, now)]
+        removed = 0
+        for bucket_id in expired:
+            removed += len(self._buckets.pop(bucket_id))
+        self._purged_at = now // self.bucket_seconds
+        return removed
+
+    def check_and_store(self, nonce: str, timestamp: int) -> bool:
+        now = int(time.time())
+        with self._lock:
+            if self._purged_at != now // self.bucket_seconds:
+                self._evict(now)
+            for bucket in self._buckets.values():
+                if nonce in bucket:
+                    return False
+            self._buckets.setdefault(timestamp // self.bucket_seconds, set()).add(nonce)
+            return True
+
+    def purge(self) -> int:
+        with self._lock:
+            return self._evict(int(time.time()))
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(bucket) for bucket in self._buckets.values())
+
+
+class DatabaseReplayCache(ReplayCache):
+    """
+    Nonce в таблице UsedNonce: один INSERT, повтор отсекается уникальным индексом.
+
+    Истекшие строки удаляются по ходу запросов: не чаще раза в purge_interval секунд
+    на процесс, purge делает только один поток (остальные не ждут).
+    purge_interval=0 - только команда purge_used_nonces (cron).
+    """
+
+    def __init__(self, expiry_seconds: int, purge_interval: float = 0):
+        super().__init__(expiry_seconds)
+        self.purge_interval = purge_interval
+        self._purge_lock = threading.Lock()
+        self._purge_due = time.monotonic()
+
+    def check_and_store(self, nonce: str, timestamp: int) -> bool:
+        from .models import UsedNonce
+
+        self._maybe_purge()
+        try:
+            with transaction.atomic():
+                UsedNonce.objects.create(nonce=nonce, timestamp=timestamp)
+        except IntegrityError:
+            return False
+        return True
+
+    def _maybe_purge(self):
+        if not self.purge_interval or time.monotonic() < self._purge_due:
+            return
+        if not self._purge_lock.acquire(blocking=False):
+            return
+        try:
+            self._purge_due = time.monotonic() + self.purge_interval
+            removed = self.purge()
+            if removed:
+                logger.info(f"Purged {removed} expired nonce(s)")
+        except Exception as e:
+            # Очистка не должна ломать проверку запроса - повторим через интервал
+            logger.warning(f"Used nonce purge failed: {e}")
+        finally:
+            self._purge_lock.release()
+
+    def purge(self) -> int:
+        from .models import UsedNonce
+
+        # timestamp может опережать время сервера на expiry, поэтому храним 2 * expiry
+        return UsedNonce.cleanup_old_nonces(max_age_seconds=2 * self.expiry_seconds)
+
+
+class DjangoCacheReplayCache(ReplayCache):
+    """
+    Nonce в Django cache (cache.add атомарен в Redis/Memcached) - общий для всех воркеров.
+    Истечение - TTL ключа, purge не нужен.
+    """
+
+    key_prefix = 'replay-nonce:'
+
+    def check_and_store(self, nonce: str, timestamp: int) -> bool:
+        from django.core.cache import cache
+
+        return cache.add(f"{self.key_prefix}{nonce}", timestamp, timeout=2 * self.expiry_seconds)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def build_replay_cache(backend: str) -> ReplayCache:
+    expiry_seconds = settings.REQUEST_EXPIRY_SECONDS
+    if backend == BACKEND_MEMORY:
+        return MemoryReplayCache(expiry_seconds, settings.REPLAY_CACHE_BUCKETS)
+    if backend == BACKEND_CACHE:
+        return DjangoCacheReplayCache(expiry_seconds)
+    if backend == BACKEND_DB:
+        return DatabaseReplayCache(expiry_seconds, settings.REPLAY_CACHE_PURGE_INTERVAL_SECONDS)
+    raise Exception(f"Unknown REPLAY_CACHE_BACKEND: {backend}")
+
+
+def get_replay_cache() -> ReplayCache:
+    """
+    Общий на процесс replay кэш (backend - settings.REPLAY_CACHE_BACKEND)
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = build_replay_cache(settings.REPLAY_CACHE_BACKEND)
+                logger.info(f"Replay cache backend: {settings.REPLAY_CACHE_BACKEND}")
+    return _cache
@@ -1,5 +1,7 @@
 from rest_framework import serializers
+from django.conf import settings
 from .models import Wallet
+from .whitelist import checksum_address
 
 
 class WalletSerializer(serializers.ModelSerializer):
@@ -16,6 +18,38 @@ class CreateWalletSerializer(serializers.Serializer):
     )
 
 
+class CreateWalletBatchSerializer(serializers.Serializer):
+    count = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        help_text="Number of wallets to create with auto-generated HD paths"
+    )
+    hd_paths = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        allow_empty=False,
+        help_text="Explicit HD derivation paths (alternative to count)"
+    )
+
+    def validate(self, attrs):
+        count = attrs.get('count')
+        hd_paths = attrs.get('hd_paths')
+
+        if (count is None) == (hd_paths is None):
+            raise serializers.ValidationError("Provide either count or hd_paths")
+
+        size = count if count is not None else len(hd_paths)
+        if size > settings.WALLET_BATCH_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Batch size {size} exceeds limit {settings.WALLET_BATCH_MAX_SIZE}"
+            )
+
+        if hd_paths is not None and len(set(hd_paths)) != len(hd_paths):
+            raise serializers.ValidationError("hd_paths contains duplicates")
+
+        return attrs
+
+
 class SignTransactionSerializer(serializers.Serializer):
     address = serializers.CharField(
         max_length=42,
@@ -37,14 +71,16 @@ class SignTransactionSerializer(serializers.Serializer):
     )
 
     def validate_address(self, value):
-        if not value.startswith('0x') or len(value) != 42:
+        address = checksum_address(value)
+        if address is None:
             raise serializers.ValidationError("Invalid Ethereum address format")
-        return value
+        return address
 
     def validate_to(self, value):
-        if not value.startswith('0x') or len(value) != 42:
+        address = checksum_address(value)
+        if address is None:
             raise serializers.ValidationError("Invalid Ethereum address format")
-        return value
+        return address
 
     def validate_amount(self, value):
         if value < 0:
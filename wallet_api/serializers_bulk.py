@@ -1,10 +1,12 @@
 from rest_framework import serializers
+from .models import BulkSendJob, BulkSendItem
+from .whitelist import checksum_address
 
 
-class BulkSendSerializer(serializers.Serializer):
-    eth_wallets = serializers.CharField(
-        help_text="Comma-separated ETH addresses (e.g., '0xABC...,0xDEF...')"
-    )
+class BulkSendParamsSerializer(serializers.Serializer):
+    """
+    Параметры массовой отправки (для потоковой загрузки - из query string)
+    """
     amount = serializers.DecimalField(
         max_digits=20,
         decimal_places=18,
@@ -16,29 +18,54 @@ class BulkSendSerializer(serializers.Serializer):
         help_text="1 to broadcast transactions, 0 to only sign"
     )
     
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Amount must be greater than 0")
+        return value
+
+
+class BulkSendSerializer(BulkSendParamsSerializer):
+    eth_wallets = serializers.CharField(
+        help_text="Comma-separated ETH addresses (e.g., '0xABC...,0xDEF...')"
+    )
+    
     def validate_eth_wallets(self, value):
         addresses = [addr.strip() for addr in value.split(',')]
         
         if not addresses:
             raise serializers.ValidationError("At least one address required")
         
+        normalized = []
         for addr in addresses:
-            if not addr.startswith('0x') or len(addr) != 42:
+            address = checksum_address(addr)
+            if address is None:
                 raise serializers.ValidationError(f"Invalid address: {addr}")
+            normalized.append(address)
         
-        return addresses
-    
-    def validate_amount(self, value):
-        if value <= 0:
-            raise serializers.ValidationError("Amount must be greater than 0")
-        return value
+        return normalized
+
+
+class BulkSendJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.IntegerField(source='pk', read_only=True)
+    master_wallet = serializers.CharField(source='master_address')
+    amount_per_wallet = serializers.DecimalField(source='amount_eth', max_digits=32, decimal_places=18)
+
+    class Meta:
+        model = BulkSendJob
+        fields = [
+            'job_id', 'status', 'master_wallet', 'amount_per_wallet', 'send_tx',
+            'total_recipients', 'processed', 'failed', 'error_message', 'created_at', 'updated_at'
+        ]
+
+
+class BulkSendItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BulkSendItem
+        fields = ['position', 'recipient', 'status', 'nonce', 'tx_hash', 'error_message']
+
 
+class BulkSendJobDetailSerializer(BulkSendJobSerializer):
+    results = BulkSendItemSerializer(many=True, read_only=True)
 
-class BulkSendResponseSerializer(serializers.Serializer):
-    master_wallet = serializers.CharField()
-    total_recipients = serializers.IntegerField()
-    amount_per_wallet = serializers.CharField()
-    total_amount = serializers.CharField()
-    master_balance_before = serializers.CharField()
-    master_balance_after = serializers.CharField()
-    transactions = serializers.ListField(child=serializers.DictField())
+    class Meta(BulkSendJobSerializer.Meta):
+        fields = BulkSendJobSerializer.Meta.fields + ['results']
@@ -0,0 +1,281 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import wait
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def sign_node_request(secret: str, node_url: str, method: str, path: str, query: str = '', body: bytes = b'') -> Dict[str, str]:
+    """
+    Заголовки подписи запроса к ноде: HMAC-SHA256(secret, method, path, query, timestamp, body).
+    Нода с LEASE_API_SECRET принимает аренды и /get_shard только с такой подписью
+    """
+    timestamp = str(int(time.time()))
+    full_path = urlsplit(node_url).path.rstrip('/') + path
+    message = f"{method}\n{full_path}\n{query}\n{timestamp}\n".encode() + body
+    return {
+        'X-Node-Timestamp': timestamp,
+        'X-Node-Signature': hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+    }
+
+
+class ShardLease:
+    """
+    Аренда шардов у всех 3 нод: собранный мнемоник, срок и лимит использований.
+
+    Срок считается по monotonic от момента запроса аренды (раньше, чем ноды его начали),
+    поэтому API перестает использовать ключ не позже, чем истечет аренда на любой ноде.
+    """
+
+    def __init__(self, lease_ids: Dict[str, str], mnemonic: str, expires_at: float, max_uses: int):
+        self.lease_ids = lease_ids
+        self._mnemonic = bytearray(mnemonic.encode())
+        self.expires_at = expires_at
+        self.max_uses = max_uses
+        self.uses = 0
+
+    @property
+    def mnemonic(self) -> str:
+        return self._mnemonic.decode()
+
+    def usable(self) -> bool:
+        return self.uses < self.max_uses and time.monotonic() < self.expires_at
+
+    def zeroize(self):
+        for i in range(len(self._mnemonic)):
+            self._mnemonic[i] = 0
+
+
+class LeaseManager:
+    """
+    Аренда шардов вместо /get_shard на каждую подпись.
+
+    Ноды выдают шард с TTL и лимитом использований, привязанный к instance id процесса;
+    запросы подписаны MPC_LEASE_SECRET, шард зашифрован ключом аренды (SHARD_ENCRYPTION_KEY,
+    секрет API, lease id и instance id). Пока аренда действует, мнемоник берется из памяти -
+    ноды не участвуют в пачках подписей. Фоновый поток сообщает нодам число использований
+    и сбрасывает ключ (вместе с KeyCache), как только любая нода ответит 404/410 (отзыв, срок, лимит).
+    Если аренду получить не удалось, вызывающий код идет по старому пути (get_shards);
+    повторная попытка аренды - не раньше чем через retry_seconds.
+    """
+
+    def __init__(self, mpc_client, secret: str, ttl_seconds: int, max_uses: int, check_interval: float,
+                 retry_seconds: float = 30):
+        self.mpc_client = mpc_client
+        self.secret = secret
+        self.ttl_seconds = ttl_seconds
+        self.max_uses = max_uses
+        self.check_interval = check_interval
+        self.retry_seconds = retry_seconds
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lease: Optional[ShardLease] = None
+        # _lock - короткие операции с текущей арендой; _acquire_lock - один запрос аренды на процесс
+        self._lock = threading.Lock()
+        self._acquire_lock = threading.Lock()
+        self._retry_after = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    def _send(self, node_url: str, method: str, path: str, payload: Optional[Dict] = None):
+        body = json.dumps(payload).encode() if payload is not None else b''
+        headers = sign_node_request(self.secret, node_url, method, path, body=body)
+        if payload is not None:
+            headers['Content-Type'] = 'application/json'
+        return self.mpc_client.session_for(node_url).request(
+            method,
+            f"{node_url}{path}",
+            data=body,
+            headers=headers,
+            timeout=self.mpc_client.shard_deadline
+        )
+
+    def _request_lease(self, node_url: str) -> Dict:
+        response = self._send(node_url, 'POST', '/lease', payload={
+            'instance_id': self.instance_id,
+            'ttl_seconds': self.ttl_seconds,
+            'max_uses': self.max_uses
+        })
+        if response.status_code != 201:
+            raise Exception(f"HTTP {response.status_code}")
+        data = response.json()
+        binding = f":{self.secret}:{data['lease_id']}:{self.instance_id}"
+        return {
+            'lease_id': data['lease_id'],
+            'shard': self.mpc_client.decrypt_shard(data['encrypted_shard'], binding),
+            'ttl_seconds': data['ttl_seconds'],
+            'max_uses': data['max_uses']
+        }
+
+    def acquire(self) -> ShardLease:
+        """
+        Аренда у всех 3 нод параллельно (общий дедлайн MPC_SHARD_DEADLINE_SECONDS).
+        Если хотя бы одна нода отказала, полученные аренды отзываются
+        """
+        started = time.monotonic()
+        nodes = self.mpc_client.nodes
+        futures = {
+            self.mpc_client.executor.submit(self._request_lease, node_url): (i, node_url)
+            for i, node_url in enumerate(nodes, 1)
+        }
+        done, not_done = wait(futures, timeout=self.mpc_client.shard_deadline)
+
+        grants = {}
+        errors = []
+        for future in done:
+            i, node_url = futures[future]
+            try:
+                grants[i] = (node_url, future.result())
+            except Exception as e:
+                errors.append(f"{node_url}: {e}")
+        for future in not_done:
+            errors.append(f"{futures[future][1]}: no response in {self.mpc_client.shard_deadline}s")
+
+        if len(grants) != len(nodes):
+            self._release({node_url: grant['lease_id'] for node_url, grant in grants.values()})
+            raise Exception(f"Lease refused ({'; '.join(errors)})")
+
+        lease = ShardLease(
+            lease_ids={node_url: grant['lease_id'] for node_url, grant in grants.values()},
+            mnemonic=self.mpc_client.combine_shards({i: grant['shard'] for i, (_, grant) in grants.items()}),
+            expires_at=started + min(grant['ttl_seconds'] for _, grant in grants.values()),
+            max_uses=min(grant['max_uses'] for _, grant in grants.values())
+        )
+        logger.info(
+            f"Shard lease acquired by {self.instance_id}: "
+            f"{lease.expires_at - started:.0f}s, {lease.max_uses} uses"
+        )
+        return lease
+
+    def try_use(self) -> Optional[str]:
+        """
+        Мнемоник действующей аренды без сетевых вызовов (одно использование); None - аренды нет
+        """
+        with self._lock:
+            lease = self._lease
+            if lease is None or not lease.usable():
+                return None
+            lease.uses += 1
+            return lease.mnemonic
+
+    def mnemonic(self) -> Optional[str]:
+        """
+        Мнемоник из аренды, при необходимости - новая аренда (одна на процесс одновременно).
+        None - аренда недоступна, нужно идти за шардами напрямую
+        """
+        mnemonic = self.try_use()
+        if mnemonic is not None:
+            return mnemonic
+
+        with self._acquire_lock:
+            # Пока ждали, аренду мог получить другой поток
+            mnemonic = self.try_use()
+            if mnemonic is not None:
+                return mnemonic
+
+            with self._lock:
+                stale = self._lease
+            if stale is not None:
+                self.drop(stale, 'expired' if stale.uses < stale.max_uses else 'use limit reached')
+
+            if time.monotonic() < self._retry_after:
+                return None
+            try:
+                lease = self.acquire()
+            except Exception as e:
+                self._retry_after = time.monotonic() + self.retry_seconds
+                logger.warning(f"Shard lease unavailable, fetching shards per request for {self.retry_seconds:.0f}s: {e}")
+                return None
+
+            lease.uses = 1
+            with self._lock:
+                self._lease = lease
+            self.start()
+            return lease.mnemonic
+
+    def drop(self, lease: ShardLease, reason: str):
+        """
+        Сброс аренды: мнемоник и производные ключи в KeyCache затираются, ноды освобождают аренду
+        """
+        with self._lock:
+            if self._lease is lease:
+                self._lease = None
+
+        self.mpc_client.key_cache.evict(lease.mnemonic)
+        lease.zeroize()
+        logger.info(f"Shard lease dropped ({reason}) after {lease.uses} uses")
+
+        try:
+            self.mpc_client.executor.submit(self._release, lease.lease_ids)
+        except RuntimeError:
+            # Пул закрыт - интерпретатор завершается, аренды истекут на нодах сами
+            pass
+
+    def _release(self, lease_ids: Dict[str, str]):
+        for node_url, lease_id in lease_ids.items():
+            try:
+                self._send(node_url, 'DELETE', f'/lease/{lease_id}')
+            except Exception as e:
+                logger.warning(f"Failed to release lease {lease_id} on {node_url}: {e}")
+
+    def _check_node(self, node_url: str, lease_id: str, uses: int) -> int:
+        response = self._send(node_url, 'POST', f'/lease/{lease_id}/uses', payload={
+            'instance_id': self.instance_id,
+            'uses': uses
+        })
+        return response.status_code
+
+    def check(self):
+        """
+        Сверка аренды с нодами; отзыв или истечение на любой ноде сбрасывает ключ.
+        Недоступная нода аренду не сбрасывает - ее ограничивает собственный срок
+        """
+        with self._lock:
+            lease = self._lease
+            uses = lease.uses if lease is not None else 0
+        if lease is None:
+            return
+
+        if time.monotonic() >= lease.expires_at:
+            self.drop(lease, 'expired')
+            return
+
+        futures = {
+            self.mpc_client.executor.submit(self._check_node, node_url, lease_id, uses): node_url
+            for node_url, lease_id in lease.lease_ids.items()
+        }
+        done, not_done = wait(futures, timeout=self.mpc_client.shard_deadline)
+        for future in done:
+            try:
+                status_code = future.result()
+            except Exception as e:
+                logger.warning(f"Lease check on {futures[future]} failed: {e}")
+                continue
+            if status_code in (404, 410):
+                self.drop(lease, f"revoked by {futures[future]} (HTTP {status_code})")
+                return
+
+    def _check_loop(self):
+        while True:
+            time.sleep(self.check_interval)
+            try:
+                self.check()
+            except RuntimeError:
+                # Пул потоков закрыт - интерпретатор завершается
+                return
+            except Exception as e:
+                logger.warning(f"Lease check failed: {e}")
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._check_loop, name='mpc-lease-check', daemon=True)
+            self._thread.start()
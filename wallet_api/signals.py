@@ -0,0 +1,25 @@
+import logging
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Wallet
+from .whitelist import get_whitelist_index
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_delete, sender=Wallet)
+def remove_from_whitelist_index(sender, instance, **kwargs):
+    """
+    Удаленный кошелек (админка, shell) убирается из whitelist индекса после коммита удаления
+    """
+    address = instance.address
+
+    def remove():
+        try:
+            get_whitelist_index().remove([address])
+        except Exception as e:
+            # Индекс не обновился - кошелек останется в whitelist до manage.py rebuild_whitelist_index
+            logger.error(f"Failed to remove {address} from whitelist index: {e}")
+
+    transaction.on_commit(remove)
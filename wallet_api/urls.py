@@ -1,12 +1,33 @@
+from django.conf import settings
 from django.urls import path
-from .views import CreateWalletView, SignTransactionView, WalletListView, BulkSendView, ConfigView, TransactionListView, HealthView
+from .views import CreateWalletView, CreateWalletBatchView, SignTransactionView, WalletListView, BulkSendView, BulkSendUploadView, BulkSendJobView, ConfigView, TransactionListView, TransactionExportView, HealthView
 
 urlpatterns = [
     path('health', HealthView.as_view(), name='health'),
     path('config', ConfigView.as_view(), name='config'),
     path('wallet/create', CreateWalletView.as_view(), name='create_wallet'),
+    path('wallet/create-batch', CreateWalletBatchView.as_view(), name='create_wallet_batch'),
     path('wallet/sign', SignTransactionView.as_view(), name='sign_transaction'),
     path('wallet/bulk-send', BulkSendView.as_view(), name='bulk_send'),
+    path('wallet/bulk-send/upload', BulkSendUploadView.as_view(), name='bulk_send_upload'),
+    path('wallet/bulk-send/<int:job_id>', BulkSendJobView.as_view(), name='bulk_send_job'),
     path('wallets', WalletListView.as_view(), name='list_wallets'),
     path('transactions', TransactionListView.as_view(), name='list_transactions'),
+    path('transactions/export/<str:export_format>', TransactionExportView.as_view(), name='export_transactions'),
 ]
+
+if settings.ASYNC_VIEWS:
+    # ASGI: MPC/RPC-зависимые endpoints на async views (те же пути и имена)
+    from .async_views import AsyncCreateWalletView, AsyncSignTransactionView, AsyncBulkSendView, AsyncHealthView
+
+    async_views = {
+        'health': AsyncHealthView,
+        'create_wallet': AsyncCreateWalletView,
+        'sign_transaction': AsyncSignTransactionView,
+        'bulk_send': AsyncBulkSendView,
+    }
+    urlpatterns = [
+        path(str(pattern.pattern), async_views[pattern.name].as_view(), name=pattern.name)
+        if pattern.name in async_views else pattern
+        for pattern in urlpatterns
+    ]
@@ -1,30 +1,97 @@
-from rest_framework import status
+from rest_framework import exceptions, generics, status
 from rest_framework.views import APIView
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
-from .models import Wallet, Transaction
+from .models import Wallet, Transaction, WalletLedgerEntry, BulkSendJob, BulkSendItem
 from .serializers import (
     WalletSerializer,
     CreateWalletSerializer,
+    CreateWalletBatchSerializer,
     SignTransactionSerializer,
     SignTransactionResponseSerializer,
     TransactionSerializer
 )
-from .authentication import SHA256Authentication
-from .mpc_client import MPCClient
-from web3 import Web3
+from .serializers_bulk import (
+    BulkSendSerializer,
+    BulkSendParamsSerializer,
+    BulkSendJobSerializer,
+    BulkSendJobDetailSerializer,
+    BulkSendItemSerializer
+)
+from .authentication import SHA256Authentication, StreamingSHA256Authentication
+from .pagination import KeysetPagination
+from .renderers import ORJSONRenderer
+from . import bulk_jobs, bulk_upload, export
+from .mpc_client import get_mpc_client
+from .hd_index import get_hd_index_allocator
+from .eth_client import get_eth_client
+from .fee_oracle import FeeOracle
+from .whitelist import get_whitelist_index
+from .health import get_health_prober
+from .address_pool import get_address_pool
 from django.conf import settings
+from django.db import transaction as db_transaction
+from django.http import StreamingHttpResponse
 from decimal import Decimal
+from web3 import Web3
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 import logging
+import tempfile
 
 logger = logging.getLogger(__name__)
 
 
-class CreateWalletView(APIView):
+def add_to_whitelist_index(wallets):
+    """
+    Дописывает новые кошельки в whitelist индекс; сбой индекса не ломает создание -
+    при промахе индекс перепроверяет БД
+    """
+    try:
+        get_whitelist_index().add(wallets)
+    except Exception as e:
+        logger.warning(f"Failed to update whitelist index: {e}")
+
+
+class CreateWalletMixin:
+    """
+    Общие шаги создания одного кошелька (WSGI и ASGI view): пул, выдача пути, запись и whitelist.
+    Деривация адреса (сетевой вызов к MPC нодам) - в самих view
+    """
+
+    def claim_or_allocate(self, hd_path):
+        """
+        (кошелек из пула, путь) или (None, путь для деривации); явный путь учитывается в аллокаторе
+        """
+        # Адрес из пула - один UPDATE, без MPC нод и деривации
+        pool = get_address_pool()
+        claimed = pool.claim(hd_paths=[hd_path] if hd_path else None) if pool.enabled else []
+        if claimed:
+            return claimed[0], claimed[0].hd_path
+
+        allocator = get_hd_index_allocator()
+        if hd_path:
+            allocator.mark_used(hd_path)
+        else:
+            hd_path = allocator.allocate()[0]
+        return None, hd_path
+
+    def save_wallet(self, wallet_data):
+        return Wallet.objects.create(
+            address=wallet_data['address'],
+            hd_path=wallet_data['hd_path']
+        )
+
+    def created_response(self, wallet):
+        add_to_whitelist_index([(wallet.address, wallet.hd_path)])
+        return Response(WalletSerializer(wallet).data, status=status.HTTP_201_CREATED)
+
+
+class CreateWalletView(CreateWalletMixin, APIView):
     """
     POST /api/wallet/create
 
-    Создает новый ETH кошелек через MPC ноды с HD деривацией
+    Создает новый ETH кошелек через MPC ноды с HD деривацией (или выдает адрес из пула)
     """
     authentication_classes = [SHA256Authentication]
 
@@ -40,20 +107,71 @@ class CreateWalletView(APIView):
 
         hd_path = serializer.validated_data.get('hd_path')
 
-        if not hd_path:
-            wallet_count = Wallet.objects.count()
-            hd_path = f"m/44'/60'/0'/0/{wallet_count}"
-
         try:
-            mpc_client = MPCClient()
-            wallet_data = mpc_client.generate_wallet(hd_path)
+            wallet, hd_path = self.claim_or_allocate(hd_path)
+            if wallet is None:
+                wallet = self.save_wallet(get_mpc_client().generate_wallet(hd_path))
+            return self.created_response(wallet)
 
-            wallet = Wallet.objects.create(
-                address=wallet_data['address'],
-                hd_path=wallet_data['hd_path']
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-            response_serializer = WalletSerializer(wallet)
+
+class CreateWalletBatchView(APIView):
+    """
+    POST /api/wallet/create-batch
+
+    Создает пачку ETH кошельков: один запрос шардов к MPC нодам и один bulk_create
+    """
+    authentication_classes = [SHA256Authentication]
+
+    @extend_schema(
+        request=CreateWalletBatchSerializer,
+        responses={201: WalletSerializer(many=True)},
+        description="Create a batch of ETH wallets from one MPC shard fetch. Pass either count or hd_paths; addresses are returned in order."
+    )
+    def post(self, request):
+        serializer = CreateWalletBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        hd_paths = serializer.validated_data.get('hd_paths')
+        count = len(hd_paths) if hd_paths else serializer.validated_data['count']
+
+        try:
+            # Сколько есть в пуле - забирается одним UPDATE, остальное создается как раньше
+            pool = get_address_pool()
+            claimed = pool.claim(count, hd_paths) if pool.enabled else []
+            claimed_paths = {wallet.hd_path for wallet in claimed}
+
+            allocator = get_hd_index_allocator()
+            if hd_paths:
+                new_paths = [hd_path for hd_path in hd_paths if hd_path not in claimed_paths]
+                allocator.mark_used(*new_paths)
+            else:
+                new_paths = allocator.allocate(count - len(claimed)) if count > len(claimed) else []
+
+            created = []
+            if new_paths:
+                mpc_client = get_mpc_client()
+                wallets_data = mpc_client.generate_wallets(new_paths)
+
+                created = Wallet.objects.bulk_create([
+                    Wallet(address=wallet_data['address'], hd_path=wallet_data['hd_path'])
+                    for wallet_data in wallets_data
+                ])
+
+            wallets = claimed + created
+            if hd_paths:
+                # Порядок ответа - порядок hd_paths в запросе
+                by_path = {wallet.hd_path: wallet for wallet in wallets}
+                wallets = [by_path[hd_path] for hd_path in hd_paths]
+            add_to_whitelist_index([(wallet.address, wallet.hd_path) for wallet in wallets])
+
+            response_serializer = WalletSerializer(wallets, many=True)
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
         except Exception as e:
@@ -63,7 +181,135 @@ class CreateWalletView(APIView):
             )
 
 
-class SignTransactionView(APIView):
+class SignTransactionMixin:
+    """
+    Общие шаги подписи и отправки одной транзакции (WSGI и ASGI view).
+    Сетевые вызовы (баланс, газ, подпись через MPC, отправка) - в самих view
+    """
+    gas_limit = 21000
+
+    def whitelist_error(self, address, to_address):
+        """
+        Отправитель и получатель должны быть в whitelist; None - оба есть
+        """
+        whitelist = get_whitelist_index()
+
+        if not whitelist.contains(address):
+            return Response(
+                {'error': f'Wallet {address} not in whitelist. Create wallet first via /api/wallet/create'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        if not whitelist.contains(to_address):
+            return Response(
+                {'error': f'Recipient wallet {to_address} not in whitelist. Create wallet first via /api/wallet/create'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return None
+
+    @staticmethod
+    def sweeps_balance(amount) -> bool:
+        # amount=0 - отправить весь баланс за вычетом газа
+        return float(amount) == 0
+
+    def transfer_amount(self, amount, fee_fields, balance_wei=None):
+        """
+        (amount, amount_wei, error_response); при amount=0 нужен balance_wei,
+        error_response - баланса не хватает даже на газ
+        """
+        if not self.sweeps_balance(amount):
+            return amount, Web3.to_wei(float(amount), 'ether'), None
+
+        gas_cost = FeeOracle.max_price_per_gas(fee_fields) * self.gas_limit
+        if balance_wei <= gas_cost:
+            return amount, 0, Response(
+                {'error': 'Insufficient balance for gas fees',
+                 'balance': str(Web3.from_wei(balance_wei, 'ether')),
+                 'gas_cost': str(Web3.from_wei(gas_cost, 'ether'))},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        amount_wei = balance_wei - gas_cost
+        return Web3.from_wei(amount_wei, 'ether'), amount_wei, None
+
+    @staticmethod
+    def take_nonce(nonce_manager, address, send_tx) -> int:
+        # Nonce резервируется только под отправку; подпись без отправки не сдвигает счетчик
+        if send_tx == 1:
+            return nonce_manager.reserve(address)
+        return nonce_manager.peek(address)
+
+    def build_transaction(self, nonce, to_address, amount_wei, chain_id, fee_fields):
+        return {
+            'nonce': nonce,
+            'to': to_address,
+            'value': amount_wei,
+            'gas': self.gas_limit,
+            'chainId': chain_id,
+            **fee_fields
+        }
+
+    @staticmethod
+    def record_transaction(address, to_address, amount, **fields):
+        # Журнал транзакций не должен менять ответ: подпись уже сделана (или уже упала)
+        try:
+            Transaction.objects.create(
+                from_address=address,
+                to_address=to_address,
+                amount_eth=Decimal(str(amount)),
+                **fields
+            )
+        except Exception as e:
+            logger.warning(f"Failed to record transaction {address} -> {to_address}: {e}")
+
+    def signed_response(self, address, to_address, amount, sign_result, send_tx):
+        raw_tx = sign_result['raw_transaction']
+        tx_hash = sign_result['tx_hash']
+
+        self.record_transaction(
+            address, to_address, amount,
+            tx_hash=tx_hash if tx_hash else 'N/A',
+            status=Transaction.STATUS_OK,
+            broadcasted=(send_tx == 1)
+        )
+
+        response_serializer = SignTransactionResponseSerializer(data={
+            'signature': raw_tx,
+            'tx_hash': tx_hash,
+            'raw_transaction': raw_tx
+        })
+        if response_serializer.is_valid():
+            return Response(response_serializer.data, status=status.HTTP_200_OK)
+        return Response(response_serializer.errors, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def failed_response(self, address, to_address, amount, error, nonce_manager=None, reserved_nonce=None,
+                        broadcast_hash=None):
+        """
+        Ответ на ошибку подписи/отправки. Зарезервированный nonce освобождается (иначе следующие
+        транзакции встанут за пропуском), если транзакция точно не ушла в сеть: при ошибке
+        отправки (broadcast_hash) сначала проверяется, не приняла ли ее сеть
+        """
+        if nonce_manager is not None and reserved_nonce is not None:
+            known = nonce_manager.eth_client.transaction_known(broadcast_hash) if broadcast_hash else False
+            if known is False:
+                nonce_manager.release(address, reserved_nonce)
+            else:
+                logger.warning(f"Broadcast of {broadcast_hash} failed but it may be in the network, nonce {reserved_nonce} kept")
+
+        self.record_transaction(
+            address, to_address, amount,
+            tx_hash='ERROR',
+            status=Transaction.STATUS_ERROR,
+            error_message=str(error),
+            broadcasted=False
+        )
+        return Response(
+            {'error': str(error)},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+
+class SignTransactionView(SignTransactionMixin, APIView):
     """
     POST /api/wallet/sign
 
@@ -97,145 +343,107 @@ class SignTransactionView(APIView):
         amount = serializer.validated_data['amount']
         send_tx = serializer.validated_data.get('send_tx', 0)
 
-        # Whitelist check: from wallet must exist in DB
-        try:
-            wallet = Wallet.objects.get(address=address)
-        except Wallet.DoesNotExist:
-            return Response(
-                {'error': f'Wallet {address} not in whitelist. Create wallet first via /api/wallet/create'},
-                status=status.HTTP_403_FORBIDDEN
-            )
+        error_response = self.whitelist_error(address, to_address)
+        if error_response:
+            return error_response
 
-        # Whitelist check: to wallet must exist in DB
-        if not Wallet.objects.filter(address=to_address).exists():
-            return Response(
-                {'error': f'Recipient wallet {to_address} not in whitelist. Create wallet first via /api/wallet/create'},
-                status=status.HTTP_403_FORBIDDEN
-            )
+        nonce_manager = None
+        reserved_nonce = None
+        broadcast_hash = None
 
         try:
-            w3 = Web3(Web3.HTTPProvider(
-                f"https://{settings.INFURA_NETWORK}.infura.io/v3/{settings.INFURA_API_KEY}"
-            ))
+            eth_client = get_eth_client()
+            w3 = eth_client.w3
 
-            if not w3.is_connected():
+            if not eth_client.is_connected():
                 return Response(
                     {'error': 'Failed to connect to Ethereum network'},
                     status=status.HTTP_503_SERVICE_UNAVAILABLE
                 )
 
-            nonce = w3.eth.get_transaction_count(address)
-            gas_price = w3.eth.gas_price
-            gas_limit = 21000
-
-            if float(amount) == 0:
-                balance_wei = w3.eth.get_balance(address)
-                gas_cost = gas_price * gas_limit
+            fee_fields = eth_client.fee_oracle.fee_fields()
+            balance_wei = w3.eth.get_balance(address) if self.sweeps_balance(amount) else None
+            amount, amount_wei, error_response = self.transfer_amount(amount, fee_fields, balance_wei)
+            if error_response:
+                return error_response
 
-                if balance_wei <= gas_cost:
-                    return Response(
-                        {'error': 'Insufficient balance for gas fees',
-                         'balance': str(w3.from_wei(balance_wei, 'ether')),
-                         'gas_cost': str(w3.from_wei(gas_cost, 'ether'))},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-
-                amount_wei = balance_wei - gas_cost
-                amount = w3.from_wei(amount_wei, 'ether')
-            else:
-                amount_wei = w3.to_wei(float(amount), 'ether')
-
-            transaction = {
-                'nonce': nonce,
-                'to': to_address,
-                'value': amount_wei,
-                'gas': gas_limit,
-                'gasPrice': gas_price,
-                'chainId': w3.eth.chain_id
-            }
-
-            mpc_client = MPCClient()
-            sign_result = mpc_client.sign_transaction(w3, transaction, address)
+            nonce_manager = eth_client.nonce_manager
+            nonce = self.take_nonce(nonce_manager, address, send_tx)
+            if send_tx == 1:
+                reserved_nonce = nonce
 
-            raw_tx = sign_result['raw_transaction']
-            tx_hash = sign_result['tx_hash']
+            transaction = self.build_transaction(nonce, to_address, amount_wei, eth_client.chain_id, fee_fields)
+            sign_result = get_mpc_client().sign_transaction(w3, transaction, address)
 
             if send_tx == 1:
-                logger.info(f"Broadcasting transaction {tx_hash} to network")
-                w3.eth.send_raw_transaction(raw_tx)
-                logger.info(f"Transaction {tx_hash} sent successfully")
-
-            try:
-                Transaction.objects.create(
-                    tx_hash=tx_hash if tx_hash else 'N/A',
-                    from_address=address,
-                    to_address=to_address,
-                    amount_eth=Decimal(str(amount)),
-                    status=Transaction.STATUS_OK,
-                    broadcasted=(send_tx == 1)
-                )
-            except Exception:
-                pass
+                broadcast_hash = sign_result['tx_hash']
+                logger.info(f"Broadcasting transaction {broadcast_hash} to network")
+                w3.eth.send_raw_transaction(sign_result['raw_transaction'])
+                logger.info(f"Transaction {broadcast_hash} sent successfully")
 
-            response_serializer = SignTransactionResponseSerializer(data={
-                'signature': raw_tx,
-                'tx_hash': tx_hash,
-                'raw_transaction': raw_tx
-            })
+        except Exception as e:
+            return self.failed_response(address, to_address, amount, e, nonce_manager, reserved_nonce, broadcast_hash)
 
-            if response_serializer.is_valid():
-                return Response(response_serializer.data, status=status.HTTP_200_OK)
-            else:
-                return Response(
-                    response_serializer.errors,
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
+        return self.signed_response(address, to_address, amount, sign_result, send_tx)
 
-        except Exception as e:
-            try:
-                Transaction.objects.create(
-                    tx_hash='ERROR',
-                    from_address=address,
-                    to_address=to_address,
-                    amount_eth=Decimal(str(amount)),
-                    status=Transaction.STATUS_ERROR,
-                    error_message=str(e),
-                    broadcasted=False
-                )
-            except Exception:
-                pass
 
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+class ValuesListMixin:
+    """
+    Быстрый путь чтения для списков: строки через values() без модельных объектов
+    и без прогона через сериализатор, рендер - orjson.
+    Набор полей берется из serializer_class (он же описывает схему ответа).
+    """
+    renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
 
+    def list(self, request, *args, **kwargs):
+        fields = list(self.get_serializer_class()().fields)
+        drop_id = 'id' not in fields
+        # id нужен пагинатору для курсора
+        rows = self.paginate_queryset(self.get_queryset().values('id', *fields))
+        if drop_id:
+            for row in rows:
+                del row['id']
+        return self.get_paginated_response(rows)
 
-class WalletListView(APIView):
+
+class WalletListView(ValuesListMixin, generics.ListAPIView):
     """
     GET /api/wallets
 
-    Возвращает список всех созданных кошельков
+    Возвращает список созданных кошельков постранично (keyset курсор)
     """
     authentication_classes = [SHA256Authentication]
+    serializer_class = WalletSerializer
+    pagination_class = KeysetPagination
 
-    @extend_schema(
-        responses={200: WalletSerializer(many=True)},
-        description="List all created wallets"
-    )
-    def get(self, request):
-        wallets = Wallet.objects.all()
-        serializer = WalletSerializer(wallets, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    @extend_schema(description="List created wallets, newest first, cursor-paginated")
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return Wallet.objects.all()
 
 
-class TransactionListView(APIView):
+def filter_transactions(wallet_address=None):
+    """
+    Транзакции кошелька (from ИЛИ to, через индекс WalletLedgerEntry) или все транзакции
+    """
+    if wallet_address:
+        return Transaction.objects.filter(
+            id__in=WalletLedgerEntry.objects.filter(wallet=wallet_address).values('transaction_id')
+        )
+    return Transaction.objects.all()
+
+
+class TransactionListView(ValuesListMixin, generics.ListAPIView):
     """
     GET /api/transactions
 
-    Возвращает список транзакций с фильтрацией по кошельку
+    Возвращает список транзакций постранично (keyset курсор) с фильтрацией по кошельку
     """
     authentication_classes = [SHA256Authentication]
+    serializer_class = TransactionSerializer
+    pagination_class = KeysetPagination
 
     @extend_schema(
         parameters=[
@@ -247,100 +455,105 @@ class TransactionListView(APIView):
                 required=False
             )
         ],
-        responses={200: TransactionSerializer(many=True)},
-        description="List all transactions, optionally filtered by wallet address"
+        description="List transactions, newest first, cursor-paginated, optionally filtered by wallet address"
     )
-    def get(self, request):
-        from django.db.models import Q
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return filter_transactions(self.request.query_params.get('wallet'))
 
+    def list(self, request, *args, **kwargs):
         wallet_address = request.query_params.get('wallet')
+        if not wallet_address:
+            return super().list(request, *args, **kwargs)
+
+        # История кошелька: страница ключей - seek по индексу журнала, затем транзакции по id
+        self.paginator.key_fields = ('created_at', 'transaction_id')
+        entries = self.paginate_queryset(
+            WalletLedgerEntry.objects.filter(wallet=wallet_address).values('created_at', 'transaction_id')
+        )
+        ids = [entry['transaction_id'] for entry in entries]
+
+        fields = list(self.get_serializer_class()().fields)
+        by_id = {row.pop('id'): row for row in Transaction.objects.filter(id__in=ids).values('id', *fields)}
+        return self.get_paginated_response([by_id[tx_id] for tx_id in ids if tx_id in by_id])
+
 
-        if wallet_address:
-            transactions = Transaction.objects.filter(
-                Q(from_address=wallet_address) | Q(to_address=wallet_address)
+class TransactionExportView(APIView):
+    """
+    GET /api/transactions/export/<ndjson|csv>
+
+    Потоковая выгрузка журнала транзакций (NDJSON или CSV, опционально gzip).
+    Строки читаются серверным курсором и отдаются кусками - память не растет с числом строк.
+    """
+    authentication_classes = [SHA256Authentication]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='wallet', type=str, location=OpenApiParameter.QUERY,
+                             description='Filter by wallet address (from OR to)', required=False),
+            OpenApiParameter(name='gzip', type=bool, location=OpenApiParameter.QUERY,
+                             description='Compress the stream (.gz attachment)', required=False),
+        ],
+        responses={(200, 'application/x-ndjson'): OpenApiTypes.STR, (200, 'text/csv'): OpenApiTypes.STR},
+        description="Stream the transaction log as NDJSON or CSV"
+    )
+    def get(self, request, export_format):
+        if export_format not in export.FORMATS:
+            return Response(
+                {'error': f'Unsupported format {export_format}, use one of: {", ".join(export.FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        else:
-            transactions = Transaction.objects.all()
 
-        data = [{
-            'tx_hash': tx.tx_hash,
-            'from_address': tx.from_address,
-            'to_address': tx.to_address,
-            'amount_eth': tx.amount_eth,
-            'status': tx.status,
-            'error_message': tx.error_message,
-            'broadcasted': tx.broadcasted,
-            'created_at': tx.created_at
-        } for tx in transactions]
+        use_gzip = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+        transactions = filter_transactions(request.query_params.get('wallet'))
+
+        filename = f"transactions.{export_format}"
+        if use_gzip:
+            filename += '.gz'
+            content_type = 'application/gzip'
+        else:
+            content_type = export.CONTENT_TYPES[export_format]
 
-        serializer = TransactionSerializer(data=data, many=True)
-        if serializer.is_valid():
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(
+            export.stream_transactions(transactions, export_format, gzip=use_gzip),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
 
 class HealthView(APIView):
     """
     GET /api/health
 
-    Проверка состояния сервиса: БД и все 3 MPC ноды
+    Состояние сервиса: БД и все 3 MPC ноды из снимка фоновой проверки.
+    ?fresh=1 - принудительная проверка (все ноды одновременно), не чаще раза в MPC_HEALTH_FRESH_MIN_INTERVAL_SECONDS
     """
     authentication_classes = []
 
     @extend_schema(
+        parameters=[
+            OpenApiParameter('fresh', OpenApiTypes.INT, description='1 - probe nodes and database now instead of returning the cached snapshot (rate limited: a snapshot younger than MPC_HEALTH_FRESH_MIN_INTERVAL_SECONDS is returned as is)'),
+        ],
         responses={
             200: {
                 'type': 'object',
                 'properties': {
                     'status': {'type': 'string'},
                     'database': {'type': 'string'},
-                    'mpc_nodes': {'type': 'object'}
+                    'mpc_nodes': {'type': 'object'},
+                    'address_pool': {'type': 'object'},
+                    'checked_at': {'type': 'string', 'format': 'date-time'}
                 }
             }
         },
-        description="Health check: database and MPC nodes status (no auth required)"
+        description="Health check: database and MPC nodes status from the background prober (no auth required). Each node reports status, latency_ms and last_seen. address_pool (when ADDRESS_POOL_SIZE > 0) reports pool depth and this worker's claim/miss/fill counters."
     )
     def get(self, request):
-        from django.db import connection
-        import requests
-
-        health = {
-            'status': 'healthy',
-            'database': 'unknown',
-            'mpc_nodes': {}
-        }
-
-        # Check database
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute('SELECT 1')
-            health['database'] = 'ok'
-        except Exception as e:
-            health['database'] = f'error: {str(e)}'
-            health['status'] = 'unhealthy'
-
-        # Check MPC nodes
-        nodes = [
-            ('node1', settings.MPC_NODE_1_URL),
-            ('node2', settings.MPC_NODE_2_URL),
-            ('node3', settings.MPC_NODE_3_URL)
-        ]
-
-        for node_name, node_url in nodes:
-            try:
-                resp = requests.get(f'{node_url}/health', timeout=2)
-                if resp.status_code == 200:
-                    data = resp.json()
-                    health['mpc_nodes'][node_name] = {
-                        'status': 'ok',
-                        'has_shard': data.get('has_shard', False)
-                    }
-                else:
-                    health['mpc_nodes'][node_name] = {'status': f'error: HTTP {resp.status_code}'}
-                    health['status'] = 'unhealthy'
-            except Exception as e:
-                health['mpc_nodes'][node_name] = {'status': f'error: {str(e)}'}
-                health['status'] = 'unhealthy'
+        prober = get_health_prober()
+        health = prober.fresh() if request.query_params.get('fresh') == '1' else prober.snapshot()
 
         status_code = status.HTTP_200_OK if health['status'] == 'healthy' else status.HTTP_503_SERVICE_UNAVAILABLE
         return Response(health, status=status_code)
@@ -391,11 +604,98 @@ class ConfigView(APIView):
         return Response(config, status=status.HTTP_200_OK)
 
 
-class BulkSendView(APIView):
+class BulkSendMixin:
+    """
+    Общие шаги постановки задания массовой отправки (JSON и потоковая загрузка)
+    """
+    master_hd_path = "m/44'/60'/0'/0/0"
+
+    def master_wallet_error(self, whitelist, master_address):
+        if whitelist.contains(master_address):
+            return None
+        return Response(
+            {'error': f'Master wallet {master_address} not in whitelist. Create it first via /api/wallet/create with hd_path={self.master_hd_path}'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    def recipients_error(self, master_address, recipient_addresses):
+        """
+        Whitelist: мастер кошелек и все получатели (один проход по индексу); None - если все есть
+        """
+        whitelist = get_whitelist_index()
+
+        error_response = self.master_wallet_error(whitelist, master_address)
+        if error_response:
+            return error_response
+
+        missing_recipients = whitelist.missing(recipient_addresses)
+        if missing_recipients:
+            return Response(
+                {'error': f'Recipient wallet {missing_recipients[0]} not in whitelist. Create all recipient wallets first via /api/wallet/create'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return None
+
+    def balance_error(self, eth_client, master_address, amount_per_wallet, total_recipients):
+        """
+        Проверка баланса мастер кошелька: amount * получатели + газ; None - если хватает
+        """
+        master_balance_wei = eth_client.w3.eth.get_balance(master_address)
+        fee_fields = eth_client.fee_oracle.fee_fields()
+        return self.shortfall_error(master_balance_wei, fee_fields, master_address, amount_per_wallet, total_recipients)
+
+    def shortfall_error(self, master_balance_wei, fee_fields, master_address, amount_per_wallet, total_recipients):
+        amount_wei_per_wallet = Web3.to_wei(amount_per_wallet, 'ether')
+        gas_per_tx = settings.BULK_SEND_GAS_PER_TX
+
+        total_amount_wei = amount_wei_per_wallet * total_recipients
+        total_gas_wei = FeeOracle.max_price_per_gas(fee_fields) * gas_per_tx * total_recipients
+        total_needed_wei = total_amount_wei + total_gas_wei
+
+        if master_balance_wei >= total_needed_wei:
+            return None
+        return Response({
+            'error': 'Insufficient balance on master wallet',
+            'master_wallet': master_address,
+            'balance': str(Web3.from_wei(master_balance_wei, 'ether')),
+            'required': str(Web3.from_wei(total_needed_wei, 'ether')),
+            'recipients': total_recipients,
+            'amount_per_wallet': str(amount_per_wallet)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def create_job(self, master_address, amount_per_wallet, send_tx, recipient_addresses):
+        """
+        Задание и его получатели одной транзакцией, затем постановка в очередь
+        """
+        with db_transaction.atomic():
+            job = BulkSendJob.objects.create(
+                master_address=master_address,
+                amount_eth=amount_per_wallet,
+                send_tx=(send_tx == 1),
+                total_recipients=len(recipient_addresses)
+            )
+            BulkSendItem.objects.bulk_create(
+                [
+                    BulkSendItem(job=job, position=i, recipient=recipient)
+                    for i, recipient in enumerate(recipient_addresses)
+                ],
+                batch_size=1000
+            )
+
+        return self.queue_job(job)
+
+    def queue_job(self, job):
+        db_transaction.on_commit(lambda: bulk_jobs.enqueue(job.pk))
+        logger.info(f"Bulk-send job {job.pk} queued: {job.total_recipients} recipients, {job.amount_eth} ETH each")
+        return Response(BulkSendJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class BulkSendView(BulkSendMixin, APIView):
     """
     POST /api/wallet/bulk-send
 
-    Отправляет ETH с мастер кошелька (m/44'/60'/0'/0/0) на несколько адресов
+    Ставит задание на отправку ETH с мастер кошелька (m/44'/60'/0'/0/0) на несколько адресов.
+    Подпись и отправка идут в фоне, прогресс - GET /api/wallet/bulk-send/<id>
     """
     authentication_classes = [SHA256Authentication]
 
@@ -405,13 +705,10 @@ class BulkSendView(APIView):
             'amount': {'type': 'string', 'description': 'ETH amount per wallet'},
             'send_tx': {'type': 'integer', 'description': 'if 1 - broadcasts TXN'}
         }}},
-        responses={200: {'type': 'object'}},
-        description="Bulk send ETH from master wallet to multiple addresses"
+        responses={202: BulkSendJobSerializer},
+        description="Queue a bulk send of ETH from master wallet to multiple addresses. Returns a job id; poll /api/wallet/bulk-send/{job_id} for progress."
     )
     def post(self, request):
-        from .serializers_bulk import BulkSendSerializer, BulkSendResponseSerializer
-        from decimal import Decimal
-
         serializer = BulkSendSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -422,160 +719,184 @@ class BulkSendView(APIView):
 
         try:
             # Подключение к Ethereum
-            w3 = Web3(Web3.HTTPProvider(
-                f"https://{settings.INFURA_NETWORK}.infura.io/v3/{settings.INFURA_API_KEY}"
-            ))
+            eth_client = get_eth_client()
 
-            if not w3.is_connected():
+            if not eth_client.is_connected():
                 return Response(
                     {'error': 'Failed to connect to Ethereum network'},
                     status=status.HTTP_503_SERVICE_UNAVAILABLE
                 )
 
-            # Получаем мастер кошелек (первый из мнемоника)
-            master_hd_path = "m/44'/60'/0'/0/0"
+            # Запрашиваем адрес мастер кошелька (первый из мнемоника) через MPC
+            master_address = get_mpc_client().generate_wallet(self.master_hd_path)['address']
 
-            # Запрашиваем адрес мастер кошелька через MPC
-            mpc_client = MPCClient()
-            master_wallet_data = mpc_client.generate_wallet(master_hd_path)
-            master_address = master_wallet_data['address']
+            # Whitelist check: master wallet and all recipient wallets must exist
+            error_response = self.recipients_error(master_address, recipient_addresses)
+            if error_response:
+                return error_response
 
-            # Whitelist check: master wallet must exist
-            if not Wallet.objects.filter(address=master_address).exists():
-                return Response(
-                    {'error': f'Master wallet {master_address} not in whitelist. Create it first via /api/wallet/create with hd_path={master_hd_path}'},
-                    status=status.HTTP_403_FORBIDDEN
+            error_response = self.balance_error(eth_client, master_address, amount_per_wallet, len(recipient_addresses))
+            if error_response:
+                return error_response
+
+            return self.create_job(master_address, amount_per_wallet, send_tx, recipient_addresses)
+
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class BulkSendUploadView(BulkSendMixin, APIView):
+    """
+    POST /api/wallet/bulk-send/upload?amount=...&send_tx=...
+
+    Массовая отправка со списком получателей в теле запроса: CSV (адрес в первой колонке
+    или в колонке address) или NDJSON. Тело читается потоком: разбор, проверка адресов
+    и хэш подписи идут по кускам, адреса копятся во временном файле - память ограничена
+    размером куска, а не числом получателей. После проверки подписи - whitelist, баланс
+    и запись задания в БД пачками из файла.
+    """
+    authentication_classes = [StreamingSHA256Authentication]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='amount', type=str, location=OpenApiParameter.QUERY,
+                             description='ETH amount per wallet', required=True),
+            OpenApiParameter(name='send_tx', type=int, location=OpenApiParameter.QUERY,
+                             description='if 1 - broadcasts TXN', required=False),
+        ],
+        request={
+            'text/csv': {'type': 'string', 'description': 'One recipient per row (first column or "address" column)'},
+            'application/x-ndjson': {'type': 'string', 'description': 'One {"address": "0x..."} object per line'},
+        },
+        responses={202: BulkSendJobSerializer},
+        description="Queue a bulk send with the recipient list streamed as CSV or NDJSON. Returns a job id; poll /api/wallet/bulk-send/{job_id} for progress."
+    )
+    def post(self, request):
+        content_type = request.content_type.split(';')[0].strip().lower()
+        upload_format = bulk_upload.CONTENT_TYPE_FORMATS.get(content_type)
+        if upload_format is None:
+            return Response(
+                {'error': f'Unsupported Content-Type {content_type or "(none)"}, use one of: {", ".join(bulk_upload.CONTENT_TYPE_FORMATS)}'},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+
+        serializer = BulkSendParamsSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        amount_per_wallet = serializer.validated_data['amount']
+        send_tx = serializer.validated_data.get('send_tx', 0)
+        body_signature = getattr(request, 'body_signature', None)
+
+        try:
+            with tempfile.TemporaryFile() as spool_file:
+                # Тело целиком уходит во временный файл (разбор и проверка формата по кускам);
+                # ни БД, ни MPC ноды, ни whitelist не трогаются, пока не проверена подпись
+                lines = bulk_upload.iter_lines(
+                    request.read,
+                    settings.BULK_SEND_UPLOAD_READ_BYTES,
+                    on_chunk=body_signature.update if body_signature else None
                 )
+                total_recipients = bulk_upload.spool(bulk_upload.iter_recipients(lines, upload_format), spool_file)
+
+                if body_signature:
+                    body_signature.verify()
 
-            # Whitelist check: all recipient wallets must exist
-            for recipient in recipient_addresses:
-                if not Wallet.objects.filter(address=recipient).exists():
+                if not total_recipients:
                     return Response(
-                        {'error': f'Recipient wallet {recipient} not in whitelist. Create all recipient wallets first via /api/wallet/create'},
-                        status=status.HTTP_403_FORBIDDEN
+                        {'error': 'At least one address required'},
+                        status=status.HTTP_400_BAD_REQUEST
                     )
 
-            # Проверяем баланс мастер кошелька
-            master_balance_wei = w3.eth.get_balance(master_address)
-            master_balance_eth = w3.from_wei(master_balance_wei, 'ether')
-
-            # Рассчитываем общую сумму (amount * количество получателей + gas)
-            total_recipients = len(recipient_addresses)
-            amount_wei_per_wallet = w3.to_wei(float(amount_per_wallet), 'ether')
-            gas_price = w3.eth.gas_price
-            gas_per_tx = 21000
-
-            total_amount_wei = amount_wei_per_wallet * total_recipients
-            total_gas_wei = gas_price * gas_per_tx * total_recipients
-            total_needed_wei = total_amount_wei + total_gas_wei
-
-            # Проверка баланса
-            if master_balance_wei < total_needed_wei:
-                total_needed_eth = w3.from_wei(total_needed_wei, 'ether')
-                return Response({
-                    'error': 'Insufficient balance on master wallet',
-                    'master_wallet': master_address,
-                    'balance': str(master_balance_eth),
-                    'required': str(total_needed_eth),
-                    'recipients': total_recipients,
-                    'amount_per_wallet': str(amount_per_wallet)
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            # Генерируем и подписываем транзакции
-            transactions = []
-            nonce = w3.eth.get_transaction_count(master_address)
-
-            for i, recipient in enumerate(recipient_addresses):
-                try:
-                    logger.info(f"Bulk-send [{i+1}/{total_recipients}]: {master_address} -> {recipient}, amount: {amount_per_wallet} ETH")
-
-                    transaction = {
-                        'nonce': nonce + i,
-                        'to': recipient,
-                        'value': amount_wei_per_wallet,
-                        'gas': gas_per_tx,
-                        'gasPrice': gas_price,
-                        'chainId': w3.eth.chain_id
-                    }
-
-                    sign_result = mpc_client.sign_transaction(w3, transaction, master_address)
-                    raw_tx = sign_result['raw_transaction']
-                    tx_hash = sign_result['tx_hash']
-
-                    if send_tx == 1:
-                        logger.info(f"Broadcasting transaction {tx_hash}")
-                        w3.eth.send_raw_transaction(raw_tx)
-                        logger.info(f"Transaction {tx_hash} sent")
-
-                    try:
-                        Transaction.objects.create(
-                            tx_hash=tx_hash,
-                            from_address=master_address,
-                            to_address=recipient,
-                            amount_eth=Decimal(str(amount_per_wallet)),
-                            status=Transaction.STATUS_OK,
-                            broadcasted=(send_tx == 1)
-                        )
-                    except Exception as db_err:
-                        logger.warning(f"Failed to save transaction to DB: {db_err}")
-
-                    logger.info(f"Bulk-send [{i+1}/{total_recipients}]: SUCCESS, tx_hash: {tx_hash}")
-
-                    transactions.append({
-                        'recipient': recipient,
-                        'amount': str(amount_per_wallet),
-                        'signature': raw_tx[:20] + '...',
-                        'tx_hash': tx_hash,
-                        'nonce': nonce + i,
-                        'sent': send_tx == 1
-                    })
-                except Exception as tx_error:
-                    logger.error(f"Bulk-send [{i+1}/{total_recipients}]: FAILED - {tx_error}")
-
-                    try:
-                        Transaction.objects.create(
-                            tx_hash='ERROR',
-                            from_address=master_address,
-                            to_address=recipient,
-                            amount_eth=Decimal(str(amount_per_wallet)),
-                            status=Transaction.STATUS_ERROR,
-                            error_message=str(tx_error),
-                            broadcasted=False
-                        )
-                    except Exception:
-                        pass
-
-                    transactions.append({
-                        'recipient': recipient,
-                        'amount': str(amount_per_wallet),
-                        'signature': 'ERROR',
-                        'tx_hash': 'ERROR',
-                        'nonce': nonce + i,
-                        'error': str(tx_error)
-                    })
-
-            # Баланс после отправки (теоретический)
-            balance_after_wei = master_balance_wei - total_needed_wei
-            balance_after_eth = w3.from_wei(balance_after_wei, 'ether')
-
-            response_data = {
-                'master_wallet': master_address,
-                'total_recipients': total_recipients,
-                'amount_per_wallet': str(amount_per_wallet),
-                'total_amount': str(w3.from_wei(total_amount_wei, 'ether')),
-                'master_balance_before': str(master_balance_eth),
-                'master_balance_after': str(balance_after_eth),
-                'transactions': transactions
-            }
+                eth_client = get_eth_client()
+                if not eth_client.is_connected():
+                    return Response(
+                        {'error': 'Failed to connect to Ethereum network'},
+                        status=status.HTTP_503_SERVICE_UNAVAILABLE
+                    )
 
-            response_serializer = BulkSendResponseSerializer(data=response_data)
-            if response_serializer.is_valid():
-                return Response(response_serializer.data, status=status.HTTP_200_OK)
-            else:
-                return Response(response_serializer.errors, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                master_address = get_mpc_client().generate_wallet(self.master_hd_path)['address']
+                whitelist = get_whitelist_index()
+                error_response = self.master_wallet_error(whitelist, master_address)
+                if error_response:
+                    return error_response
+
+                batch_size = settings.BULK_SEND_UPLOAD_BATCH_SIZE
+                for batch in bulk_upload.iter_spooled(spool_file, batch_size):
+                    missing_recipients = whitelist.missing(batch)
+                    if missing_recipients:
+                        return Response(
+                            {'error': f'Recipient wallet {missing_recipients[0]} not in whitelist. Create all recipient wallets first via /api/wallet/create'},
+                            status=status.HTTP_403_FORBIDDEN
+                        )
 
+                error_response = self.balance_error(eth_client, master_address, amount_per_wallet, total_recipients)
+                if error_response:
+                    return error_response
+
+                # Транзакция пишет только из локального файла - блокировка записи не ждет клиента
+                with db_transaction.atomic():
+                    job = BulkSendJob.objects.create(
+                        master_address=master_address,
+                        amount_eth=amount_per_wallet,
+                        send_tx=(send_tx == 1),
+                        total_recipients=total_recipients
+                    )
+                    position = 0
+                    for batch in bulk_upload.iter_spooled(spool_file, batch_size):
+                        BulkSendItem.objects.bulk_create([
+                            BulkSendItem(job=job, position=position + i, recipient=recipient)
+                            for i, recipient in enumerate(batch)
+                        ])
+                        position += len(batch)
+
+            return self.queue_job(job)
+
+        except bulk_upload.UploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except exceptions.AuthenticationFailed:
+            raise
         except Exception as e:
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class BulkSendJobView(APIView):
+    """
+    GET /api/wallet/bulk-send/<job_id>
+
+    Прогресс задания массовой отправки и результаты по получателям
+    """
+    authentication_classes = [SHA256Authentication]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='offset', type=int, location=OpenApiParameter.QUERY,
+                             description='Skip first N recipient results', required=False),
+            OpenApiParameter(name='limit', type=int, location=OpenApiParameter.QUERY,
+                             description='Max recipient results to return', required=False),
+        ],
+        responses={200: BulkSendJobDetailSerializer},
+        description="Bulk send job status, progress and per-recipient results"
+    )
+    def get(self, request, job_id):
+        try:
+            job = BulkSendJob.objects.get(pk=job_id)
+        except BulkSendJob.DoesNotExist:
+            return Response({'error': f'Job {job_id} not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            offset = max(0, int(request.query_params.get('offset', 0)))
+            limit = min(max(1, int(request.query_params.get('limit', settings.BULK_SEND_RESULTS_PAGE_SIZE))),
+                        settings.BULK_SEND_RESULTS_PAGE_SIZE)
+        except ValueError:
+            return Response({'error': 'offset and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = BulkSendJobSerializer(job).data
+        data['results'] = BulkSendItemSerializer(job.items.all()[offset:offset + limit], many=True).data
+        return Response(data, status=status.HTTP_200_OK)
@@ -0,0 +1,179 @@
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from django.conf import settings
+import base58
+from ecdsa import SECP256k1, VerifyingKey
+from eth_utils import keccak, to_checksum_address
+from hdwallet import HDWallet
+from hdwallet.symbols import ETH
+from .key_cache import ACCOUNT_PATH, account_child_index
+from .models import AccountXpub
+
+logger = logging.getLogger(__name__)
+
+
+class ExtendedPublicKey:
+    """
+    Разобранный xpub (BIP32): chain code и точка публичного ключа.
+
+    Дочерний адрес - public CKD: I = HMAC-SHA512(chain code, K || index), K_i = I_L * G + K.
+    Умножение на G идет по предвычисленной таблице ecdsa (~1 мс на адрес);
+    HDWallet.from_xpublic_key + from_index делает то же почти в 100 раз медленнее.
+    """
+
+    def __init__(self, xpub: str):
+        raw = base58.b58decode_check(xpub)
+        if len(raw) != 78:
+            raise ValueError(f"Invalid extended public key length: {len(raw)}")
+        self.xpub = xpub
+        self.chain_code = raw[13:45]
+        self.key = raw[45:78]
+        self.point = VerifyingKey.from_string(self.key, curve=SECP256k1).pubkey.point
+
+    def child_address(self, index: int) -> str:
+        if not 0 <= index < 2 ** 31:
+            raise ValueError(f"Hardened or invalid index {index} can't be derived from xpub")
+
+        digest = hmac.new(self.chain_code, self.key + index.to_bytes(4, 'big'), hashlib.sha512).digest()
+        tweak = int.from_bytes(digest[:32], 'big')
+        if not 0 < tweak < SECP256k1.order:
+            # Вероятность ~2^-127; по BIP32 такой индекс пропускается
+            raise ValueError(f"Index {index} yields an invalid child key")
+
+        child = SECP256k1.generator * tweak + self.point
+        public_key = child.x().to_bytes(32, 'big') + child.y().to_bytes(32, 'big')
+        return to_checksum_address(keccak(public_key)[-20:])
+
+
+class WatchOnlyDeriver:
+    """
+    Адреса <ACCOUNT_PATH>/<N> из сохраненного xpub account-ноды: без MPC нод и без PBKDF2.
+
+    xpub выводится один раз из мнемоника (при первом создании кошелька, пока его нет в БД)
+    и хранится в AccountXpub; процесс держит разобранный ключ в памяти и перечитывает
+    строку из БД не реже раза в reload_seconds - refresh_account_xpub доходит до всех воркеров.
+    Если xpub расходится с шардами (адрес из xpub не совпал с выведенным из мнемоника),
+    вывод из xpub отключается до смены xpub в БД - адреса снова идут через шарды.
+    Пути вне account-ноды и hardened индексы по-прежнему требуют шардов.
+    """
+
+    def __init__(self, reload_seconds: float = 30):
+        self.account_path = ACCOUNT_PATH
+        self.reload_seconds = reload_seconds
+        self._key: Optional[ExtendedPublicKey] = None
+        self._loaded_at: Optional[float] = None
+        # xpub, который не совпал с шардами; None - расхождений не найдено
+        self._mismatched: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def xpub_from_mnemonic(mnemonic: str) -> str:
+        hdwallet = HDWallet(symbol=ETH)
+        hdwallet.from_mnemonic(mnemonic)
+        hdwallet.from_path(ACCOUNT_PATH)
+        return hdwallet.xpublic_key()
+
+    def _fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.reload_seconds
+
+    def cached_key(self) -> Optional[ExtendedPublicKey]:
+        """
+        xpub из памяти процесса (без запроса к БД); None - нет или пора перечитать
+        """
+        return self._key if self._fresh() else None
+
+    def reset(self):
+        with self._lock:
+            self._key = None
+            self._loaded_at = None
+            self._mismatched = None
+
+    def load(self) -> Optional[ExtendedPublicKey]:
+        """
+        xpub из памяти или из БД (раз в reload_seconds); None - еще не сохранен или не совпал с шардами
+        """
+        if self._fresh():
+            return self._key
+
+        xpub = AccountXpub.objects.filter(account_path=self.account_path).values_list('xpub', flat=True).first()
+        with self._lock:
+            if xpub is None or xpub != self._mismatched:
+                self._mismatched = None
+            if xpub is None or self._mismatched is not None:
+                self._key = None
+            elif self._key is None or self._key.xpub != xpub:
+                if self._key is not None:
+                    logger.info(f"Account xpub for {self.account_path} changed in the database, reloaded")
+                self._key = ExtendedPublicKey(xpub)
+            self._loaded_at = time.monotonic()
+            return self._key
+
+    def _mismatch(self, xpub: str):
+        with self._lock:
+            self._mismatched = xpub
+            self._key = None
+        logger.error(
+            f"Stored xpub for {self.account_path} does not match the current shards, "
+            f"addresses are derived from shards until manage.py refresh_account_xpub"
+        )
+
+    def store_from_mnemonic(self, mnemonic: str) -> Optional[ExtendedPublicKey]:
+        """
+        Выводит и сохраняет xpub. Сохраненный ранее xpub от других шардов отключает
+        вывод из xpub (None), см. manage.py refresh_account_xpub
+        """
+        if self._mismatched is not None:
+            return None
+
+        xpub = self.xpub_from_mnemonic(mnemonic)
+        stored = AccountXpub.store(self.account_path, xpub)
+        if stored != xpub:
+            self._mismatch(stored)
+            return None
+        logger.info(f"Account xpub for {self.account_path} stored, wallet addresses are derived without MPC nodes")
+        with self._lock:
+            self._key = ExtendedPublicKey(stored)
+            self._loaded_at = time.monotonic()
+        return self._key
+
+    def check_address(self, hd_path: str, address: str):
+        """
+        Сверка адреса, выведенного из мнемоника, с адресом из xpub (~1 мс);
+        расхождение - xpub от других шардов, вывод из него отключается
+        """
+        key = self._key
+        index = self.child_index(hd_path)
+        if key is not None and index is not None and key.child_address(index) != address:
+            self._mismatch(key.xpub)
+
+    @staticmethod
+    def child_index(hd_path: str) -> Optional[int]:
+        return account_child_index(hd_path)
+
+    def addresses(self, key: ExtendedPublicKey, hd_paths: List[str]) -> Dict[str, str]:
+        """
+        {hd_path: address} для путей, которые выводятся из xpub; остальные пропускаются
+        """
+        result = {}
+        for hd_path in hd_paths:
+            index = self.child_index(hd_path)
+            if index is not None:
+                result[hd_path] = key.child_address(index)
+        return result
+
+
+_deriver = None
+_deriver_lock = threading.Lock()
+
+
+def get_watch_only_deriver() -> WatchOnlyDeriver:
+    global _deriver
+    if _deriver is None:
+        with _deriver_lock:
+            if _deriver is None:
+                _deriver = WatchOnlyDeriver(reload_seconds=settings.WATCH_ONLY_XPUB_RELOAD_SECONDS)
+    return _deriver
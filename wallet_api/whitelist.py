@@ -0,0 +1,346 @@
+import fcntl
+import logging
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.conf import settings
+from eth_utils import is_checksum_address, to_checksum_address
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'WLIX'
+VERSION = 1
+HEADER = struct.Struct('<4sIQ')
+ADDRESS_SIZE = 20
+HD_PATH_SIZE = 100
+RECORD_SIZE = ADDRESS_SIZE + HD_PATH_SIZE
+
+
+def address_key(address: str) -> Optional[bytes]:
+    """
+    20 байт адреса; None - если строка не похожа на ETH адрес
+    """
+    if not address or len(address) != 42 or not address.startswith('0x'):
+        return None
+    try:
+        key = bytes.fromhex(address[2:])
+    except ValueError:
+        return None
+    # fromhex пропускает пробелы - такой адрес короче 20 байт
+    return key if len(key) == ADDRESS_SIZE else None
+
+
+def checksum_address(address: str) -> Optional[str]:
+    """
+    Адрес в checksum форме (EIP-55); None - не ETH адрес или смешанный регистр с неверной контрольной суммой.
+    Индекс сравнивает байты, поэтому адреса нормализуются до проверки whitelist
+    """
+    if address_key(address) is None:
+        return None
+    digits = address[2:]
+    if digits != digits.lower() and digits != digits.upper() and not is_checksum_address(address):
+        return None
+    return to_checksum_address(address)
+
+
+def _pack(key: bytes, hd_path: str) -> bytes:
+    return key + hd_path.encode().ljust(HD_PATH_SIZE, b'\0')
+
+
+class _Records:
+    """
+    Отсортированный массив записей фиксированной длины поверх mmap - для bisect
+    """
+
+    def __init__(self, buf, count: int):
+        self.buf = buf
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i: int) -> bytes:
+        offset = HEADER.size + i * RECORD_SIZE
+        return self.buf[offset:offset + ADDRESS_SIZE]
+
+    def hd_path(self, i: int) -> str:
+        offset = HEADER.size + i * RECORD_SIZE + ADDRESS_SIZE
+        return self.buf[offset:offset + HD_PATH_SIZE].rstrip(b'\0').decode()
+
+
+class WhitelistIndex:
+    """
+    Индекс whitelist адресов: address -> hd_path без запросов в БД.
+
+    Основной файл - отсортированные записи (20 байт адреса + hd_path), отображается
+    в память через mmap и разделяется всеми воркерами через page cache.
+    Новые кошельки дописываются в delta-файл (append), удаленные - записью с пустым hd_path,
+    которая перекрывает основной файл. При превышении WHITELIST_DELTA_MAX_RECORDS
+    delta сливается с основным файлом, удаленные адреса при этом выбрасываются.
+    Изменения файлов другими процессами подхватываются по stat().
+    """
+
+    def __init__(self, path: str, delta_max_records: int):
+        self.path = str(path)
+        self.delta_path = self.path + '.delta'
+        self.lock_path = self.path + '.lock'
+        self.delta_max_records = delta_max_records
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        self._records = _Records(b'', 0)
+        self._main_stat = None
+        self._delta: Dict[bytes, str] = {}
+        self._delta_offset = 0
+        self._delta_stat = None
+
+    # --- Загрузка ---
+
+    @staticmethod
+    def _stat_key(path: str):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _load_main(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = None
+        self._file = None
+        self._records = _Records(b'', 0)
+
+        stat_key = self._stat_key(self.path)
+        if stat_key is not None and stat_key[1] > HEADER.size:
+            self._file = open(self.path, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, count = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != VERSION:
+                raise Exception(f"Unsupported whitelist index file {self.path}")
+            self._records = _Records(self._map, count)
+        self._main_stat = stat_key
+
+    def _load_delta(self):
+        stat_key = self._stat_key(self.delta_path)
+        if stat_key is None:
+            self._delta = {}
+            self._delta_offset = 0
+        else:
+            # delta только дописывается; после слияния файл пересоздается (другой inode)
+            if self._delta_stat is None or stat_key[0] != self._delta_stat[0] or stat_key[1] < self._delta_offset:
+                self._delta = {}
+                self._delta_offset = 0
+            with open(self.delta_path, 'rb') as f:
+                f.seek(self._delta_offset)
+                data = f.read()
+            usable = len(data) - len(data) % RECORD_SIZE
+            for offset in range(0, usable, RECORD_SIZE):
+                record = data[offset:offset + RECORD_SIZE]
+                self._delta[record[:ADDRESS_SIZE]] = record[ADDRESS_SIZE:].rstrip(b'\0').decode()
+            self._delta_offset += usable
+        self._delta_stat = stat_key
+
+    def _refresh(self):
+        if self._main_stat is None and not os.path.exists(self.path):
+            self.rebuild()
+        if self._stat_key(self.path) != self._main_stat:
+            self._load_main()
+            # После слияния delta пустая - перечитываем с нуля
+            self._delta_stat = None
+        if self._stat_key(self.delta_path) != self._delta_stat:
+            self._load_delta()
+
+    # --- Чтение ---
+
+    def _find(self, key: bytes) -> Optional[str]:
+        if key in self._delta:
+            # Пустой hd_path - кошелек удален
+            return self._delta[key] or None
+        i = bisect_left(self._records, key)
+        if i < len(self._records) and self._records[i] == key:
+            return self._records.hd_path(i)
+        return None
+
+    def lookup(self, address: str) -> Optional[str]:
+        """
+        hd_path кошелька или None, если адреса нет в whitelist.
+        Промах перепроверяется в БД (индекс мог отстать) - это путь отказа, он редкий.
+        """
+        key = address_key(address)
+        if key is None:
+            return None
+        with self._lock:
+            self._refresh()
+            hd_path = self._find(key)
+        if hd_path is None:
+            hd_path = self._verify_misses([address]).get(address)
+        return hd_path
+
+    def contains(self, address: str) -> bool:
+        return self.lookup(address) is not None
+
+    def missing(self, addresses: Iterable[str]) -> List[str]:
+        """
+        Адреса, которых нет в whitelist (в исходном порядке).
+        Один проход: запросы сортируются и сливаются с отсортированным индексом,
+        поиск продолжается с позиции предыдущего совпадения.
+        """
+        addresses = list(addresses)
+        keyed = sorted(
+            (key, i) for i, key in ((i, address_key(a)) for i, a in enumerate(addresses)) if key is not None
+        )
+        absent = {i for i, a in enumerate(addresses) if address_key(a) is None}
+
+        with self._lock:
+            self._refresh()
+            records = self._records
+            lo = 0
+            for key, i in keyed:
+                if key in self._delta:
+                    if not self._delta[key]:
+                        absent.add(i)
+                    continue
+                lo = bisect_left(records, key, lo)
+                if lo < len(records) and records[lo] == key:
+                    continue
+                absent.add(i)
+
+        if absent:
+            found = self._verify_misses([addresses[i] for i in absent])
+            absent = {i for i in absent if addresses[i] not in found}
+
+        return [addresses[i] for i in sorted(absent)]
+
+    def _verify_misses(self, addresses: List[str]) -> Dict[str, str]:
+        """
+        Проверка промахов по БД одним запросом; найденное досылается в индекс
+        """
+        from .models import Wallet
+
+        found = dict(Wallet.objects.filter(address__in=addresses).values_list('address', 'hd_path'))
+        if found:
+            logger.warning(f"Whitelist index was missing {len(found)} wallet(s), adding them")
+            self.add(found.items())
+        return found
+
+    # --- Запись ---
+
+    def _write_main(self, entries: Dict[bytes, str]):
+        tmp_path = f"{self.path}.tmp.{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(entries)))
+            for key in sorted(entries):
+                f.write(_pack(key, entries[key]))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _exclusive(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        lock_file = open(self.lock_path, 'a')
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def rebuild(self):
+        """
+        Полная пересборка индекса из таблицы Wallet
+        """
+        from .models import Wallet
+
+        lock_file = self._exclusive()
+        try:
+            entries = {}
+            for address, hd_path in Wallet.objects.values_list('address', 'hd_path').iterator(chunk_size=10000):
+                key = address_key(address)
+                if key is not None:
+                    entries[key] = hd_path
+            self._write_main(entries)
+            if os.path.exists(self.delta_path):
+                os.remove(self.delta_path)
+            logger.info(f"Whitelist index rebuilt: {len(entries)} addresses")
+        finally:
+            lock_file.close()
+
+    def add(self, wallets: Iterable[Tuple[str, str]]):
+        """
+        Инкрементально добавляет (address, hd_path) новых кошельков
+        """
+        payload = b''.join(
+            _pack(key, hd_path)
+            for key, hd_path in ((address_key(a), p) for a, p in wallets)
+            if key is not None
+        )
+        self._append_delta(payload)
+
+    def remove(self, addresses: Iterable[str]):
+        """
+        Убирает удаленные кошельки: в delta дописываются записи с пустым hd_path
+        """
+        payload = b''.join(_pack(key, '') for key in map(address_key, addresses) if key is not None)
+        self._append_delta(payload)
+
+    def _append_delta(self, payload: bytes):
+        if not payload:
+            return
+
+        lock_file = self._exclusive()
+        try:
+            if not os.path.exists(self.path):
+                # Индекса еще нет - собираем из БД (изменения уже там)
+                lock_file.close()
+                lock_file = None
+                self.rebuild()
+                return
+
+            with open(self.delta_path, 'ab') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+                delta_records = f.tell() // RECORD_SIZE
+
+            if delta_records > self.delta_max_records:
+                self._compact()
+        finally:
+            if lock_file is not None:
+                lock_file.close()
+
+    def _compact(self):
+        """
+        Слияние delta с основным файлом (вызывается под файловой блокировкой)
+        """
+        with self._lock:
+            self._main_stat = None
+            self._load_main()
+            self._delta_stat = None
+            self._load_delta()
+            entries = {self._records[i]: self._records.hd_path(i) for i in range(len(self._records))}
+            entries.update(self._delta)
+            entries = {key: hd_path for key, hd_path in entries.items() if hd_path}
+            self._write_main(entries)
+            os.remove(self.delta_path)
+            self._delta = {}
+            self._delta_offset = 0
+            self._delta_stat = None
+        logger.info(f"Whitelist index compacted: {len(entries)} addresses")
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_whitelist_index() -> WhitelistIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = WhitelistIndex(
+                    settings.WHITELIST_INDEX_PATH,
+                    settings.WHITELIST_DELTA_MAX_RECORDS
+                )
+    return _index